@@ -0,0 +1,47 @@
+"""
+Índice em cache dos centros gestores acessíveis por usuário.
+
+O conjunto de ids é calculado uma vez e guardado no cache do Django sob uma
+chave versionada. Qualquer alteração na estrutura organizacional (setores,
+centros gestores, CenterHierarchy, funcionários, usuários ou grupos) incrementa
+a versão global, invalidando todos os índices de uma vez.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'hierarchy_access:version'
+
+
+def get_access_version():
+    """Retorna a versão atual do índice de acesso hierárquico"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_access_version():
+    """Invalida todos os índices de acesso hierárquico"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+
+
+def get_cached_ids(user, name, compute):
+    """
+    Retorna a lista de ids (name) acessíveis ao usuário, calculando com
+    compute() apenas quando não houver valor em cache para a versão atual
+    """
+    key = f'hierarchy_access:v{get_access_version()}:user:{user.pk}:{name}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = sorted(set(compute()))
+        cache.set(key, ids, timeout=getattr(settings, 'HIERARCHY_ACCESS_CACHE_TIMEOUT', 300))
+        logger.debug(f"Índice hierárquico '{name}' calculado para o usuário {user.pk}: {len(ids)} ids")
+    return ids
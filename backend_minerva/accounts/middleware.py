@@ -2,6 +2,7 @@ from django.core.exceptions import PermissionDenied
 from django.contrib.auth.models import AnonymousUser
 from django.http import HttpResponseForbidden
 from django.shortcuts import render
+from .principal import get_principal
 
 
 class HierarchicalPermissionMiddleware:
@@ -33,7 +34,7 @@ class HierarchicalPermissionMiddleware:
             return
         
         # Verificar se usuário tem grupos
-        if not request.user.groups.exists():
+        if not get_principal(request.user).group_names:
             # Usuário sem grupos não pode acessar nada no admin
             if request.path != '/admin/logout/':
                 request.no_groups_access = True
@@ -61,6 +62,7 @@ class UserPermissionContextProcessor:
     def __call__(self):
         if hasattr(self.request, 'user') and self.request.user.is_authenticated:
             user = self.request.user
+            principal = get_principal(user)
             
             # Determinar nível hierárquico
             hierarchy_level = self.get_user_hierarchy_level(user)
@@ -72,7 +74,7 @@ class UserPermissionContextProcessor:
                 'can_view_management': self.user_has_permission(user, 'view_management'),
                 'can_view_coordination': self.user_has_permission(user, 'view_coordination'),
                 'hierarchy_level': hierarchy_level,
-                'user_groups': [group.name for group in user.groups.all()],
+                'user_groups': sorted(principal.group_names),
             }
             
             return {'user_permissions': permissions}
@@ -86,7 +88,7 @@ class UserPermissionContextProcessor:
         if user.is_superuser:
             return 'superuser'
         
-        group_names = [group.name.lower() for group in user.groups.all()]
+        group_names = get_principal(user).group_names_lower
         
         if any('presidente' in name for name in group_names):
             return 'presidente'
@@ -107,12 +109,10 @@ class UserPermissionContextProcessor:
             return True
         
         # Verificar permissões específicas nos grupos do usuário
-        for group in user.groups.all():
-            for permission in group.permissions.all():
-                if permission_type in permission.codename:
-                    return True
-        
-        return False
+        return any(
+            permission_type in codename
+            for codename in get_principal(user).permission_codenames
+        )
 
 
 def user_permission_context(request):
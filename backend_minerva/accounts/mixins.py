@@ -1,6 +1,7 @@
 from django.db import models
 from django.db.models import Q
 from django.contrib.auth import get_user_model
+from .principal import get_principal
 import logging
 
 User = get_user_model()
@@ -35,19 +36,20 @@ class HierarchicalQuerysetMixin:
         if user.is_superuser:
             return cls.objects.all()
 
-        if not user.groups.exists():
+        principal = get_principal(user)
+
+        if not principal.group_names:
             return cls.objects.none()
 
         # Obter employee do usuário
-        if not hasattr(user, 'employee') or not user.employee:
+        employee = principal.employee
+        if not employee:
             return cls.objects.none()
 
-        employee = user.employee
         accessible_objects = cls.objects.none()
 
         # Verificar grupos e suas permissões
-        for group in user.groups.all():
-            group_name = group.name.lower()
+        for group_name in principal.group_names_lower:
 
             if group_name == 'presidente':
                 # Presidente pode ver tudo
@@ -123,87 +125,69 @@ class HierarchicalFilterMixin:
     """
     
     def get_user_hierarchy_level(self, user):
-        """Determina o nível hierárquico do usuário"""
-        if not hasattr(user, 'employee') or not user.employee:
-            return None, None
-            
-        employee = user.employee
-        
-        # Verifica se é presidente (pode ser determinado por grupos/permissões especiais)
-        if user.groups.filter(name='Presidente').exists() or user.is_superuser:
-            return 'president', None
-            
-        # Verifica coordenação
-        if hasattr(employee, 'coordination') and employee.coordination:
-            return 'coordination', employee.coordination
-            
-        # Verifica gerência
-        if hasattr(employee, 'management') and employee.management:
-            return 'management', employee.management
-            
-        # Verifica direção
-        if hasattr(employee, 'direction') and employee.direction:
-            return 'direction', employee.direction
-            
-        return None, None
+        """
+        Determina o nível hierárquico do usuário.
+        Resolvido uma vez por requisição pelo Principal (accounts.principal).
+        """
+        return get_principal(user).hierarchy
     
-    def get_accessible_management_centers(self, user):
-        """Retorna queryset dos centros gestores acessíveis ao usuário"""
-        from center.models import ManagementCenter, CenterHierarchy
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
+    def get_accessible_management_center_ids(self, user):
+        """
+        Retorna a lista de ids dos centros gestores acessíveis ao usuário.
+        O resultado fica em cache (accounts.hierarchy_cache) até a próxima
+        alteração na estrutura organizacional.
+        """
+        from .hierarchy_cache import get_cached_ids
+
+        if not user or not user.is_authenticated:
+            return []
+
+        return get_cached_ids(
+            user, 'management_centers',
+            lambda: self._compute_accessible_management_center_ids(user)
+        )
+
+    def _compute_accessible_management_center_ids(self, user):
+        """Calcula os ids dos centros gestores acessíveis ao usuário"""
+        from center.models import ManagementCenter, HierarchyClosure
+
         hierarchy_level, hierarchy_object = self.get_user_hierarchy_level(user)
-        logger.info(f"User {user.email}: hierarchy_level={hierarchy_level}, hierarchy_object={hierarchy_object}")
-        
+
         if hierarchy_level == 'president':
             # Presidente vê tudo
-            centers = ManagementCenter.objects.all()
-            logger.info(f"User {user.email} is president - access to all {centers.count()} centers")
-            return centers
-            
-        elif hierarchy_level == 'direction':
-            # Diretor vê centros de sua direção
-            centers = ManagementCenter.objects.filter(
-                hierarchy_associations__direction=hierarchy_object
-            ).distinct()
-            logger.info(f"User {user.email} is director - access to {centers.count()} centers")
-            return centers
-            
-        elif hierarchy_level == 'management':
-            # Gerente vê centros de sua gerência
-            centers = ManagementCenter.objects.filter(
-                hierarchy_associations__management=hierarchy_object
-            ).distinct()
-            logger.info(f"User {user.email} is manager - access to {centers.count()} centers")
-            return centers
-            
-        elif hierarchy_level == 'coordination':
-            # Coordenador vê centros de sua coordenação
-            centers = ManagementCenter.objects.filter(
-                hierarchy_associations__coordination=hierarchy_object
-            ).distinct()
-            logger.info(f"User {user.email} is coordinator - access to {centers.count()} centers")
-            return centers
-            
-        # Se não tem hierarquia definida, não vê nada
-        logger.warning(f"User {user.email} has no defined hierarchy - no access to centers")
-        
+            return ManagementCenter.objects.values_list('pk', flat=True)
+
+        if hierarchy_level in ('direction', 'management', 'coordination'):
+            # Diretor, gerente e coordenador veem os centros abaixo do seu nó
+            return HierarchyClosure.objects.filter(
+                ancestor_type=hierarchy_level,
+                ancestor_id=hierarchy_object.pk,
+                descendant_type=HierarchyClosure.MANAGEMENT_CENTER
+            ).values_list('descendant_id', flat=True)
+
         # Verificar se é superuser sem hierarquia definida
         if user.is_superuser:
             logger.warning(f"Superuser {user.email} without hierarchy - granting access to all centers")
-            return ManagementCenter.objects.all()
-            
-        return ManagementCenter.objects.none()
+            return ManagementCenter.objects.values_list('pk', flat=True)
+
+        # Se não tem hierarquia definida, não vê nada
+        logger.warning(f"User {user.email} has no defined hierarchy - no access to centers")
+        return []
+
+    def get_accessible_management_centers(self, user):
+        """Retorna queryset dos centros gestores acessíveis ao usuário"""
+        from center.models import ManagementCenter
+
+        return ManagementCenter.objects.filter(
+            pk__in=self.get_accessible_management_center_ids(user)
+        )
     
     def get_accessible_requesting_centers(self, user):
         """Retorna queryset dos centros solicitantes acessíveis ao usuário"""
         from center.models import RequestingCenter
         
-        accessible_management_centers = self.get_accessible_management_centers(user)
         return RequestingCenter.objects.filter(
-            management_center__in=accessible_management_centers
+            management_center__in=self.get_accessible_management_center_ids(user)
         )
     
     def filter_queryset_by_hierarchy(self, queryset, user, center_field='management_center'):
@@ -215,14 +199,15 @@ class HierarchicalFilterMixin:
             user: Usuário para aplicar filtro
             center_field: Nome do campo que relaciona com centro gestor
         """
-        accessible_centers = self.get_accessible_management_centers(user)
+        accessible_center_ids = self.get_accessible_management_center_ids(user)
         
-        filter_kwargs = {f"{center_field}__in": accessible_centers}
+        filter_kwargs = {f"{center_field}__in": accessible_center_ids}
         return queryset.filter(**filter_kwargs)
     
     def get_hierarchical_employees_queryset(self, user):
         """Retorna funcionários visíveis baseado na hierarquia"""
         from employee.models import Employee
+        from center.models import HierarchyClosure
         
         hierarchy_level, hierarchy_object = self.get_user_hierarchy_level(user)
         
@@ -230,25 +215,13 @@ class HierarchicalFilterMixin:
             # Presidente vê todos
             return Employee.objects.all()
             
-        elif hierarchy_level == 'direction':
-            # Diretor vê funcionários da sua direção e subordinados
-            return Employee.objects.filter(
-                Q(direction=hierarchy_object) |
-                Q(management__direction=hierarchy_object) |
-                Q(coordination__management__direction=hierarchy_object)
-            ).distinct()
-            
-        elif hierarchy_level == 'management':
-            # Gerente vê funcionários da sua gerência e coordenações subordinadas
-            return Employee.objects.filter(
-                Q(management=hierarchy_object) |
-                Q(coordination__management=hierarchy_object)
-            ).distinct()
-            
-        elif hierarchy_level == 'coordination':
-            # Coordenador vê apenas funcionários da sua coordenação
+        elif hierarchy_level in ('direction', 'management', 'coordination'):
+            # Funcionários lotados no nó do usuário ou em qualquer nó abaixo dele
+            # (o fechamento inclui o próprio nó com profundidade 0)
             return Employee.objects.filter(
-                coordination=hierarchy_object
+                Q(direction_id__in=HierarchyClosure.descendant_ids(hierarchy_object, HierarchyClosure.DIRECTION)) |
+                Q(management_id__in=HierarchyClosure.descendant_ids(hierarchy_object, HierarchyClosure.MANAGEMENT)) |
+                Q(coordination_id__in=HierarchyClosure.descendant_ids(hierarchy_object, HierarchyClosure.COORDINATION))
             )
             
         return Employee.objects.none()
@@ -269,13 +242,13 @@ class HierarchicalPermissionMixin(models.Model):
         
         # Se o modelo tem centro gestor, usar filtro hierárquico
         if hasattr(self, 'management_center'):
-            accessible_centers = mixin.get_accessible_management_centers(user)
-            return self.management_center in accessible_centers
+            accessible_center_ids = mixin.get_accessible_management_center_ids(user)
+            return self.management_center_id in accessible_center_ids
             
         # Se o modelo tem centro solicitante, verificar via centro gestor
         elif hasattr(self, 'requesting_center') and self.requesting_center:
-            accessible_centers = mixin.get_accessible_management_centers(user)
-            return self.requesting_center.management_center in accessible_centers
+            accessible_center_ids = mixin.get_accessible_management_center_ids(user)
+            return self.requesting_center.management_center_id in accessible_center_ids
             
         # Se é um funcionário, usar filtro de funcionários
         elif hasattr(self, 'direction') or hasattr(self, 'management') or hasattr(self, 'coordination'):
@@ -107,6 +107,7 @@ class BlacklistedToken(models.Model):
         """
         try:
             from rest_framework_simplejwt.tokens import AccessToken
+            from .token_blacklist import is_jti_blacklisted
             # Tenta decodificar sem verificar expiração
             decoded_token = AccessToken(token, verify=False)
             jti = decoded_token.get('jti')
@@ -115,7 +116,7 @@ class BlacklistedToken(models.Model):
                 # Sem JTI, não pode estar na blacklist
                 return False
 
-            return cls.objects.filter(jti=jti).exists()
+            return is_jti_blacklisted(jti)
         except Exception as e:
             # Se não consegue extrair o JTI, assume que não está na blacklist
             # O erro de validação será tratado pelo middleware/autenticação
@@ -127,6 +128,7 @@ class BlacklistedToken(models.Model):
         """Adiciona um token à blacklist"""
         try:
             from rest_framework_simplejwt.tokens import AccessToken
+            from .token_blacklist import register_revoked_jti
             decoded_token = AccessToken(token)
             jti = decoded_token.get('jti')
             
@@ -138,6 +140,7 @@ class BlacklistedToken(models.Model):
                     'reason': reason
                 }
             )
+            register_revoked_jti(jti)
             return True
         except Exception as e:
             logger.error(f"Erro ao adicionar token à blacklist: {e}")
@@ -152,4 +155,7 @@ class BlacklistedToken(models.Model):
         # Remove tokens com mais de 7 dias (tempo de vida máximo do refresh token)
         cutoff_date = timezone.now() - timedelta(days=7)
         deleted_count = cls.objects.filter(blacklisted_at__lt=cutoff_date).delete()[0]
+        if deleted_count:
+            from .token_blacklist import invalidate_index
+            invalidate_index()
         return deleted_count
@@ -0,0 +1,134 @@
+"""
+Principal da requisição: dados de autorização do usuário resolvidos uma única
+vez por requisição (grupos, funcionário com a lotação, nível hierárquico e
+permissões dos grupos).
+
+get_principal(user) memoiza o objeto na própria instância do usuário, que
+vive apenas durante a requisição; o PrincipalMiddleware o expõe também em
+request.principal. Os helpers de hierarquia e controle de acesso leem daqui
+em vez de consultar user.groups e user.employee repetidamente.
+"""
+from django.utils.functional import SimpleLazyObject, cached_property
+
+PRINCIPAL_ATTR = '_principal'
+
+
+class Principal:
+
+    def __init__(self, user):
+        self.user = user
+        self.is_superuser = bool(getattr(user, 'is_superuser', False))
+        self.is_authenticated = bool(getattr(user, 'is_authenticated', False))
+
+    @cached_property
+    def group_names(self):
+        """Nomes dos grupos do usuário (uma consulta)"""
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.groups.values_list('name', flat=True))
+
+    @cached_property
+    def group_names_lower(self):
+        return frozenset(name.lower() for name in self.group_names)
+
+    def in_group(self, name):
+        return name in self.group_names
+
+    @cached_property
+    def employee(self):
+        """Funcionário do usuário com direção, gerência e coordenação carregadas"""
+        from employee.models import Employee
+
+        employee_id = getattr(self.user, 'employee_id', None)
+        if not employee_id:
+            return None
+
+        employee = Employee.objects.select_related(
+            'direction', 'management', 'coordination'
+        ).filter(pk=employee_id).first()
+        if employee is not None:
+            # Evita nova consulta em acessos posteriores a user.employee
+            self.user.employee = employee
+        return employee
+
+    @cached_property
+    def direction_id(self):
+        return self.employee.direction_id if self.employee else None
+
+    @cached_property
+    def management_id(self):
+        return self.employee.management_id if self.employee else None
+
+    @cached_property
+    def coordination_id(self):
+        return self.employee.coordination_id if self.employee else None
+
+    @cached_property
+    def hierarchy(self):
+        """
+        Nível hierárquico e nó do usuário: ('president', None),
+        ('coordination', obj), ('management', obj), ('direction', obj) ou
+        (None, None). Mesmas regras de HierarchicalFilterMixin.
+        """
+        employee = self.employee
+        if employee is None:
+            return None, None
+
+        if self.in_group('Presidente') or self.is_superuser:
+            return 'president', None
+
+        if employee.coordination:
+            return 'coordination', employee.coordination
+
+        if employee.management:
+            return 'management', employee.management
+
+        if employee.direction:
+            return 'direction', employee.direction
+
+        return None, None
+
+    @cached_property
+    def permission_codenames(self):
+        """Codenames das permissões concedidas pelos grupos do usuário (uma consulta)"""
+        from django.contrib.auth.models import Permission
+
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(
+            Permission.objects.filter(group__user=self.user).values_list('codename', flat=True).distinct()
+        )
+
+
+def get_principal(user):
+    """Retorna o Principal do usuário, criando-o no primeiro acesso"""
+    principal = getattr(user, PRINCIPAL_ATTR, None)
+    if principal is None:
+        principal = Principal(user)
+        try:
+            setattr(user, PRINCIPAL_ATTR, principal)
+        except AttributeError:
+            pass
+    return principal
+
+
+def clear_principal(user):
+    """Descarta o Principal memoizado (ex.: após alteração dos grupos)"""
+    try:
+        delattr(user, PRINCIPAL_ATTR)
+    except AttributeError:
+        pass
+
+
+class PrincipalMiddleware:
+    """
+    Disponibiliza request.principal, construído sob demanda para o usuário
+    autenticado da requisição.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request.user))
+        return self.get_response(request)
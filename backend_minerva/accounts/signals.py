@@ -1,9 +1,12 @@
 # accounts/signals.py
 
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import User
+from .models import User, BlacklistedToken
+from .hierarchy_cache import bump_access_version
+from .principal import clear_principal
+from .token_blacklist import unregister_jti
 import secrets
 import string
 from django.core.mail import send_mail
@@ -43,3 +46,48 @@ def definir_senha_e_enviar_email(sender, instance, created, **kwargs):
         except Exception as e:
             # Log do erro mas não falha a criação do usuário
             logger.error(f"Erro ao enviar email: {e}")
+
+
+# Models cuja alteração muda os centros gestores acessíveis aos usuários
+HIERARCHY_ACCESS_MODELS = [
+    'sector.Direction',
+    'sector.Management',
+    'sector.Coordination',
+    'center.ManagementCenter',
+    'center.CenterHierarchy',
+    'employee.Employee',
+]
+
+
+def invalidar_indice_hierarquico(sender, **kwargs):
+    """Invalida o índice em cache de acesso hierárquico após mudanças na estrutura"""
+    bump_access_version()
+
+
+for model in HIERARCHY_ACCESS_MODELS:
+    post_save.connect(invalidar_indice_hierarquico, sender=model, dispatch_uid=f'hierarchy_access_save_{model}')
+    post_delete.connect(invalidar_indice_hierarquico, sender=model, dispatch_uid=f'hierarchy_access_delete_{model}')
+
+
+@receiver(post_save, sender=User)
+def invalidar_indice_por_usuario(sender, instance, update_fields=None, **kwargs):
+    """Vínculo com funcionário ou status de superusuário alteram o acesso (ignora login)"""
+    if update_fields is None or {'employee', 'is_superuser'} & set(update_fields):
+        clear_principal(instance)
+        bump_access_version()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_indice_por_grupos(sender, instance, action, reverse, **kwargs):
+    """Mudança de grupos altera o nível hierárquico (ex.: Presidente)"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            clear_principal(instance)
+        bump_access_version()
+
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def remover_jti_revogado(sender, instance, **kwargs):
+    """Token retirado da blacklist (admin ou limpeza) deixa de ser recusado"""
+    unregister_jti(instance.jti)
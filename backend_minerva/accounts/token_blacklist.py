@@ -0,0 +1,222 @@
+"""
+Consulta rápida da blacklist de tokens JWT.
+
+Cada processo mantém um filtro de Bloom com os jtis revogados. Como o filtro
+não tem falsos negativos, um jti ausente dele não está revogado e a
+verificação termina sem acessar o banco. Os poucos positivos (revogados de
+fato ou falsos positivos) são confirmados pela chave do jti no cache
+compartilhado e, na falta dela, pelo banco, que continua sendo a fonte da
+verdade.
+
+Inclusões (add_token) incrementam a revisão guardada no cache; o filtro é
+então sincronizado de forma incremental, lendo só os jtis revogados desde a
+última sincronização. Remoções (cleanup_expired, exclusões) incrementam a
+geração e forçam a reconstrução completa. Sem mudança de revisão, a
+sincronização incremental também ocorre a cada JWT_BLACKLIST_BLOOM_MAX_AGE
+segundos, o que garante que revogações feitas em outro processo sejam vistas
+mesmo com um cache local (LocMemCache); com cache compartilhado
+(Redis/Memcached) a propagação é imediata.
+
+Resultados negativos do banco (falsos positivos do filtro) ficam em cache por
+no máximo JWT_BLACKLIST_BLOOM_MAX_AGE segundos, em chave que inclui a revisão:
+uma revogação posterior do mesmo jti não fica escondida por eles.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'jwt_blacklist:generation'
+REVISION_KEY = 'jwt_blacklist:revision'
+JTI_KEY_PREFIX = 'jwt_blacklist:jti:'
+MISS_KEY_PREFIX = 'jwt_blacklist:miss:'
+
+# Margem (segundos) relida a cada sincronização incremental, para não perder
+# inclusões cuja transação terminou depois de uma sincronização anterior
+SYNC_OVERLAP_SECONDS = 60
+
+
+class BloomFilter:
+    """Filtro de Bloom simples sobre bytearray (hash duplo com blake2b)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(1024, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class _LocalIndex:
+
+    def __init__(self, bloom, capacity, count, generation, revision, synced_at):
+        self.bloom = bloom
+        self.capacity = capacity
+        self.count = count
+        self.generation = generation
+        self.revision = revision
+        self.synced_at = synced_at
+        self.checked_at = time.monotonic()
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _jti_key(jti):
+    return f'{JTI_KEY_PREFIX}{jti}'
+
+
+def _miss_key(revision, jti):
+    return f'{MISS_KEY_PREFIX}{revision}:{jti}'
+
+
+def _jti_timeout():
+    """Um jti só precisa ficar em cache enquanto o access token for válido"""
+    lifetime = getattr(settings, 'SIMPLE_JWT', {}).get('ACCESS_TOKEN_LIFETIME')
+    return int(lifetime.total_seconds()) if lifetime else 8 * 60 * 60
+
+
+def _max_age():
+    return getattr(settings, 'JWT_BLACKLIST_BLOOM_MAX_AGE', 10)
+
+
+def _get_counters():
+    values = cache.get_many([GENERATION_KEY, REVISION_KEY])
+    return values.get(GENERATION_KEY, 0), values.get(REVISION_KEY, 0)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _build_index(generation, revision):
+    from .models import BlacklistedToken
+
+    synced_at = timezone.now()
+    jtis = list(BlacklistedToken.objects.values_list('jti', flat=True))
+    capacity = max(len(jtis) * 2, 1024)
+    bloom = BloomFilter(capacity=capacity)
+    for jti in jtis:
+        bloom.add(jti)
+    logger.debug(f"Filtro da blacklist JWT reconstruído com {len(jtis)} jti(s)")
+    return _LocalIndex(bloom, capacity, len(jtis), generation, revision, synced_at)
+
+
+def _sync_index(index, revision):
+    """Acrescenta ao filtro os jtis revogados desde a última sincronização"""
+    from .models import BlacklistedToken
+
+    synced_at = timezone.now()
+    jtis = BlacklistedToken.objects.filter(
+        blacklisted_at__gte=index.synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    ).values_list('jti', flat=True)
+
+    added = 0
+    for jti in jtis:
+        if jti not in index.bloom:
+            index.bloom.add(jti)
+            added += 1
+
+    index.count += added
+    index.revision = revision
+    index.synced_at = synced_at
+    index.checked_at = time.monotonic()
+    if added:
+        logger.debug(f"Filtro da blacklist JWT sincronizado com {added} jti(s) novo(s)")
+
+
+def _get_index():
+    global _index
+
+    generation, revision = _get_counters()
+    index = _index
+    if index is None or index.generation != generation:
+        with _lock:
+            index = _index
+            if index is None or index.generation != generation:
+                index = _index = _build_index(generation, revision)
+        return index
+
+    if index.revision != revision or time.monotonic() - index.checked_at > _max_age():
+        with _lock:
+            index = _index
+            if index.revision != revision or time.monotonic() - index.checked_at > _max_age():
+                _sync_index(index, revision)
+                if index.count > index.capacity:
+                    # Filtro cheio: a taxa de falsos positivos passaria do previsto
+                    index = _index = _build_index(generation, revision)
+    return index
+
+
+def is_jti_blacklisted(jti):
+    """Verifica se o jti está revogado; sem consulta ao banco para jtis fora do filtro"""
+    if not jti:
+        return False
+
+    index = _get_index()
+    if jti not in index.bloom:
+        return False
+
+    key = _jti_key(jti)
+    miss_key = _miss_key(index.revision, jti)
+    cached = cache.get_many([key, miss_key])
+    if cached.get(key):
+        return True
+    if miss_key in cached:
+        return False
+
+    from .models import BlacklistedToken
+
+    revoked = BlacklistedToken.objects.filter(jti=jti).exists()
+    if revoked:
+        cache.set(key, True, timeout=_jti_timeout())
+    else:
+        # Falso positivo do filtro: vale só até a próxima revisão ou sincronização
+        cache.set(miss_key, False, timeout=_max_age())
+    return revoked
+
+
+def register_revoked_jti(jti):
+    """Publica um jti recém-revogado no filtro local e no cache compartilhado"""
+    cache.set(_jti_key(jti), True, timeout=_jti_timeout())
+    index = _index
+    if index is not None:
+        index.bloom.add(jti)
+    _bump(REVISION_KEY)
+
+
+def unregister_jti(jti):
+    """Remove o jti do cache compartilhado e força a reconstrução dos filtros"""
+    cache.delete(_jti_key(jti))
+    invalidate_index()
+
+
+def invalidate_index():
+    """Força a reconstrução do filtro em todos os processos (ex.: após limpeza)"""
+    global _index
+    _index = None
+    _bump(GENERATION_KEY)
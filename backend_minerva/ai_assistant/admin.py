@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import (
     ConversationSession,
     ConversationMessage,
+    ChatJob,
     QueryLog,
     DatabaseSchema,
     AliceConfiguration,
@@ -30,10 +31,17 @@ class ConversationMessageAdmin(admin.ModelAdmin):
     content_preview.short_description = 'Conteúdo'
 
 
+@admin.register(ChatJob)
+class ChatJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'session', 'user', 'status', 'event_count', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['job_id', 'session__session_id']
+    readonly_fields = ['created_at', 'updated_at']
+
 @admin.register(QueryLog)
 class QueryLogAdmin(admin.ModelAdmin):
     list_display = ['session', 'question_preview', 'execution_status', 'execution_time_ms', 'result_count', 'created_at']
-    list_filter = ['execution_status', 'created_at']
+    list_filter = ['execution_status', 'truncated', 'created_at']
     search_fields = ['user_question', 'generated_sql']
     readonly_fields = ['created_at']
     
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AiAssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_assistant'
-    verbose_name = 'Assistente de IA (Alice)'
\ No newline at end of file
+    verbose_name = 'Assistente de IA (Alice)'
+
+    def ready(self):
+        import ai_assistant.signals
@@ -0,0 +1,132 @@
+"""
+Comando Django para medir o roteador de intenções da Alice.
+Uso: python manage.py benchmark_intent_router [--iterations 2000] [--from-logs 500]
+
+Compara o roteador compilado com a verificação anterior (busca de substrings
+em listas e consulta predefinida só por igualdade) no tempo por mensagem e na
+quantidade de perguntas que dispensariam o LLM.
+"""
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from ai_assistant.models import QueryLog
+from ai_assistant.services import intent_router
+from ai_assistant.services.intent_router import build_intent_router
+
+SAMPLE_QUESTIONS = [
+    'oi', 'Olá!', 'bom dia, tudo bem?', 'obrigado', 'valeu!', 'tchau', 'ajuda',
+    'o que você faz?', 'quem é você', 'ok',
+    'contratos', 'Contratos', 'listar contratos', 'Mostre os contratos',
+    'auxílios', 'funcionarios', 'quais são os funcionários?', 'orçamentos', 'setores', 'centros',
+    'quantos contratos estão ativos?', 'qual o valor total dos orçamentos de 2024?',
+    'quais funcionários estão cadastrados no setor de TI?',
+    'mostre os contratos que vencem este mês',
+    'oi, quantos auxílios temos?', 'me ajuda com os contratos vencidos',
+    'liste os centros gestores ativos', 'total de auxílios por tipo',
+]
+
+LEGACY_GREETINGS = [
+    'oi', 'olá', 'ola', 'hi', 'hello', 'hey', 'e ai', 'eai',
+    'bom dia', 'boa tarde', 'boa noite', 'tudo bem', 'como vai',
+    'obrigado', 'obrigada', 'valeu', 'tchau', 'até mais', 'ate mais',
+    'ajuda', 'help', 'o que voce faz', 'o que você faz', 'quem é você',
+    'quem e voce', 'quem é voce'
+]
+
+LEGACY_DATA_KEYWORDS = [
+    'contrato', 'contratos', 'auxilio', 'auxilios', 'auxílio', 'auxílios',
+    'funcionario', 'funcionarios', 'funcionário', 'funcionários',
+    'colaborador', 'colaboradores', 'orcamento', 'orçamento', 'orcamentos', 'orçamentos',
+    'budget', 'valor', 'valores', 'total', 'lista', 'listar', 'mostrar', 'mostra',
+    'buscar', 'busca', 'encontrar', 'pesquisar', 'quantos', 'quantas', 'quanto',
+    'quais', 'qual', 'todos', 'todas', 'ativos', 'ativo', 'vencidos', 'vencido',
+    'setor', 'setores', 'direção', 'direcao', 'gerencia', 'gerência', 'coordenacao',
+    'centro', 'centros', 'gestor', 'gestores', 'solicitante'
+]
+
+LEGACY_PREDEFINED = {
+    'auxilios', 'auxílios', 'contratos', 'funcionarios', 'funcionários',
+    'colaboradores', 'orcamentos', 'orçamentos', 'setores', 'centros'
+}
+
+
+def legacy_classify(text):
+    """Classificação anterior ao roteador (mesma ordem de verificação)"""
+    text_lower = text.lower().strip()
+    if not any(keyword in text_lower for keyword in LEGACY_DATA_KEYWORDS):
+        if any(greeting in text_lower for greeting in LEGACY_GREETINGS) or len(text_lower) < 4:
+            return intent_router.GREETING
+    if text_lower in LEGACY_PREDEFINED:
+        return intent_router.PREDEFINED
+    return intent_router.LLM
+
+
+class Command(BaseCommand):
+    help = 'Compara o roteador de intenções da Alice com a verificação por substrings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Repetições do conjunto de perguntas (padrão: 2000)',
+        )
+        parser.add_argument(
+            '--from-logs',
+            type=int,
+            default=0,
+            help='Usar as N perguntas mais recentes do QueryLog em vez das de exemplo',
+        )
+
+    def handle(self, *args, **options):
+        questions = SAMPLE_QUESTIONS
+        if options['from_logs']:
+            questions = list(
+                QueryLog.objects.order_by('-created_at')
+                .values_list('user_question', flat=True)[:options['from_logs']]
+            ) or SAMPLE_QUESTIONS
+        iterations = max(1, options['iterations'])
+
+        started = time.perf_counter()
+        router = build_intent_router()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        legacy_us = self._measure(legacy_classify, questions, iterations)
+        router_us = self._measure(lambda text: router.classify(text).kind, questions, iterations)
+
+        legacy_routes = Counter(legacy_classify(text) for text in questions)
+        router_routes = Counter(router.classify(text).kind for text in questions)
+
+        self.stdout.write(f'{len(questions)} perguntas x {iterations} repetições')
+        self.stdout.write(f'  Montagem do roteador: {build_ms:.2f} ms')
+        self.stdout.write(f'  Substrings: {legacy_us:.2f} µs/mensagem')
+        self.stdout.write(f'  Roteador:   {router_us:.2f} µs/mensagem')
+        for label, routes in (('Substrings', legacy_routes), ('Roteador', router_routes)):
+            self.stdout.write(
+                f'  {label}: ' + ', '.join(
+                    f'{kind}={routes.get(kind, 0)}'
+                    for kind in (intent_router.GREETING, intent_router.PREDEFINED, intent_router.LLM)
+                )
+            )
+
+        skipped = len(questions) - router_routes.get(intent_router.LLM, 0)
+        legacy_skipped = len(questions) - legacy_routes.get(intent_router.LLM, 0)
+        self.stdout.write(self.style.SUCCESS(
+            f'Sem LLM: {skipped} de {len(questions)} perguntas (antes: {legacy_skipped})'
+        ))
+
+        if options['verbosity'] > 1:
+            for text in questions:
+                legacy, route = legacy_classify(text), router.classify(text).kind
+                if legacy != route:
+                    self.stdout.write(f'  {text!r}: {legacy} -> {route}')
+
+    def _measure(self, classify, questions, iterations):
+        """Tempo médio por mensagem em microssegundos"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for text in questions:
+                classify(text)
+        return (time.perf_counter() - started) * 1e6 / (iterations * len(questions))
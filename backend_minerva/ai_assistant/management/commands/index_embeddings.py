@@ -2,8 +2,15 @@
 Comando Django para indexar documentos com embeddings para RAG.
 Uso: python manage.py index_embeddings
 """
-from django.core.management.base import BaseCommand
-from ai_assistant.services import EmbeddingService, SQLInterpreterService
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ai_assistant.models import AliceConfiguration
+from ai_assistant.services import get_embedding_service, get_sql_interpreter
+
+CHECKPOINT_KEY = 'index_embeddings_checkpoint'
 
 
 class Command(BaseCommand):
@@ -20,68 +27,126 @@ class Command(BaseCommand):
             action='store_true',
             help='Limpar embeddings existentes antes de indexar',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Documentos por chamada de embeddings (padrão: 50)',
+        )
 
     def handle(self, *args, **options):
-        embedding_service = EmbeddingService()
-        sql_interpreter = SQLInterpreterService()
+        embedding_service = get_embedding_service()
+        sql_interpreter = get_sql_interpreter()
+        batch_size = options['batch_size']
 
         self.stdout.write('Iniciando indexação de embeddings...')
 
+        checkpoint = self._load_checkpoint()
+        if checkpoint and checkpoint.get('status') != 'done':
+            self.stdout.write(self.style.WARNING(
+                f"  Retomando execução anterior ({checkpoint.get('status')}, "
+                f"{checkpoint.get('created', 0)} documentos já gravados); "
+                f"documentos inalterados serão ignorados"
+            ))
+
         if options['clear']:
             from ai_assistant.models import DocumentEmbedding
             count = DocumentEmbedding.objects.all().delete()[0]
             self.stdout.write(f'  Removidos {count} embeddings existentes')
 
-        # Indexa schema do banco
-        self.stdout.write('Indexando schema do banco de dados...')
-        schema_info = sql_interpreter.get_database_schema()
-        schema_count = embedding_service.index_database_schema(schema_info)
-        self.stdout.write(self.style.SUCCESS(f'  {schema_count} documentos de schema indexados'))
+        # Schema: substitui os documentos de tabelas que mudaram ou deixaram de existir
+        groups = [(
+            'schema',
+            embedding_service.schema_documents(sql_interpreter.get_database_schema()),
+            ['SCHEMA']
+        )]
 
         if not options['schema_only']:
-            # Indexa regras de negócio padrão
-            self.stdout.write('Indexando regras de negócio...')
-            business_rules = self._get_default_business_rules()
-            rules_count = 0
-            for rule in business_rules:
-                doc = embedding_service.add_business_rule(
-                    title=rule['title'],
-                    content=rule['content'],
-                    metadata=rule.get('metadata', {})
+            groups.append(('regras de negócio', [
+                {
+                    'document_type': 'BUSINESS_RULE',
+                    'title': rule['title'],
+                    'content': rule['content'],
+                    'metadata': rule.get('metadata', {})
+                }
+                for rule in self._get_default_business_rules()
+            ], None))
+            groups.append(('FAQs', [
+                embedding_service.faq_document(faq['question'], faq['answer'], faq.get('metadata', {}))
+                for faq in self._get_default_faqs()
+            ], None))
+            groups.append(('exemplos de consultas', [
+                embedding_service.query_example_document(
+                    example['question'], example['sql'], example.get('explanation', '')
                 )
-                if doc:
-                    rules_count += 1
-            self.stdout.write(self.style.SUCCESS(f'  {rules_count} regras de negócio indexadas'))
-
-            # Indexa FAQs padrão
-            self.stdout.write('Indexando FAQs...')
-            faqs = self._get_default_faqs()
-            faq_count = 0
-            for faq in faqs:
-                doc = embedding_service.add_faq(
-                    question=faq['question'],
-                    answer=faq['answer'],
-                    metadata=faq.get('metadata', {})
+                for example in self._get_query_examples()
+            ], None))
+
+        totals = {'created': 0, 'skipped': 0, 'removed': 0, 'batches': 0}
+        self._save_checkpoint({'status': 'running', **totals})
+
+        for label, documents, replace_types in groups:
+            self.stdout.write(f'Indexando {label}...')
+
+            progress = {'created': 0}
+
+            def on_batch(processed, remaining, label=label, progress=progress):
+                progress['created'] = processed
+                self._save_checkpoint({
+                    'status': 'running',
+                    'group': label,
+                    **totals,
+                    'created': totals['created'] + processed,
+                })
+                self.stdout.write(f'  lote gravado: {processed} documento(s), {remaining} pendente(s)')
+
+            try:
+                stats = embedding_service.index_documents(
+                    documents,
+                    replace_types=replace_types,
+                    batch_size=batch_size,
+                    on_batch=on_batch
                 )
-                if doc:
-                    faq_count += 1
-            self.stdout.write(self.style.SUCCESS(f'  {faq_count} FAQs indexadas'))
-
-            # Indexa exemplos de consultas
-            self.stdout.write('Indexando exemplos de consultas...')
-            examples = self._get_query_examples()
-            examples_count = 0
-            for example in examples:
-                doc = embedding_service.add_query_example(
-                    natural_language=example['question'],
-                    sql_query=example['sql'],
-                    explanation=example.get('explanation', '')
+            except Exception as e:
+                self._save_checkpoint({
+                    'status': 'failed',
+                    'group': label,
+                    'error': str(e),
+                    **totals,
+                    'created': totals['created'] + progress['created'],
+                })
+                raise CommandError(
+                    f'Falha ao indexar {label}: {e}. Execute o comando novamente para retomar.'
                 )
-                if doc:
-                    examples_count += 1
-            self.stdout.write(self.style.SUCCESS(f'  {examples_count} exemplos de consultas indexados'))
 
-        self.stdout.write(self.style.SUCCESS('Indexação concluída!'))
+            for key in totals:
+                totals[key] += stats[key]
+            self.stdout.write(self.style.SUCCESS(
+                f"  {stats['created']} indexados, {stats['skipped']} inalterados, {stats['removed']} removidos"
+            ))
+
+        self._save_checkpoint({'status': 'done', **totals})
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexação concluída! {totals['created']} documentos em {totals['batches']} lote(s) de embeddings"
+        ))
+
+    def _load_checkpoint(self):
+        config = AliceConfiguration.objects.filter(key=CHECKPOINT_KEY).first()
+        if config is None:
+            return None
+        try:
+            return json.loads(config.value)
+        except ValueError:
+            return None
+
+    def _save_checkpoint(self, state):
+        AliceConfiguration.objects.update_or_create(
+            key=CHECKPOINT_KEY,
+            defaults={
+                'value': json.dumps({**state, 'updated_at': timezone.now().isoformat()}),
+                'description': 'Progresso da última execução de index_embeddings'
+            }
+        )
 
     def _get_default_business_rules(self):
         """Retorna regras de negócio padrão do sistema Minerva"""
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db import connection
 from ai_assistant.models import DatabaseSchema
+from ai_assistant.services.schema_prompt import bump_schema_version
 import logging
 
 logger = logging.getLogger(__name__)
@@ -193,6 +194,9 @@ class Command(BaseCommand):
             if created:
                 config_count += 1
         
+        # Força a remontagem do schema usado nos prompts do Alice
+        bump_schema_version()
+        
         self.stdout.write(
             self.style.SUCCESS(
                 f'Schema populado com sucesso! '
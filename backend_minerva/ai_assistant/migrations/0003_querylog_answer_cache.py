@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0002_documentembedding_conversationembedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='querylog',
+            name='cached_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cache_hits', to='ai_assistant.querylog', verbose_name='Reaproveitado de'),
+        ),
+        migrations.AddField(
+            model_name='querylog',
+            name='question_embedding',
+            field=models.JSONField(blank=True, null=True, verbose_name='Embedding da Pergunta'),
+        ),
+        migrations.AddField(
+            model_name='querylog',
+            name='scope_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Escopo do Usuário'),
+        ),
+        migrations.AddField(
+            model_name='querylog',
+            name='table_versions',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Versões das Tabelas'),
+        ),
+        migrations.AddField(
+            model_name='querylog',
+            name='tables_used',
+            field=models.JSONField(blank=True, default=list, verbose_name='Tabelas Utilizadas'),
+        ),
+        migrations.AddIndex(
+            model_name='querylog',
+            index=models.Index(fields=['scope_fingerprint', 'execution_status', '-created_at'], name='querylog_answer_cache_idx'),
+        ),
+    ]
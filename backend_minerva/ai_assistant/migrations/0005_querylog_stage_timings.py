@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0004_documentembedding_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='querylog',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Tempos por Etapa (ms)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0005_querylog_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='querylog',
+            name='estimated_cost',
+            field=models.FloatField(blank=True, null=True, verbose_name='Custo Estimado'),
+        ),
+        migrations.AddField(
+            model_name='querylog',
+            name='truncated',
+            field=models.BooleanField(default=False, verbose_name='Resultado Truncado'),
+        ),
+    ]
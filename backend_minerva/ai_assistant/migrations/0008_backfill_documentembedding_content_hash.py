@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:20
+
+from django.db import migrations
+
+
+def backfill_content_hash(apps, schema_editor):
+    """
+    Preenche o hash dos embeddings criados antes do campo content_hash, para
+    que a próxima indexação os reconheça em vez de duplicá-los
+    """
+    from ai_assistant.services.embedding_service import document_hash
+
+    DocumentEmbedding = apps.get_model("ai_assistant", "DocumentEmbedding")
+
+    pending = []
+    queryset = DocumentEmbedding.objects.filter(content_hash="").only("pk", "document_type", "title", "content")
+    for document in queryset.iterator(chunk_size=500):
+        document.content_hash = document_hash(document.document_type, document.title, document.content)
+        pending.append(document)
+        if len(pending) >= 500:
+            DocumentEmbedding.objects.bulk_update(pending, ["content_hash"])
+            pending = []
+    if pending:
+        DocumentEmbedding.objects.bulk_update(pending, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ai_assistant", "0007_chat_jobs"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.contrib.postgres.indexes import GinIndex
@@ -62,6 +63,57 @@ class ConversationMessage(models.Model):
         ordering = ['created_at']
 
 
+class ChatJob(models.Model):
+    """
+    Job de processamento assíncrono de uma mensagem do chat. Fica no banco
+    para que o stream SSE funcione em qualquer worker, não só no que recebeu
+    a mensagem.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Na fila'),
+        ('running', 'Em execução'),
+        ('done', 'Concluído'),
+        ('error', 'Erro'),
+    ]
+
+    job_id = models.CharField(max_length=32, unique=True, verbose_name='ID do Job')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alice_chat_jobs')
+    session = models.ForeignKey(
+        ConversationSession,
+        on_delete=models.CASCADE,
+        related_name='chat_jobs'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name='Status')
+    event_count = models.PositiveIntegerField(default=0, verbose_name='Eventos')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Criado em')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Job do Chat'
+        verbose_name_plural = 'Jobs do Chat'
+        ordering = ['-created_at']
+
+
+class ChatJobEvent(models.Model):
+    """Evento de progresso de um job do chat, numerado a partir de 1"""
+    job = models.ForeignKey(ChatJob, on_delete=models.CASCADE, related_name='events')
+    index = models.PositiveIntegerField(verbose_name='Índice')
+    event_type = models.CharField(max_length=30, verbose_name='Tipo')
+    data = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name='Dados')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+
+    class Meta:
+        verbose_name = 'Evento do Job'
+        verbose_name_plural = 'Eventos dos Jobs'
+        ordering = ['job', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'], name='unique_chat_job_event_index')
+        ]
+
+
 class QueryLog(models.Model):
     """
     Log das consultas SQL geradas e executadas pelo agente Alice
@@ -85,6 +137,28 @@ class QueryLog(models.Model):
     result_count = models.IntegerField(null=True, blank=True, verbose_name='Quantidade de Resultados')
     error_message = models.TextField(blank=True, verbose_name='Mensagem de Erro')
     gemini_response = models.JSONField(default=dict, blank=True, verbose_name='Resposta do Gemini')
+
+    # Cache semântico de respostas (services/answer_cache.py)
+    question_embedding = models.JSONField(null=True, blank=True, verbose_name='Embedding da Pergunta')
+    scope_fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name='Escopo do Usuário')
+    tables_used = models.JSONField(default=list, blank=True, verbose_name='Tabelas Utilizadas')
+    table_versions = models.JSONField(default=dict, blank=True, verbose_name='Versões das Tabelas')
+    cached_from = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cache_hits',
+        verbose_name='Reaproveitado de'
+    )
+
+    # Duração de cada etapa do pipeline em ms (preparação, RAG, interpretação, execução...)
+    stage_timings = models.JSONField(default=dict, blank=True, verbose_name='Tempos por Etapa (ms)')
+
+    # Custo estimado pelo EXPLAIN (PostgreSQL) e se o resultado foi cortado em ALICE_SQL_MAX_ROWS
+    estimated_cost = models.FloatField(null=True, blank=True, verbose_name='Custo Estimado')
+    truncated = models.BooleanField(default=False, verbose_name='Resultado Truncado')
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
 
     def __str__(self):
@@ -94,6 +168,12 @@ class QueryLog(models.Model):
         verbose_name = 'Log de Consulta'
         verbose_name_plural = 'Logs de Consultas'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['scope_fingerprint', 'execution_status', '-created_at'],
+                name='querylog_answer_cache_idx'
+            ),
+        ]
 
 
 class DatabaseSchema(models.Model):
@@ -169,6 +249,9 @@ class DocumentEmbedding(models.Model):
     else:
         embedding = models.JSONField(null=True, blank=True, verbose_name='Embedding (JSON fallback)')
 
+    # Hash de tipo, título, conteúdo e modelo de embedding (reindexação incremental)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True, verbose_name='Hash do Conteúdo')
+
     is_active = models.BooleanField(default=True, verbose_name='Ativo')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -60,7 +60,7 @@ class QueryLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user_question', 'interpreted_intent', 'generated_sql',
             'execution_status', 'execution_status_display', 'execution_time_ms',
-            'result_count', 'error_message', 'created_at'
+            'result_count', 'truncated', 'estimated_cost', 'error_message', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
 
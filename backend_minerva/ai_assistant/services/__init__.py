@@ -1,5 +1,9 @@
 from .gemini_service import GeminiService
 from .embedding_service import EmbeddingService
 from .sql_interpreter import SQLInterpreterService
+from .registry import get_gemini_service, get_embedding_service, get_sql_interpreter, reset_services
 
-__all__ = ['GeminiService', 'EmbeddingService', 'SQLInterpreterService']
+__all__ = [
+    'GeminiService', 'EmbeddingService', 'SQLInterpreterService',
+    'get_gemini_service', 'get_embedding_service', 'get_sql_interpreter', 'reset_services',
+]
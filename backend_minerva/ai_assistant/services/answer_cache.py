@@ -0,0 +1,163 @@
+"""
+Cache semântico de respostas da Alice.
+
+Cada QueryLog bem-sucedido guarda o embedding da pergunta, a impressão do
+escopo hierárquico do usuário, as tabelas usadas pelo SQL e a versão de cada
+tabela no momento da execução. Uma nova pergunta cujo embedding seja
+suficientemente similar ao de um log recente do mesmo escopo reaproveita o
+SQL já validado, sem nova interpretação pelo Gemini.
+
+As versões das tabelas ficam no cache do Django e são incrementadas pelos
+sinais de post_save/post_delete dos models correspondentes e pelo
+cached_amounts_changed, enviado após o commit pelas gravações de saldos via
+queryset.update, bulk_update e bulk_create (ai_assistant signals). Um log só
+é reaproveitado se todas as suas tabelas ainda estiverem na mesma versão;
+alterações por SQL direto são cobertas pelo limite de idade
+ALICE_ANSWER_CACHE_MAX_AGE.
+
+Perguntas idênticas após a normalização do roteador de intenções são
+reconhecidas antes do embedding (remember_intent/find_intent), pela mesma
+validação de escopo e versões.
+"""
+import hashlib
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import QueryLog
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION_PREFIX = 'alice_table_version:'
+INTENT_PREFIX = 'alice_intent:'
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'ALICE_ANSWER_CACHE_ENABLED', True)
+
+
+def scope_fingerprint(user) -> str:
+    """Impressão do escopo de dados do usuário (nível e nó da hierarquia)"""
+    from accounts.principal import get_principal
+
+    principal = get_principal(user)
+    if principal.is_superuser:
+        scope = 'all'
+    else:
+        level, node = principal.hierarchy
+        scope = f'{level}:{node.pk if node is not None else "-"}'
+    return hashlib.sha1(scope.encode()).hexdigest()[:16]
+
+
+def _version_key(table: str) -> str:
+    return f'{TABLE_VERSION_PREFIX}{table}'
+
+
+def get_table_versions(tables: Iterable[str]) -> Dict[str, int]:
+    """Versão atual de cada tabela"""
+    tables = sorted(set(tables))
+    if not tables:
+        return {}
+
+    keys = {_version_key(table): table for table in tables}
+    versions = cache.get_many(list(keys))
+    for key, table in keys.items():
+        if key not in versions:
+            # Inicializa com um valor baseado no relógio: se o cache for
+            # esvaziado, as versões novas nunca coincidem com as antigas
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return {table: versions[key] for key, table in keys.items()}
+
+
+def bump_table_version(table: str) -> None:
+    """Invalida as respostas em cache que dependem da tabela"""
+    try:
+        cache.incr(_version_key(table))
+    except ValueError:
+        cache.set(_version_key(table), time.time_ns(), timeout=None)
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    dot_product = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(x * x for x in b))
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return dot_product / (norm_a * norm_b)
+
+
+def find_cached_answer(question_embedding: List[float], fingerprint: str) -> Optional[QueryLog]:
+    """
+    QueryLog recente e válido do mesmo escopo com a pergunta mais similar
+    (acima de ALICE_ANSWER_CACHE_THRESHOLD), ou None.
+    """
+    if not question_embedding:
+        return None
+
+    threshold = getattr(settings, 'ALICE_ANSWER_CACHE_THRESHOLD', 0.95)
+    max_age = getattr(settings, 'ALICE_ANSWER_CACHE_MAX_AGE', 24 * 60 * 60)
+    max_candidates = getattr(settings, 'ALICE_ANSWER_CACHE_CANDIDATES', 200)
+
+    candidates = QueryLog.objects.filter(
+        execution_status='SUCCESS',
+        scope_fingerprint=fingerprint,
+        question_embedding__isnull=False,
+        created_at__gte=timezone.now() - timedelta(seconds=max_age),
+    ).only(
+        'id', 'user_question', 'interpreted_intent', 'generated_sql',
+        'question_embedding', 'tables_used', 'table_versions'
+    ).order_by('-created_at')[:max_candidates]
+
+    scored = []
+    for log in candidates:
+        similarity = cosine_similarity(question_embedding, log.question_embedding)
+        if similarity >= threshold:
+            scored.append((similarity, log))
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    for similarity, log in scored:
+        if get_table_versions(log.tables_used) == log.table_versions:
+            logger.debug(f"Resposta em cache (log {log.id}, similaridade {similarity:.4f})")
+            return log
+
+    return None
+
+
+def _intent_key(normalized_question: str, fingerprint: str) -> str:
+    digest = hashlib.sha1(f'{fingerprint}\x00{normalized_question}'.encode()).hexdigest()
+    return f'{INTENT_PREFIX}{digest}'
+
+
+def remember_intent(normalized_question: str, fingerprint: str, query_log_id: int) -> None:
+    """Associa a pergunta normalizada ao log bem-sucedido que a respondeu"""
+    if not normalized_question:
+        return
+    cache.set(
+        _intent_key(normalized_question, fingerprint), query_log_id,
+        timeout=getattr(settings, 'ALICE_ANSWER_CACHE_MAX_AGE', 24 * 60 * 60)
+    )
+
+
+def find_intent(normalized_question: str, fingerprint: str) -> Optional[QueryLog]:
+    """Log que respondeu a mesma pergunta normalizada no escopo, se ainda válido"""
+    if not normalized_question:
+        return None
+    log_id = cache.get(_intent_key(normalized_question, fingerprint))
+    if log_id is None:
+        return None
+
+    log = QueryLog.objects.filter(
+        pk=log_id, execution_status='SUCCESS', scope_fingerprint=fingerprint
+    ).only('id', 'interpreted_intent', 'generated_sql', 'tables_used', 'table_versions').first()
+    if log is None or get_table_versions(log.tables_used) != log.table_versions:
+        return None
+    return log
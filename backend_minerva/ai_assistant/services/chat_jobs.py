@@ -0,0 +1,216 @@
+"""
+Processamento assíncrono das mensagens do chat com a Alice.
+
+A requisição HTTP apenas registra a mensagem do usuário, cria um job e o
+envia para um pool de threads; o pipeline completo (saudação, schema, RAG,
+interpretação, execução e humanização) roda em segundo plano. Cada etapa e
+cada trecho da resposta gerada vira um evento gravado no banco (ChatJob e
+ChatJobEvent), que o endpoint SSE (views.alice_chat_job_stream) repassa ao
+cliente. Com o estado no banco, o stream funciona em qualquer worker, mesmo
+que o job rode em outro processo.
+"""
+import contextvars
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from ..models import ChatJob, ChatJobEvent, ConversationMessage, ConversationSession
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _job_ttl():
+    return getattr(settings, 'ALICE_JOB_TTL', 600)
+
+
+def _expiration_cutoff():
+    return timezone.now() - timedelta(seconds=_job_ttl())
+
+
+def get_executor():
+    """Pool de threads compartilhado pelos jobs (criado no primeiro uso)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ALICE_JOB_WORKERS', 4),
+                    thread_name_prefix='alice-job'
+                )
+    return _executor
+
+
+def get_job(job_id):
+    """Metadados do job ({'user_id', 'session_id', 'status'}) ou None se inexistente/expirado"""
+    job = (
+        ChatJob.objects.filter(job_id=job_id, created_at__gte=_expiration_cutoff())
+        .values('user_id', 'session__session_id', 'status')
+        .first()
+    )
+    if job is None:
+        return None
+    return {'user_id': job['user_id'], 'session_id': job['session__session_id'], 'status': job['status']}
+
+
+def _set_status(job_id, status):
+    ChatJob.objects.filter(job_id=job_id).update(status=status, updated_at=timezone.now())
+
+
+def emit_event(job_id, event_type, **data):
+    """Acrescenta um evento ao job; os eventos são numerados a partir de 1"""
+    with transaction.atomic():
+        # O lock no job serializa a numeração entre threads que emitem eventos do mesmo job
+        job = ChatJob.objects.select_for_update().only('pk', 'event_count').get(job_id=job_id)
+        index = job.event_count + 1
+        ChatJob.objects.filter(pk=job.pk).update(event_count=index, updated_at=timezone.now())
+        ChatJobEvent.objects.create(job=job, index=index, event_type=event_type, data=data)
+    return index
+
+
+def get_events(job_id, after=0):
+    """Eventos do job posteriores ao índice after, em ordem: [(índice, evento)]"""
+    rows = ChatJobEvent.objects.filter(job__job_id=job_id, index__gt=after).order_by('index').values_list(
+        'index', 'event_type', 'data'
+    )
+    return [(index, {'type': event_type, **data}) for index, event_type, data in rows]
+
+
+def delete_expired_jobs():
+    """Remove jobs (e seus eventos) criados há mais de ALICE_JOB_TTL segundos"""
+    deleted, _ = ChatJob.objects.filter(created_at__lt=_expiration_cutoff()).delete()
+    return deleted
+
+
+def build_chat_reply(session, user_message, result):
+    """
+    Salva a resposta da Alice na sessão e monta o payload de resposta do chat
+    (mesmo formato de ChatResponseSerializer).
+    """
+    from .sql_interpreter import FRIENDLY_MESSAGES
+
+    if result['success']:
+        assistant_message = ConversationMessage.objects.create(
+            session=session,
+            message_type='ASSISTANT',
+            content=result['humanized_response'],
+            metadata={
+                'sql_query': result['sql_query'],
+                'result_count': result['result_count'],
+                'execution_time_ms': result['execution_time_ms']
+            }
+        )
+        reply = {
+            'success': True,
+            'session_id': session.session_id,
+            'response': result['humanized_response'],
+            'sql_query': result['sql_query'],
+            'data': result['data'],
+            'execution_time_ms': result['execution_time_ms'],
+            'result_count': result['result_count'],
+            'metadata': {
+                'user_message_id': user_message.id,
+                'assistant_message_id': assistant_message.id,
+                'query_log_id': result.get('query_log_id')
+            }
+        }
+    else:
+        # Usa mensagem amigável do resultado ou mensagem padrão
+        friendly_response = result.get('humanized_response', FRIENDLY_MESSAGES['internal_error'])
+
+        # Salva resposta como mensagem normal (não erro)
+        assistant_message = ConversationMessage.objects.create(
+            session=session,
+            message_type='ASSISTANT',
+            content=friendly_response,
+            metadata={'was_error': True}
+        )
+        reply = {
+            'success': True,
+            'session_id': session.session_id,
+            'response': friendly_response,
+            'metadata': {
+                'user_message_id': user_message.id,
+                'assistant_message_id': assistant_message.id
+            }
+        }
+
+    # Atualiza sessão
+    session.updated_at = timezone.now()
+    session.save(update_fields=['updated_at'])
+
+    return reply
+
+
+def start_chat_job(user, session, message, interpreter_factory=None):
+    """
+    Registra a mensagem do usuário e agenda o processamento em segundo plano.
+    Retorna o id do job.
+
+    interpreter_factory: callable sem argumentos que devolve o
+    SQLInterpreterService a usar (permite injetar serviços de teste).
+    """
+    user_message = ConversationMessage.objects.create(
+        session=session,
+        message_type='USER',
+        content=message
+    )
+
+    delete_expired_jobs()
+
+    job_id = uuid.uuid4().hex
+    ChatJob.objects.create(job_id=job_id, user=user, session=session, status=STATUS_QUEUED)
+    emit_event(job_id, 'queued', session_id=session.session_id)
+
+    # Só despacha após o commit, para que a thread enxergue a mensagem gravada.
+    # O contexto da requisição segue para a thread (roteamento da réplica de leitura)
+    context = contextvars.copy_context()
+    transaction.on_commit(lambda: get_executor().submit(
+        context.run, run_chat_job, job_id, session.pk, user_message.pk, message, interpreter_factory
+    ))
+    return job_id
+
+
+def run_chat_job(job_id, session_pk, user_message_pk, message, interpreter_factory=None):
+    """Executa o pipeline da Alice para o job, publicando o progresso como eventos"""
+    from .registry import get_sql_interpreter
+    from .sql_interpreter import FRIENDLY_MESSAGES
+
+    close_old_connections()
+    try:
+        _set_status(job_id, STATUS_RUNNING)
+        session = ConversationSession.objects.get(pk=session_pk)
+        user_message = ConversationMessage.objects.get(pk=user_message_pk)
+
+        interpreter = interpreter_factory() if interpreter_factory else get_sql_interpreter()
+
+        def progress(event_type, **data):
+            emit_event(job_id, event_type, **data)
+
+        result = interpreter.interpret_and_execute(message, session, progress_callback=progress)
+        reply = build_chat_reply(session, user_message, result)
+
+        emit_event(job_id, 'done', result=reply)
+        _set_status(job_id, STATUS_DONE)
+
+    except Exception as e:
+        logger.error(f"Erro no job {job_id} do chat com Alice: {str(e)}", exc_info=True)
+        emit_event(job_id, 'error', response=FRIENDLY_MESSAGES['internal_error'])
+        _set_status(job_id, STATUS_ERROR)
+
+    finally:
+        # Conexões da thread do pool não são fechadas pelo ciclo de requisição
+        connections.close_all()
@@ -0,0 +1,135 @@
+"""
+Cache de embeddings de texto em dois níveis.
+
+A chave é o hash do texto normalizado (espaços colapsados, minúsculas), do
+nome do modelo de embeddings e do tipo de tarefa, de modo que variações
+triviais da mesma pergunta reaproveitam o vetor, uma troca de modelo nunca
+devolve vetores antigos e o vetor de consulta (RETRIEVAL_QUERY) de um texto
+não é devolvido no lugar do vetor de documento (RETRIEVAL_DOCUMENT), nem o
+contrário.
+
+1. LRU em memória do processo (ALICE_EMBEDDING_CACHE_SIZE entradas)
+2. Cache do Django compartilhado entre processos (ALICE_EMBEDDING_CACHE_TTL s)
+
+Os contadores de acertos/faltas ficam em EmbeddingCache.stats().
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'alice_embedding:'
+
+# Tipos de tarefa: embed_query (perguntas) e embed_documents (indexação)
+TASK_QUERY = 'query'
+TASK_DOCUMENT = 'document'
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza o texto para a chave do cache"""
+    return ' '.join(text.split()).lower()
+
+
+class EmbeddingCache:
+    """Cache LRU local + cache compartilhado de embeddings de um modelo"""
+
+    def __init__(self, model: str, max_entries: int = None, timeout: int = None):
+        self.model = model
+        self.max_entries = max_entries if max_entries is not None else getattr(
+            settings, 'ALICE_EMBEDDING_CACHE_SIZE', 512
+        )
+        self.timeout = timeout if timeout is not None else getattr(
+            settings, 'ALICE_EMBEDDING_CACHE_TTL', 7 * 24 * 60 * 60
+        )
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def make_key(self, text: str, task: str) -> str:
+        digest = hashlib.sha256(f'{self.model}\x00{task}\x00{normalize_text(text)}'.encode()).hexdigest()
+        return f'{KEY_PREFIX}{digest}'
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _get_local(self, key):
+        with self._lock:
+            vector = self._local.get(key)
+            if vector is not None:
+                self._local.move_to_end(key)
+            return vector
+
+    def _set_local(self, key, vector):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._local[key] = vector
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, text: str, task: str) -> Optional[List[float]]:
+        """Embedding em cache para o texto, ou None"""
+        return self.get_many([text], task).get(text)
+
+    def get_many(self, texts: List[str], task: str) -> Dict[str, List[float]]:
+        """Embeddings em cache para os textos ({texto: vetor}, só os encontrados)"""
+        found = {}
+        pending = {}
+        for text in texts:
+            key = self.make_key(text, task)
+            vector = self._get_local(key)
+            if vector is not None:
+                found[text] = vector
+                self._count('local_hits')
+            else:
+                pending.setdefault(key, []).append(text)
+
+        if pending:
+            shared = cache.get_many(list(pending))
+            for key, text_list in pending.items():
+                vector = shared.get(key)
+                if vector is None:
+                    self._count('misses', len(text_list))
+                    continue
+                self._set_local(key, vector)
+                self._count('shared_hits', len(text_list))
+                for text in text_list:
+                    found[text] = vector
+
+        return found
+
+    def set(self, text: str, vector: List[float], task: str) -> None:
+        self.set_many({text: vector}, task)
+
+    def set_many(self, vectors: Dict[str, List[float]], task: str) -> None:
+        """Grava os embeddings nos dois níveis (vetores vazios são ignorados)"""
+        entries = {}
+        for text, vector in vectors.items():
+            if vector:
+                vector = list(vector)
+                key = self.make_key(text, task)
+                self._set_local(key, vector)
+                entries[key] = vector
+        if entries:
+            cache.set_many(entries, timeout=self.timeout)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de acertos por nível, faltas e tamanho do LRU local"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['local_entries'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -1,33 +1,36 @@
 import logging
-from typing import List, Optional, Dict, Any
+import time
+import hashlib
+from typing import Callable, List, Optional, Dict, Any
 from django.db import connection
 from django.conf import settings
 
 from ..models import DocumentEmbedding, ConversationEmbedding, ConversationSession, ConversationMessage
-from .gemini_service import GeminiService
+from .gemini_service import GeminiService, EMBEDDING_MODEL
+from .registry import is_pgvector_available
+from .vector_index import get_vector_index, invalidate_vector_index
 
 logger = logging.getLogger(__name__)
 
 
+def document_hash(document_type: str, title: str, content: str) -> str:
+    """Identifica o conteúdo indexado; muda também se o modelo de embedding mudar."""
+    return hashlib.sha256(f'{EMBEDDING_MODEL}\x00{document_type}\x00{title}\x00{content}'.encode()).hexdigest()
+
+
 class EmbeddingService:
     """
     Serviço para gerenciar embeddings e busca semântica com pgvector.
     Usa LangChain + Gemini para gerar embeddings e PostgreSQL + pgvector para armazenamento e busca.
     """
 
-    def __init__(self):
-        self.gemini_service = GeminiService()
-        self._pgvector_enabled = self._check_pgvector()
+    def __init__(self, gemini_service: GeminiService = None):
+        self.gemini_service = gemini_service or GeminiService()
 
-    def _check_pgvector(self) -> bool:
-        """Verifica se pgvector está disponível no banco."""
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'")
-                return cursor.fetchone() is not None
-        except Exception as e:
-            logger.warning(f"pgvector não disponível: {str(e)}")
-            return False
+    @property
+    def _pgvector_enabled(self) -> bool:
+        """Verifica se pgvector está disponível no banco (resultado em cache por alias)."""
+        return is_pgvector_available(connection.alias)
 
     def create_document_embedding(
         self,
@@ -61,7 +64,8 @@ class EmbeddingService:
                 title=title,
                 content=content,
                 metadata=metadata or {},
-                embedding=embedding
+                embedding=embedding,
+                content_hash=document_hash(document_type, title, content)
             )
 
             logger.info(f"Documento criado com embedding: {doc.id} - {title}")
@@ -237,49 +241,33 @@ class EmbeddingService:
         limit: int = 5,
         threshold: float = 0.7
     ) -> List[Dict[str, Any]]:
-        """Fallback para busca sem pgvector (usa similaridade de cosseno em Python)."""
-        import math
-
-        def cosine_similarity(a: List[float], b: List[float]) -> float:
-            if not a or not b or len(a) != len(b):
-                return 0.0
-            dot_product = sum(x * y for x, y in zip(a, b))
-            norm_a = math.sqrt(sum(x * x for x in a))
-            norm_b = math.sqrt(sum(x * x for x in b))
-            if norm_a == 0 or norm_b == 0:
-                return 0.0
-            return dot_product / (norm_a * norm_b)
-
+        """Fallback para busca sem pgvector (índice vetorial em memória)."""
         try:
-            queryset = DocumentEmbedding.objects.filter(is_active=True)
-            if document_type:
-                queryset = queryset.filter(document_type=document_type)
-
-            results = []
-            for doc in queryset:
-                if doc.embedding:
-                    # Embedding pode ser list (pgvector) ou JSON
-                    embedding = doc.embedding if isinstance(doc.embedding, list) else list(doc.embedding)
-                    similarity = cosine_similarity(query_embedding, embedding)
-
-                    if similarity >= threshold:
-                        results.append({
-                            'id': doc.id,
-                            'document_type': doc.document_type,
-                            'title': doc.title,
-                            'content': doc.content,
-                            'metadata': doc.metadata,
-                            'similarity': similarity
-                        })
-
-            # Ordena por similaridade e limita
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            return results[:limit]
+            hits = get_vector_index().search(query_embedding, [document_type], None, threshold)
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+            return self._load_hits(hits[:limit])
 
         except Exception as e:
             logger.error(f"Erro na busca fallback: {str(e)}")
             return []
 
+    def _load_hits(self, hits) -> List[Dict[str, Any]]:
+        """Carrega os documentos dos pares (id, similaridade), na mesma ordem."""
+        documents = DocumentEmbedding.objects.defer('embedding').in_bulk([doc_id for doc_id, _ in hits])
+        results = []
+        for doc_id, similarity in hits:
+            doc = documents.get(doc_id)
+            if doc is not None:
+                results.append({
+                    'id': doc.id,
+                    'document_type': doc.document_type,
+                    'title': doc.title,
+                    'content': doc.content,
+                    'metadata': doc.metadata,
+                    'similarity': similarity
+                })
+        return results
+
     def search_similar_conversations(
         self,
         query: str,
@@ -348,6 +336,133 @@ class EmbeddingService:
             logger.error(f"Erro na busca de conversas similares: {str(e)}")
             return []
 
+    def retrieve_context(
+        self,
+        query: str,
+        document_types: List[str],
+        limit_per_type: int = 3,
+        threshold: float = 0.5,
+        query_embedding: List[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Recupera os documentos mais similares de cada tipo com um único
+        embedding da query e uma única busca vetorial.
+
+        Args:
+            query: Pergunta do usuário
+            document_types: Tipos de documento a buscar (ex.: SCHEMA, FAQ)
+            limit_per_type: Limite de documentos por tipo
+            threshold: Limiar de similaridade (0-1)
+            query_embedding: Embedding da query já calculado (evita nova geração)
+
+        Returns:
+            Dict com documents (agrupados na ordem de document_types), context
+            (textos formatados para o prompt), backend e timings (ms por etapa)
+        """
+        started = time.perf_counter()
+        timings = {'embedding_ms': 0.0, 'search_ms': 0.0, 'total_ms': 0.0}
+        result = {'documents': [], 'context': [], 'backend': None, 'timings': timings}
+
+        if not document_types:
+            return result
+
+        try:
+            if not query_embedding:
+                query_embedding = self.gemini_service.get_embedding(query)
+                timings['embedding_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+            if not query_embedding:
+                logger.error("Falha ao gerar embedding para query")
+                return result
+
+            search_started = time.perf_counter()
+            if self._pgvector_enabled:
+                result['backend'] = 'pgvector'
+                documents = self._search_by_type_with_pgvector(
+                    query_embedding, document_types, limit_per_type, threshold
+                )
+            else:
+                result['backend'] = 'python'
+                documents = self._search_by_type_fallback(
+                    query_embedding, document_types, limit_per_type, threshold
+                )
+            timings['search_ms'] = round((time.perf_counter() - search_started) * 1000, 2)
+
+            # Mantém a ordem dos tipos pedida (schema, regras, FAQs)
+            type_order = {doc_type: position for position, doc_type in enumerate(document_types)}
+            documents.sort(key=lambda doc: (type_order.get(doc['document_type'], len(type_order)), -doc['similarity']))
+
+            result['documents'] = documents
+            result['context'] = [
+                f"[{doc['document_type']}] {doc['title']}:\n{doc['content']}" for doc in documents
+            ]
+
+        except Exception as e:
+            logger.error(f"Erro na recuperação de contexto: {str(e)}")
+
+        finally:
+            timings['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+        return result
+
+    def _search_by_type_with_pgvector(
+        self,
+        query_embedding: List[float],
+        document_types: List[str],
+        limit_per_type: int,
+        threshold: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k por tipo em uma consulta: UNION ALL de um SELECT ordenado por
+        distância para cada tipo, o que mantém o uso do índice HNSW.
+        """
+        try:
+            embedding_str = f"[{','.join(map(str, query_embedding))}]"
+
+            branch = """
+                (SELECT
+                    id,
+                    document_type,
+                    title,
+                    content,
+                    metadata,
+                    1 - (embedding <=> %s::vector) as similarity
+                FROM ai_assistant_documentembedding
+                WHERE is_active = true
+                AND document_type = %s
+                AND 1 - (embedding <=> %s::vector) >= %s
+                ORDER BY embedding <=> %s::vector
+                LIMIT %s)
+            """
+            params = []
+            for doc_type in document_types:
+                params.extend([embedding_str, doc_type, embedding_str, threshold, embedding_str, limit_per_type])
+
+            with connection.cursor() as cursor:
+                cursor.execute(" UNION ALL ".join([branch] * len(document_types)), params)
+                columns = [col[0] for col in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Erro na busca pgvector: {str(e)}")
+            return self._search_by_type_fallback(query_embedding, document_types, limit_per_type, threshold)
+
+    def _search_by_type_fallback(
+        self,
+        query_embedding: List[float],
+        document_types: List[str],
+        limit_per_type: int,
+        threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Fallback sem pgvector: top-k por tipo no índice vetorial em memória."""
+        try:
+            hits = get_vector_index().search(query_embedding, document_types, limit_per_type, threshold)
+            return self._load_hits(hits)
+
+        except Exception as e:
+            logger.error(f"Erro na busca fallback: {str(e)}")
+            return []
+
     def get_context_for_query(
         self,
         query: str,
@@ -369,8 +484,6 @@ class EmbeddingService:
         Returns:
             Lista de conteúdos de documentos relevantes
         """
-        context_docs = []
-
         types_to_search = []
         if include_schema:
             types_to_search.append('SCHEMA')
@@ -379,52 +492,144 @@ class EmbeddingService:
         if include_faqs:
             types_to_search.append('FAQ')
 
-        for doc_type in types_to_search:
-            results = self.search_similar_documents(
-                query=query,
-                document_type=doc_type,
-                limit=limit_per_type,
-                threshold=0.5
-            )
-            for doc in results:
-                context_docs.append(f"[{doc['document_type']}] {doc['title']}:\n{doc['content']}")
-
-        return context_docs
+        return self.retrieve_context(
+            query=query,
+            document_types=types_to_search,
+            limit_per_type=limit_per_type,
+            threshold=0.5
+        )['context']
 
-    def index_database_schema(self, schema_info: str) -> int:
+    def index_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        replace_types: List[str] = None,
+        batch_size: int = 50,
+        on_batch: Callable[[int, int], None] = None
+    ) -> Dict[str, int]:
         """
-        Indexa informações do schema do banco como documentos vetorizados.
+        Indexa documentos em lote: documentos já indexados com o mesmo
+        conteúdo são ignorados (content_hash), os demais são vetorizados com
+        get_embeddings_batch e gravados com bulk_create, um lote por vez.
+
+        Como cada lote gravado passa a ser ignorado, uma execução
+        interrompida é retomada de onde parou. Os documentos antigos dos
+        tipos em replace_types que não estão mais na lista só são removidos
+        quando todos os lotes forem gravados.
 
         Args:
-            schema_info: String com informações do schema
+            documents: Dicts com document_type, title, content e metadata
+            replace_types: Tipos cujo conteúdo é substituído por documents
+            batch_size: Documentos por chamada de embeddings
+            on_batch: Callback chamado com (processados, pendentes) após cada lote
 
         Returns:
-            Número de documentos criados
+            Dict com created, skipped, removed e batches
         """
-        # Remove documentos antigos de schema
-        DocumentEmbedding.objects.filter(document_type='SCHEMA').delete()
+        stats = {'created': 0, 'skipped': 0, 'removed': 0, 'batches': 0}
+
+        unique = {}
+        for document in documents:
+            content_hash = document_hash(document['document_type'], document['title'], document['content'])
+            unique.setdefault(content_hash, document)
 
-        # Divide o schema em partes menores para melhor recuperação
-        tables = schema_info.split('\n\n')
-        created = 0
+        existing = set(
+            DocumentEmbedding.objects.filter(content_hash__in=list(unique), is_active=True)
+            .values_list('content_hash', flat=True)
+        )
+        pending = [(content_hash, doc) for content_hash, doc in unique.items() if content_hash not in existing]
+        stats['skipped'] = len(unique) - len(pending)
 
-        for table_info in tables:
+        try:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                embeddings = self.gemini_service.get_embeddings_batch([doc['content'] for _, doc in batch])
+                if len(embeddings) != len(batch):
+                    raise RuntimeError('Falha ao gerar embeddings do lote')
+
+                DocumentEmbedding.objects.bulk_create([
+                    DocumentEmbedding(
+                        document_type=doc['document_type'],
+                        title=doc['title'][:255],
+                        content=doc['content'],
+                        metadata=doc.get('metadata') or {},
+                        embedding=embedding,
+                        content_hash=content_hash
+                    )
+                    for (content_hash, doc), embedding in zip(batch, embeddings)
+                ])
+                stats['created'] += len(batch)
+                stats['batches'] += 1
+                if on_batch:
+                    on_batch(stats['created'], len(pending) - stats['created'])
+
+            if replace_types:
+                stale = DocumentEmbedding.objects.filter(
+                    document_type__in=replace_types
+                ).exclude(content_hash__in=list(unique))
+                stats['removed'] = stale.delete()[0]
+
+        finally:
+            # bulk_create não dispara sinais: atualiza o índice da busca sem pgvector
+            if stats['created']:
+                invalidate_vector_index()
+
+        logger.info(
+            f"Indexação: {stats['created']} criados, {stats['skipped']} inalterados, "
+            f"{stats['removed']} removidos em {stats['batches']} lote(s)"
+        )
+        return stats
+
+    @staticmethod
+    def schema_documents(schema_info: str) -> List[Dict[str, Any]]:
+        """Divide o schema em documentos por tabela para melhor recuperação."""
+        documents = []
+        for table_info in schema_info.split('\n\n'):
             if table_info.strip():
                 # Extrai nome da tabela
                 lines = table_info.strip().split('\n')
-                title = lines[0] if lines else 'Schema'
+                documents.append({
+                    'document_type': 'SCHEMA',
+                    'title': lines[0] if lines else 'Schema',
+                    'content': table_info.strip(),
+                    'metadata': {'source': 'database_schema'}
+                })
+        return documents
+
+    @staticmethod
+    def faq_document(question: str, answer: str, metadata: Dict = None) -> Dict[str, Any]:
+        return {
+            'document_type': 'FAQ',
+            'title': question,
+            'content': f"Pergunta: {question}\nResposta: {answer}",
+            'metadata': metadata
+        }
+
+    @staticmethod
+    def query_example_document(natural_language: str, sql_query: str, explanation: str = None) -> Dict[str, Any]:
+        content = f"Pergunta: {natural_language}\nSQL: {sql_query}"
+        if explanation:
+            content += f"\nExplicação: {explanation}"
+        return {
+            'document_type': 'QUERY_EXAMPLE',
+            'title': natural_language[:100],
+            'content': content,
+            'metadata': {'sql': sql_query}
+        }
 
-                doc = self.create_document_embedding(
-                    document_type='SCHEMA',
-                    title=title,
-                    content=table_info.strip(),
-                    metadata={'source': 'database_schema'}
-                )
-                if doc:
-                    created += 1
+    def index_database_schema(self, schema_info: str) -> int:
+        """
+        Indexa informações do schema do banco como documentos vetorizados.
+        Tabelas inalteradas não são vetorizadas novamente.
 
-        logger.info(f"Indexados {created} documentos de schema")
-        return created
+        Args:
+            schema_info: String com informações do schema
+
+        Returns:
+            Número de documentos criados
+        """
+        stats = self.index_documents(self.schema_documents(schema_info), replace_types=['SCHEMA'])
+        logger.info(f"Indexados {stats['created']} documentos de schema")
+        return stats['created']
 
     def add_business_rule(self, title: str, content: str, metadata: Dict = None) -> Optional[DocumentEmbedding]:
         """Adiciona uma regra de negócio ao índice."""
@@ -437,12 +642,7 @@ class EmbeddingService:
 
     def add_faq(self, question: str, answer: str, metadata: Dict = None) -> Optional[DocumentEmbedding]:
         """Adiciona uma FAQ ao índice."""
-        return self.create_document_embedding(
-            document_type='FAQ',
-            title=question,
-            content=f"Pergunta: {question}\nResposta: {answer}",
-            metadata=metadata
-        )
+        return self.create_document_embedding(**self.faq_document(question, answer, metadata))
 
     def add_query_example(
         self,
@@ -451,13 +651,6 @@ class EmbeddingService:
         explanation: str = None
     ) -> Optional[DocumentEmbedding]:
         """Adiciona um exemplo de consulta ao índice."""
-        content = f"Pergunta: {natural_language}\nSQL: {sql_query}"
-        if explanation:
-            content += f"\nExplicação: {explanation}"
-
         return self.create_document_embedding(
-            document_type='QUERY_EXAMPLE',
-            title=natural_language[:100],
-            content=content,
-            metadata={'sql': sql_query}
+            **self.query_example_document(natural_language, sql_query, explanation)
         )
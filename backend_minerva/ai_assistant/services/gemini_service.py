@@ -10,6 +10,8 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import JsonOutputParser
 
+from .embedding_cache import TASK_DOCUMENT, TASK_QUERY, EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 # Personalidade da Alice
@@ -44,6 +46,8 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
 É só me dizer o que você precisa!"
 """
 
+EMBEDDING_MODEL = "models/text-embedding-004"
+
 ALICE_FRIENDLY_ERROR = """
 Desculpe, não consegui entender sua solicitação dessa vez.
 Pode reformular a pergunta ou me dar mais detalhes? 😊
@@ -70,10 +74,13 @@ class GeminiService:
 
         # Modelo de embeddings para vetorização
         self.embeddings_model = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004",
+            model=EMBEDDING_MODEL,
             google_api_key=self.api_key,
         )
 
+        # Cache de embeddings (LRU local + cache compartilhado)
+        self.embedding_cache = EmbeddingCache(model=EMBEDDING_MODEL)
+
     def get_embedding(self, text: str) -> List[float]:
         """
         Gera embedding para um texto.
@@ -84,15 +91,23 @@ class GeminiService:
         Returns:
             Lista de floats representando o embedding
         """
+        cached = self.embedding_cache.get(text, TASK_QUERY)
+        if cached is not None:
+            return cached
+
         try:
-            return self.embeddings_model.embed_query(text)
+            embedding = self.embeddings_model.embed_query(text)
         except Exception as e:
             logger.error(f"Erro ao gerar embedding: {str(e)}")
             return []
 
+        self.embedding_cache.set(text, embedding, TASK_QUERY)
+        return embedding
+
     def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Gera embeddings para múltiplos textos em batch.
+        Só os textos ausentes do cache são enviados à API.
 
         Args:
             texts: Lista de textos
@@ -100,19 +115,41 @@ class GeminiService:
         Returns:
             Lista de embeddings
         """
-        try:
-            return self.embeddings_model.embed_documents(texts)
-        except Exception as e:
-            logger.error(f"Erro ao gerar embeddings em batch: {str(e)}")
-            return []
+        cached = self.embedding_cache.get_many(texts, TASK_DOCUMENT)
+        missing = list(dict.fromkeys(text for text in texts if text not in cached))
 
-    def generate_response(self, prompt: str, system_instruction: str = None) -> Dict[str, Any]:
+        if missing:
+            try:
+                embeddings = self.embeddings_model.embed_documents(missing)
+            except Exception as e:
+                logger.error(f"Erro ao gerar embeddings em batch: {str(e)}")
+                return []
+
+            generated = dict(zip(missing, embeddings))
+            self.embedding_cache.set_many(generated, TASK_DOCUMENT)
+            cached.update(generated)
+
+        return [cached[text] for text in texts]
+
+    @staticmethod
+    def _stream_content(runnable, payload, on_token) -> str:
+        """Consome a resposta em streaming, repassando cada trecho para on_token."""
+        parts = []
+        for chunk in runnable.stream(payload):
+            text = chunk.content if isinstance(chunk.content, str) else ''
+            if text:
+                parts.append(text)
+                on_token(text)
+        return ''.join(parts)
+
+    def generate_response(self, prompt: str, system_instruction: str = None, on_token=None) -> Dict[str, Any]:
         """
         Gera uma resposta usando o modelo Gemini via LangChain.
 
         Args:
             prompt: O prompt para enviar ao modelo
             system_instruction: Instrução do sistema (opcional)
+            on_token: Callback chamado com cada trecho gerado (ativa streaming)
 
         Returns:
             Dict com a resposta e metadados
@@ -125,7 +162,11 @@ class GeminiService:
 
             messages.append(HumanMessage(content=prompt))
 
-            response = self.chat_model.invoke(messages)
+            if on_token:
+                content = self._stream_content(self.chat_model, messages, on_token)
+                response = AIMessage(content=content)
+            else:
+                response = self.chat_model.invoke(messages)
 
             return {
                 'success': True,
@@ -154,7 +195,8 @@ class GeminiService:
         prompt: str,
         context_documents: List[str],
         system_instruction: str = None,
-        chat_history: List[Dict] = None
+        chat_history: List[Dict] = None,
+        on_token=None
     ) -> Dict[str, Any]:
         """
         Gera resposta usando RAG com documentos de contexto.
@@ -164,6 +206,7 @@ class GeminiService:
             context_documents: Lista de documentos relevantes recuperados via similaridade
             system_instruction: Instrução do sistema
             chat_history: Histórico de mensagens anteriores
+            on_token: Callback chamado com cada trecho gerado (ativa streaming)
 
         Returns:
             Dict com a resposta e metadados
@@ -196,12 +239,16 @@ Use o contexto acima para responder às perguntas quando relevante."""),
             # Cria a chain
             chain = rag_template | self.chat_model
 
-            response = chain.invoke({
+            payload = {
                 "system_instruction": system_instruction or "Você é Alice, assistente do Sistema Minerva.",
                 "context": context_str,
                 "chat_history": history_messages,
                 "question": prompt
-            })
+            }
+            if on_token:
+                response = AIMessage(content=self._stream_content(chain, payload, on_token))
+            else:
+                response = chain.invoke(payload)
 
             return {
                 'success': True,
@@ -311,7 +358,8 @@ Use o contexto acima para responder às perguntas quando relevante."""),
         query_result: Any,
         original_question: str,
         sql_query: str,
-        context_documents: List[str] = None
+        context_documents: List[str] = None,
+        on_token=None
     ) -> Dict[str, Any]:
         """
         Gera uma resposta humanizada baseada nos resultados da consulta.
@@ -322,6 +370,7 @@ Use o contexto acima para responder às perguntas quando relevante."""),
             original_question: Pergunta original do usuário
             sql_query: Consulta SQL executada
             context_documents: Documentos de contexto para RAG (opcional)
+            on_token: Callback chamado com cada trecho gerado (ativa streaming)
 
         Returns:
             Dict com resposta humanizada
@@ -362,7 +411,8 @@ Use o contexto acima para responder às perguntas quando relevante."""),
             return self.generate_response_with_context(
                 prompt=prompt,
                 context_documents=context_documents,
-                system_instruction=system_instruction
+                system_instruction=system_instruction,
+                on_token=on_token
             )
 
-        return self.generate_response(prompt, system_instruction)
+        return self.generate_response(prompt, system_instruction, on_token=on_token)
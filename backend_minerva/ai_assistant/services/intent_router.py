@@ -0,0 +1,372 @@
+"""
+Roteador de intenções da Alice, compilado em um autômato de palavras-chave.
+
+Saudações, palavras de dados, consultas predefinidas e palavras de
+preenchimento ("listar", "os", "todos"...) são compiladas em um único
+autômato Aho-Corasick sobre o texto normalizado (minúsculas, sem acentos,
+pontuação trocada por espaço). Uma única passada pela pergunta classifica a
+mensagem como:
+
+- GREETING: saudação/conversa casual sem palavras de dados;
+- PREDEFINED: a pergunta é só uma consulta predefinida mais palavras de
+  preenchimento ("Listar os contratos!" -> 'contratos');
+- CACHED: a mesma pergunta normalizada já foi respondida no mesmo escopo
+  (answer_cache.find_intent), sem chamar a API de embeddings;
+- LLM: precisa de interpretação pelo Gemini.
+
+As listas padrão podem ser estendidas por AliceConfiguration (valores JSON):
+- router_greetings: {"thanks": [...], "farewell": [...], "help": [...], "hello": [...]}
+- router_data_keywords / router_fillers: lista de palavras
+- router_predefined_queries: {"frase": {"sql": "...", "intent": "..."}}
+
+O autômato é montado uma vez por processo e remontado quando a versão no
+cache muda (alteração de AliceConfiguration, ver signals).
+"""
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'alice_intent_router:version'
+CONFIG_KEYS = ('router_greetings', 'router_data_keywords', 'router_fillers', 'router_predefined_queries')
+
+GREETING = 'greeting'
+PREDEFINED = 'predefined'
+CACHED = 'cached'
+LLM = 'llm'
+
+# Ordem de prioridade da resposta quando há mais de um tipo de saudação
+GREETING_KINDS = ('thanks', 'farewell', 'help', 'hello')
+
+DEFAULT_GREETINGS = {
+    'thanks': ['obrigado', 'obrigada', 'valeu'],
+    'farewell': ['tchau', 'até mais'],
+    'help': ['ajuda', 'help', 'o que você faz', 'quem é você'],
+    'hello': [
+        'oi', 'olá', 'hi', 'hello', 'hey', 'e ai', 'eai',
+        'bom dia', 'boa tarde', 'boa noite', 'tudo bem', 'como vai',
+    ],
+}
+
+# Palavras que indicam consulta de dados (casam também como prefixo: 'contrato' -> 'contratos')
+DEFAULT_DATA_KEYWORDS = [
+    'contrato', 'auxilio', 'funcionario', 'colaborador', 'orcamento', 'budget',
+    'valor', 'total', 'lista', 'mostra', 'buscar', 'busca', 'encontrar', 'pesquisar',
+    'quant', 'quais', 'qual', 'todos', 'todas', 'ativo', 'vencid',
+    'setor', 'direcao', 'gerencia', 'coordenacao', 'centro', 'gestor', 'solicitante',
+]
+
+# Palavras ignoradas ao reconhecer uma consulta predefinida
+DEFAULT_FILLERS = [
+    'listar', 'liste', 'lista', 'mostrar', 'mostre', 'mostra', 'exibir', 'exiba', 'ver',
+    'todos', 'todas', 'os', 'as', 'o', 'a', 'de', 'do', 'da', 'dos', 'das',
+    'me', 'quais', 'sao', 'por favor', 'favor', 'cadastrados', 'cadastradas',
+]
+
+_AUXILIOS_SQL = 'SELECT a.id, e.full_name as funcionario, a.type as tipo, a.total_amount as valor, a.status, a.start_date as inicio FROM aid_assistance a JOIN employee_employee e ON a.employee_id = e.id ORDER BY a.start_date DESC LIMIT 20'
+_FUNCIONARIOS_SQL = 'SELECT id, full_name as nome, email, position as cargo, department as departamento, status FROM employee_employee ORDER BY full_name LIMIT 30'
+
+# Consultas predefinidas para palavras-chave simples (economiza API e é mais confiável)
+PREDEFINED_QUERIES = {
+    'auxilios': {
+        'sql': _AUXILIOS_SQL,
+        'intent': 'Listar auxílios cadastrados'
+    },
+    'contratos': {
+        'sql': 'SELECT id, protocol_number as protocolo, description as descricao, current_value as valor, status, start_date as inicio, end_date as fim FROM contract_contract ORDER BY created_at DESC LIMIT 20',
+        'intent': 'Listar contratos cadastrados'
+    },
+    'funcionarios': {
+        'sql': _FUNCIONARIOS_SQL,
+        'intent': 'Listar funcionários cadastrados'
+    },
+    'colaboradores': {
+        'sql': _FUNCIONARIOS_SQL,
+        'intent': 'Listar colaboradores cadastrados'
+    },
+    'orcamentos': {
+        'sql': 'SELECT id, year as ano, category as categoria, total_amount as valor_total, available_amount as disponivel, status FROM budget_budget ORDER BY year DESC LIMIT 20',
+        'intent': 'Listar orçamentos cadastrados'
+    },
+    'setores': {
+        'sql': 'SELECT id, name as nome, is_active as ativo FROM sector_direction ORDER BY name LIMIT 30',
+        'intent': 'Listar setores/direções cadastrados'
+    },
+    'centros': {
+        'sql': 'SELECT id, name as nome, code as codigo, is_active as ativo FROM center_management_center ORDER BY name LIMIT 30',
+        'intent': 'Listar centros gestores cadastrados'
+    },
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_question(text: str) -> str:
+    """Minúsculas, sem acentos e com as palavras separadas por um espaço"""
+    text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD.sub(' ', text).strip()
+
+
+class KeywordAutomaton:
+    """
+    Autômato Aho-Corasick sobre as palavras do texto normalizado: cada
+    transição consome uma palavra inteira, então frases ("bom dia") e
+    palavras isoladas casam sempre em limites de palavra. Padrões de prefixo
+    (uma palavra) casam com qualquer palavra iniciada por eles; o resultado
+    por palavra fica memorizado, já que o vocabulário das perguntas é pequeno.
+    """
+
+    MAX_MEMO_WORDS = 20000
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[list] = [[]]
+        self._prefixes: Dict[str, list] = {}
+        self._prefix_sizes: List[int] = []
+        self._prefix_memo: Dict[str, tuple] = {}
+
+    def add(self, pattern: str, payload, prefix: bool = False) -> None:
+        words = normalize_question(pattern).split()
+        if not words:
+            return
+        if prefix and len(words) == 1:
+            self._prefixes.setdefault(words[0], []).append(payload)
+            return
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(words), payload))
+
+    def compile(self) -> 'KeywordAutomaton':
+        """Calcula os links de falha (busca em largura) e herda as saídas"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(word, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._prefix_sizes = sorted({len(prefix) for prefix in self._prefixes})
+        return self
+
+    def iter_matches(self, words: List[str]):
+        """(primeira palavra, palavra seguinte ao fim, payload) de cada padrão encontrado"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        memo = self._prefix_memo
+        state = 0
+        for position, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            end = position + 1
+            for size, payload in outputs[state]:
+                yield end - size, end, payload
+            prefix_payloads = memo.get(word)
+            if prefix_payloads is None:
+                prefix_payloads = self._match_prefixes(word)
+            for payload in prefix_payloads:
+                yield position, end, payload
+
+    def _match_prefixes(self, word: str) -> tuple:
+        payloads = []
+        for size in self._prefix_sizes:
+            if size > len(word):
+                break
+            payloads.extend(self._prefixes.get(word[:size], ()))
+        if len(self._prefix_memo) >= self.MAX_MEMO_WORDS:
+            self._prefix_memo.clear()
+        self._prefix_memo[word] = payloads = tuple(payloads)
+        return payloads
+
+
+class Route:
+    """Resultado da classificação de uma pergunta"""
+
+    def __init__(self, kind: str, key: str, greeting_kind: str = None,
+                 predefined_key: str = None, predefined: Dict[str, str] = None, cached_log=None):
+        self.kind = kind
+        self.key = key
+        self.greeting_kind = greeting_kind
+        self.predefined_key = predefined_key
+        self.predefined = predefined
+        self.cached_log = cached_log
+
+    def __repr__(self):
+        return f'Route({self.kind}, {self.key!r})'
+
+
+class IntentRouter:
+    """Classificador compilado (saudação, predefinida, em cache ou LLM)"""
+
+    def __init__(self, greetings: Dict[str, Iterable[str]], data_keywords: Iterable[str],
+                 fillers: Iterable[str], predefined_queries: Dict[str, Dict[str, str]], version=None):
+        self.version = version
+        self.predefined_queries = {}
+        automaton = KeywordAutomaton()
+        for kind, phrases in greetings.items():
+            for phrase in phrases:
+                automaton.add(phrase, ('greeting', kind))
+        for keyword in data_keywords:
+            automaton.add(keyword, ('data', None), prefix=True)
+        for filler in fillers:
+            automaton.add(filler, ('filler', None))
+        for phrase, query in predefined_queries.items():
+            key = normalize_question(phrase)
+            if key and query.get('sql'):
+                self.predefined_queries[key] = query
+                automaton.add(key, ('predefined', key))
+        self.automaton = automaton.compile()
+
+    def classify(self, text: str) -> Route:
+        """Classificação sem consulta ao cache de respostas (GREETING, PREDEFINED ou LLM)"""
+        key = normalize_question(text)
+        words = key.split()
+
+        greeting_kinds = set()
+        predefined_keys = set()
+        has_data = False
+        covered = [False] * len(words)
+        for start, end, (category, value) in self.automaton.iter_matches(words):
+            if category == 'greeting':
+                greeting_kinds.add(value)
+                continue
+            if category == 'data':
+                has_data = True
+                continue
+            if category == 'predefined':
+                has_data = True
+                predefined_keys.add(value)
+            covered[start:end] = [True] * (end - start)
+
+        if len(predefined_keys) == 1 and all(covered):
+            predefined_key = predefined_keys.pop()
+            return Route(
+                PREDEFINED, key,
+                predefined_key=predefined_key, predefined=self.predefined_queries[predefined_key]
+            )
+
+        if not has_data and (greeting_kinds or len(key) < 4):
+            greeting_kind = next((kind for kind in GREETING_KINDS if kind in greeting_kinds), 'hello')
+            return Route(GREETING, key, greeting_kind=greeting_kind)
+
+        return Route(LLM, key)
+
+    def lookup_cached(self, route: Route, scope: str) -> Route:
+        """
+        Pergunta que iria ao LLM e já foi respondida no mesmo escopo sai como
+        CACHED (mesma pergunta normalizada, log ainda válido)
+        """
+        if route.kind != LLM:
+            return route
+
+        from . import answer_cache
+
+        if answer_cache.is_enabled():
+            cached_log = answer_cache.find_intent(route.key, scope)
+            if cached_log is not None:
+                return Route(CACHED, route.key, cached_log=cached_log)
+        return route
+
+    def route(self, text: str, scope: str = None) -> Route:
+        """Classificação completa; CACHED só é considerado com o escopo do usuário"""
+        route = self.classify(text)
+        return self.lookup_cached(route, scope) if scope is not None else route
+
+
+def _load_configured_entries() -> Dict[str, object]:
+    """Valores JSON das chaves router_* ativas em AliceConfiguration"""
+    from ..models import AliceConfiguration
+
+    entries = {}
+    for config in AliceConfiguration.objects.filter(key__in=CONFIG_KEYS, is_active=True):
+        try:
+            entries[config.key] = json.loads(config.value)
+        except ValueError:
+            logger.warning(f"Configuração '{config.key}' do roteador ignorada: JSON inválido")
+    return entries
+
+
+def build_intent_router(version=None) -> IntentRouter:
+    """Roteador com as listas padrão mais as entradas de AliceConfiguration"""
+    entries = _load_configured_entries()
+
+    greetings = {kind: list(phrases) for kind, phrases in DEFAULT_GREETINGS.items()}
+    extra_greetings = entries.get('router_greetings')
+    if isinstance(extra_greetings, dict):
+        for kind, phrases in extra_greetings.items():
+            if kind in GREETING_KINDS and isinstance(phrases, list):
+                greetings[kind].extend(phrases)
+
+    data_keywords = list(DEFAULT_DATA_KEYWORDS)
+    if isinstance(entries.get('router_data_keywords'), list):
+        data_keywords.extend(entries['router_data_keywords'])
+
+    fillers = list(DEFAULT_FILLERS)
+    if isinstance(entries.get('router_fillers'), list):
+        fillers.extend(entries['router_fillers'])
+
+    predefined_queries = dict(PREDEFINED_QUERIES)
+    extra_queries = entries.get('router_predefined_queries')
+    if isinstance(extra_queries, dict):
+        predefined_queries.update(
+            (phrase, query) for phrase, query in extra_queries.items() if isinstance(query, dict)
+        )
+
+    return IntentRouter(greetings, data_keywords, fillers, predefined_queries, version=version)
+
+
+def get_router_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_router_version() -> None:
+    """Força a remontagem do roteador em todos os processos"""
+    global _router
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _router = None
+
+
+_router = None
+_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    """Roteador do processo para a versão atual da configuração"""
+    global _router
+
+    version = get_router_version()
+    router = _router
+    if router is not None and router.version == version:
+        return router
+
+    with _lock:
+        router = _router
+        if router is None or router.version != version:
+            router = _router = build_intent_router(version)
+    return router
@@ -0,0 +1,65 @@
+"""
+Execução concorrente das etapas independentes do pipeline da Alice.
+
+As etapas são dominadas por I/O (API do Gemini, banco, cache), então um pool
+de threads compartilhado basta para sobrepô-las: o tempo do grupo passa a ser
+o da etapa mais lenta em vez da soma. Cada tarefa roda com as próprias
+conexões de banco, descartadas ao final conforme CONN_MAX_AGE.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de threads das etapas (criado no primeiro uso)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'ALICE_PIPELINE_WORKERS', 8),
+                    thread_name_prefix='alice-stage'
+                )
+    return _executor
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _run_task(task: Callable[[], Any]) -> Tuple[Any, float]:
+    close_old_connections()
+    started = time.perf_counter()
+    try:
+        return task(), elapsed_ms(started)
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Executa as tarefas em paralelo e aguarda todas.
+
+    Returns:
+        (resultados por nome, tempo de cada tarefa em ms). A primeira exceção
+        encontrada é propagada depois que todas as tarefas terminam.
+    """
+    futures = {name: get_executor().submit(_run_task, task) for name, task in tasks.items()}
+
+    results, timings, error = {}, {}, None
+    for name, future in futures.items():
+        try:
+            results[name], timings[name] = future.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results, timings
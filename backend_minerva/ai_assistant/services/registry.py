@@ -0,0 +1,83 @@
+"""
+Registro dos serviços da Alice compartilhados pelo processo.
+
+GeminiService, EmbeddingService e SQLInterpreterService não guardam estado
+por requisição, então uma única instância de cada é criada no primeiro uso e
+reaproveitada por todas as requisições e threads (views e jobs do chat). Com
+isso os clientes do Gemini (chat e embeddings), e as conexões que mantêm com
+a API, são criados uma vez por processo em vez de uma vez por mensagem.
+
+A verificação da extensão pgvector também fica em cache, por alias de banco.
+reset_services() descarta tudo (testes ou troca de configuração).
+"""
+import logging
+import threading
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_services = {}
+_pgvector_by_alias = {}
+
+
+def _get_or_create(name, factory):
+    service = _services.get(name)
+    if service is None:
+        with _lock:
+            service = _services.get(name)
+            if service is None:
+                service = _services[name] = factory()
+    return service
+
+
+def get_gemini_service():
+    """GeminiService compartilhado (clientes de chat e embeddings)"""
+    from .gemini_service import GeminiService
+
+    return _get_or_create('gemini', GeminiService)
+
+
+def get_embedding_service():
+    """EmbeddingService compartilhado, usando o GeminiService do registro"""
+    from .embedding_service import EmbeddingService
+
+    return _get_or_create('embedding', lambda: EmbeddingService(gemini_service=get_gemini_service()))
+
+
+def get_sql_interpreter():
+    """SQLInterpreterService compartilhado, usando os serviços do registro"""
+    from .sql_interpreter import SQLInterpreterService
+
+    return _get_or_create('sql_interpreter', lambda: SQLInterpreterService(
+        gemini_service=get_gemini_service(),
+        embedding_service=get_embedding_service()
+    ))
+
+
+def is_pgvector_available(alias='default'):
+    """Verifica (uma vez por alias) se a extensão pgvector está instalada no banco"""
+    available = _pgvector_by_alias.get(alias)
+    if available is None:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            available = False
+        else:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'")
+                    available = cursor.fetchone() is not None
+            except Exception as e:
+                logger.warning(f"pgvector não disponível: {str(e)}")
+                # Falha transitória: não guarda o resultado para tentar de novo
+                return False
+        _pgvector_by_alias[alias] = available
+    return available
+
+
+def reset_services():
+    """Descarta as instâncias compartilhadas e o cache da verificação do pgvector"""
+    with _lock:
+        _services.clear()
+        _pgvector_by_alias.clear()
@@ -0,0 +1,158 @@
+"""
+Texto do schema enviado ao Gemini, montado uma vez e mantido em memória.
+
+O schema renderizado é dividido em blocos por tabela, cada um com uma
+variante completa e uma enxuta (sem valores de exemplo e defaults). O
+artefato fica no cache do Django sob uma versão e, em cada processo, em
+memória: depois de montado, obter o schema custa apenas a leitura da versão.
+
+A versão é incrementada após migrações (post_migrate), alterações em
+DatabaseSchema e ao final de populate_database_schema. Por pergunta, o
+prompt pode ser reduzido às tabelas apontadas pelo RAG e limitado a
+ALICE_SCHEMA_TOKEN_BUDGET tokens (estimativa de 4 caracteres por token).
+"""
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'alice_schema:version'
+ARTIFACT_KEY_PREFIX = 'alice_schema:artifact:'
+CHARS_PER_TOKEN = 4
+
+TABLE_MARKER = 'TABELA: '
+_SAMPLE_LINE = re.compile(r'^\s+Exemplos:.*$\n?', re.MULTILINE)
+_SAMPLE_SUFFIX = re.compile(r' - Exemplos: .*$', re.MULTILINE)
+_DEFAULT_SUFFIX = re.compile(r' DEFAULT [^\n]*?(?= - |$)', re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def trim_block(block: str) -> str:
+    """Variante enxuta de um bloco de tabela: sem exemplos e valores padrão"""
+    block = _SAMPLE_LINE.sub('', block)
+    block = _SAMPLE_SUFFIX.sub('', block)
+    return _DEFAULT_SUFFIX.sub('', block)
+
+
+class SchemaArtifact:
+    """Schema renderizado: cabeçalho e blocos (completo/enxuto) por tabela"""
+
+    def __init__(self, version, header: str, blocks: Dict[str, str]):
+        self.version = version
+        self.header = header
+        self.blocks = blocks
+        self.trimmed_blocks = {table: trim_block(block) for table, block in blocks.items()}
+        self.full_text = self._join(blocks.values())
+        self.trimmed_text = self._join(self.trimmed_blocks.values())
+
+    @classmethod
+    def from_text(cls, version, text: str):
+        """Divide o texto do schema nos blocos iniciados por 'TABELA: '"""
+        parts = text.split(f'\n{TABLE_MARKER}')
+        header = parts[0].rstrip('\n')
+        blocks = {}
+        for part in parts[1:]:
+            table_name = part.split('\n', 1)[0].strip()
+            blocks[table_name] = f'{TABLE_MARKER}{part.strip()}'
+        return cls(version, header, blocks)
+
+    def _join(self, blocks: Iterable[str]) -> str:
+        return self.header + '\n\n' + '\n\n'.join(blocks) + '\n'
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.blocks)
+
+    def render(self, tables: Optional[Iterable[str]] = None, token_budget: int = None) -> str:
+        """
+        Schema para o prompt: só as tabelas pedidas (na ordem dada, ou todas)
+        e dentro do orçamento de tokens. Passa para a variante enxuta e, se
+        ainda exceder, descarta as últimas tabelas.
+        """
+        selected = [table for table in dict.fromkeys(tables) if table in self.blocks] if tables else []
+        if not selected:
+            selected = self.tables
+            if token_budget is None:
+                return self.full_text
+
+        text = self._join(self.blocks[table] for table in selected)
+        if token_budget is None or estimate_tokens(text) <= token_budget:
+            return text
+
+        trimmed = [self.trimmed_blocks[table] for table in selected]
+        text = self._join(trimmed)
+        while len(trimmed) > 1 and estimate_tokens(text) > token_budget:
+            trimmed.pop()
+            text = self._join(trimmed)
+        return text
+
+    def to_cache(self):
+        return {'version': self.version, 'header': self.header, 'blocks': self.blocks}
+
+    @classmethod
+    def from_cache(cls, data):
+        return cls(data['version'], data['header'], data['blocks'])
+
+
+def get_schema_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valor baseado no relógio: um cache esvaziado nunca reaproveita versões antigas
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_schema_version() -> None:
+    """Invalida o schema renderizado em todos os processos"""
+    global _artifact
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    _artifact = None
+
+
+_artifact = None
+_lock = threading.Lock()
+
+
+def get_schema_artifact(render_schema: Callable[[], str]) -> SchemaArtifact:
+    """
+    Artefato da versão atual: da memória do processo, do cache compartilhado
+    ou montado com render_schema() (nessa ordem)
+    """
+    global _artifact
+
+    version = get_schema_version()
+    artifact = _artifact
+    if artifact is not None and artifact.version == version:
+        return artifact
+
+    with _lock:
+        artifact = _artifact
+        if artifact is not None and artifact.version == version:
+            return artifact
+
+        key = f'{ARTIFACT_KEY_PREFIX}{version}'
+        data = cache.get(key)
+        if data is not None:
+            artifact = SchemaArtifact.from_cache(data)
+        else:
+            artifact = SchemaArtifact.from_text(version, render_schema())
+            cache.set(key, artifact.to_cache(), timeout=getattr(settings, 'ALICE_SCHEMA_CACHE_TTL', 24 * 60 * 60))
+            logger.info(
+                f"Schema do Alice montado: {len(artifact.blocks)} tabelas, "
+                f"~{estimate_tokens(artifact.full_text)} tokens (enxuto ~{estimate_tokens(artifact.trimmed_text)})"
+            )
+        _artifact = artifact
+        return artifact
@@ -0,0 +1,178 @@
+"""
+Execução protegida das consultas SQL da Alice.
+
+Antes de executar, no PostgreSQL, o custo estimado pelo planejador (EXPLAIN)
+é comparado com ALICE_SQL_MAX_COST; consultas acima do limite (produtos
+cartesianos, varreduras enormes) são recusadas sem rodar. A execução em si:
+
+- PostgreSQL: transação READ ONLY com statement_timeout local
+  (ALICE_SQL_TIMEOUT_MS) e cursor no servidor;
+- SQLite: PRAGMA query_only e um progress handler que interrompe a consulta
+  depois do mesmo tempo limite (o SQLite não expõe custo no EXPLAIN).
+
+Sem alias explícito, a consulta vai para a réplica de leitura quando
+configurada (core.db_routers), exceto logo após gravações do usuário.
+
+As linhas são lidas com fetchmany até ALICE_SQL_MAX_ROWS; se houver mais, o
+resultado é marcado como truncado em vez de carregar tudo em memória.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from core.db_routers import get_read_alias
+
+logger = logging.getLogger(__name__)
+
+FETCH_SIZE = 50
+
+# Códigos de erro devolvidos em execution_result['error_code']
+COST_EXCEEDED = 'cost_exceeded'
+TIMEOUT = 'timeout'
+
+# SQLSTATE do PostgreSQL para consulta cancelada (statement_timeout)
+QUERY_CANCELED = '57014'
+
+
+class SQLExecutor:
+    """Executa SELECTs validados com limite de custo, tempo e linhas"""
+
+    def __init__(self, using: str = None, max_cost: float = None,
+                 timeout_ms: int = None, max_rows: int = None):
+        self.using = using
+        self.max_cost = max_cost if max_cost is not None else getattr(settings, 'ALICE_SQL_MAX_COST', 100000.0)
+        self.timeout_ms = timeout_ms if timeout_ms is not None else getattr(settings, 'ALICE_SQL_TIMEOUT_MS', 5000)
+        self.max_rows = max_rows if max_rows is not None else getattr(settings, 'ALICE_SQL_MAX_ROWS', 100)
+
+    def execute(self, sql_query: str, using: str = None) -> Dict[str, Any]:
+        """
+        Returns:
+            {'success', 'data', 'columns', 'row_count', 'truncated', 'estimated_cost'}
+            ou {'success': False, 'error', 'error_code', 'estimated_cost'}
+        """
+        sql_query = sql_query.strip()
+        if sql_query.endswith(';'):
+            sql_query = sql_query[:-1]
+
+        connection = connections[using or self.using or get_read_alias(opt_in=True)]
+        try:
+            if connection.vendor == 'postgresql':
+                return self._execute_postgresql(connection, sql_query)
+            if connection.vendor == 'sqlite':
+                return self._execute_sqlite(connection, sql_query)
+            with connection.cursor() as cursor:
+                cursor.execute(sql_query)
+                return self._fetch(cursor, estimated_cost=None)
+        except DatabaseError as e:
+            if self._is_timeout(e):
+                logger.warning(f"Consulta interrompida após {self.timeout_ms} ms: {sql_query[:200]}")
+                return {
+                    'success': False,
+                    'error': f'Tempo limite de {self.timeout_ms} ms excedido',
+                    'error_code': TIMEOUT,
+                    'estimated_cost': None
+                }
+            raise
+
+    # -- PostgreSQL -----------------------------------------------------------
+
+    def _execute_postgresql(self, connection, sql_query: str) -> Dict[str, Any]:
+        nested = connection.in_atomic_block
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                if nested:
+                    # Dentro de outra transação já iniciada: READ ONLY só é aceito no início
+                    logger.debug("Consulta da Alice em transação existente; READ ONLY não aplicado")
+                else:
+                    cursor.execute('SET TRANSACTION READ ONLY')
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(self.timeout_ms)])
+
+                estimated_cost = self._estimate_cost_postgresql(cursor, sql_query)
+                if estimated_cost is not None and self.max_cost and estimated_cost > self.max_cost:
+                    logger.warning(f"Consulta recusada: custo estimado {estimated_cost:.0f} > {self.max_cost:.0f}")
+                    return {
+                        'success': False,
+                        'error': f'Custo estimado {estimated_cost:.0f} acima do limite {self.max_cost:.0f}',
+                        'error_code': COST_EXCEEDED,
+                        'estimated_cost': estimated_cost
+                    }
+
+            # Cursor no servidor: as linhas chegam aos poucos em vez de todas no execute()
+            cursor = connection.chunked_cursor()
+            try:
+                cursor.execute(sql_query)
+                return self._fetch(cursor, estimated_cost)
+            finally:
+                cursor.close()
+
+    def _estimate_cost_postgresql(self, cursor, sql_query: str) -> Optional[float]:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql_query}')
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        try:
+            return float(plan[0]['Plan']['Total Cost'])
+        except (LookupError, TypeError, ValueError):
+            return None
+
+    # -- SQLite ---------------------------------------------------------------
+
+    def _execute_sqlite(self, connection, sql_query: str) -> Dict[str, Any]:
+        connection.ensure_connection()
+        raw_connection = connection.connection
+        deadline = time.monotonic() + self.timeout_ms / 1000
+
+        def interrupt_after_deadline():
+            # Valor diferente de zero aborta a consulta com OperationalError('interrupted')
+            return 1 if time.monotonic() > deadline else 0
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA query_only = ON')
+            raw_connection.set_progress_handler(interrupt_after_deadline, 10000)
+            try:
+                cursor.execute(sql_query)
+                return self._fetch(cursor, estimated_cost=None)
+            finally:
+                raw_connection.set_progress_handler(None, 0)
+                cursor.execute('PRAGMA query_only = OFF')
+
+    # -- comum ----------------------------------------------------------------
+
+    def _fetch(self, cursor, estimated_cost) -> Dict[str, Any]:
+        """Lê até max_rows linhas em blocos e indica se havia mais"""
+        rows = []
+        truncated = False
+        while True:
+            batch = cursor.fetchmany(min(FETCH_SIZE, self.max_rows + 1 - len(rows)))
+            if not batch:
+                break
+            rows.extend(batch)
+            if len(rows) > self.max_rows:
+                truncated = True
+                del rows[self.max_rows:]
+                break
+
+        # Em cursores no servidor a descrição só fica disponível após a primeira leitura
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+
+        data = [dict(zip(columns, row)) for row in rows]
+        return {
+            'success': True,
+            'data': data,
+            'columns': columns,
+            'row_count': len(data),
+            'truncated': truncated,
+            'estimated_cost': estimated_cost
+        }
+
+    @staticmethod
+    def _is_timeout(error: Exception) -> bool:
+        cause = error.__cause__ or error
+        code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+        if code == QUERY_CANCELED:
+            return True
+        return 'interrupted' in str(error).lower()
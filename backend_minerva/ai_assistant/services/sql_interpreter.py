@@ -1,10 +1,17 @@
 import time
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from django.db import connection
 from django.conf import settings
 from .gemini_service import GeminiService, ALICE_FRIENDLY_ERROR
 from .embedding_service import EmbeddingService
+from . import answer_cache
+from .schema_prompt import get_schema_artifact
+from .pipeline import elapsed_ms, run_concurrently
+from .sql_validator import SQLValidator
+from .sql_executor import COST_EXCEEDED, TIMEOUT, SQLExecutor
+from . import intent_router
+from .intent_router import get_intent_router
 from ..models import DatabaseSchema, QueryLog, ConversationSession
 
 logger = logging.getLogger(__name__)
@@ -16,9 +23,22 @@ FRIENDLY_MESSAGES = {
     'execution_error': "Tive dificuldade em encontrar essas informações agora. Que tal tentar de outra forma?",
     'internal_error': "Desculpe, algo não saiu como esperado. Pode tentar novamente em alguns instantes?",
     'no_results': "Não encontrei informações sobre isso. Pode me dar mais detalhes para que eu possa ajudar melhor?",
+    'query_too_heavy': "Essa busca ficou grande demais para eu responder agora. Pode restringir um pouco mais, por exemplo por período, setor ou status?",
 }
 
 
+# Tabelas que as consultas geradas podem acessar
+SAFE_TABLES = frozenset({
+    'accounts_user', 'budget_budget', 'budget_budgetmovement',
+    'budgetline_budgetline', 'budgetline_budgetlineversion',
+    'contract_contract', 'contract_contractinstallment',
+    'contract_contractamendment', 'employee_employee',
+    'sector_direction', 'sector_coordination', 'sector_management',
+    'center_management_center', 'center_requesting_center',
+    'aid_assistance', 'aid_assistanceemployee'
+})
+
+
 # Helper function for secure error responses
 def get_error_details(exception):
     """
@@ -36,76 +56,90 @@ class SQLInterpreterService:
     Suporta RAG com pgvector para enriquecer respostas.
     """
 
-    def __init__(self):
-        self.gemini_service = GeminiService()
-        self.embedding_service = EmbeddingService()
-        self.safe_tables = {
-            'accounts_user', 'budget_budget', 'budget_budgetmovement',
-            'budgetline_budgetline', 'budgetline_budgetlineversion',
-            'contract_contract', 'contract_contractinstallment',
-            'contract_contractamendment', 'employee_employee',
-            'sector_direction', 'sector_coordination', 'sector_management',
-            'center_management_center', 'center_requesting_center',
-            'aid_assistance', 'aid_assistanceemployee'
-        }
+    def __init__(self, gemini_service: GeminiService = None, embedding_service: EmbeddingService = None):
+        self.gemini_service = gemini_service or GeminiService()
+        self.embedding_service = embedding_service or EmbeddingService(gemini_service=self.gemini_service)
+        self.safe_tables = set(SAFE_TABLES)
+        self.sql_validator = SQLValidator(self.safe_tables)
+        self.sql_executor = SQLExecutor()
         self._is_postgresql = self._check_database_type()
 
     def _check_database_type(self) -> bool:
         """Verifica se o banco é PostgreSQL"""
         return 'postgresql' in settings.DATABASES['default']['ENGINE']
         
-    def get_database_schema(self) -> str:
+    def get_database_schema(self, tables: List[str] = None, token_budget: int = None) -> str:
         """
-        Obtém informações sobre o schema do banco de dados
+        Obtém informações sobre o schema do banco de dados.
+        O texto é montado uma vez por versão do schema e servido da memória
+        (services/schema_prompt.py); tables restringe o resultado às tabelas
+        informadas e token_budget limita o tamanho do texto.
         """
         try:
-            # Busca informações do schema cache ou gera novo
-            schema_info = self._get_cached_schema()
-            if not schema_info:
-                schema_info = self._generate_schema_info()
-                self._cache_schema_info(schema_info)
-            
-            return schema_info
+            artifact = get_schema_artifact(self._render_schema)
+            return artifact.render(tables, token_budget)
             
         except Exception as e:
             logger.error(f"Erro ao obter schema do banco: {str(e)}")
             return self._get_basic_schema_fallback()
     
+    def _render_schema(self) -> str:
+        """
+        Monta o texto do schema a partir de DatabaseSchema ou, se vazio, do banco
+        """
+        return self._get_cached_schema() or self._generate_schema_info()
+    
     def _get_cached_schema(self) -> Optional[str]:
         """
         Busca informações de schema em cache
         """
         try:
-            schemas = DatabaseSchema.objects.all()
+            schemas = DatabaseSchema.objects.order_by('table_name', 'column_name')
             if not schemas.exists():
                 return None
                 
-            schema_info = "ESQUEMA DO BANCO DE DADOS MINERVA:\n\n"
+            table_descriptions = self._get_table_descriptions()
+            parts = ["ESQUEMA DO BANCO DE DADOS MINERVA:\n\n"]
             current_table = ""
             
-            for schema in schemas.order_by('table_name', 'column_name'):
+            for schema in schemas.iterator():
                 if schema.table_name != current_table:
                     current_table = schema.table_name
-                    schema_info += f"\nTABELA: {schema.table_name}\n"
-                    if schema.table_name in self._get_table_descriptions():
-                        schema_info += f"Descrição: {self._get_table_descriptions()[schema.table_name]}\n"
+                    parts.append(f"\nTABELA: {schema.table_name}\n")
+                    if schema.table_name in table_descriptions:
+                        parts.append(f"Descrição: {table_descriptions[schema.table_name]}\n")
                 
-                schema_info += f"  - {schema.column_name} ({schema.data_type})"
+                line = f"  - {schema.column_name} ({schema.data_type})"
                 if not schema.is_nullable:
-                    schema_info += " NOT NULL"
+                    line += " NOT NULL"
                 if schema.business_meaning:
-                    schema_info += f" - {schema.business_meaning}"
-                schema_info += "\n"
+                    line += f" - {schema.business_meaning}"
+                parts.append(line + "\n")
                 
                 if schema.sample_values:
-                    schema_info += f"    Exemplos: {', '.join(map(str, schema.sample_values[:3]))}\n"
+                    parts.append(f"    Exemplos: {', '.join(map(str, schema.sample_values[:3]))}\n")
             
-            return schema_info
+            return ''.join(parts)
             
         except Exception as e:
             logger.error(f"Erro ao buscar schema em cache: {str(e)}")
             return None
     
+    def _relevant_tables(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        Tabelas apontadas pelos documentos recuperados via RAG: títulos dos
+        documentos de schema e nomes de tabelas citados nos demais
+        """
+        tables = []
+        for doc in documents:
+            title = doc.get('title', '')
+            if doc.get('document_type') == 'SCHEMA' and title.startswith('TABELA: '):
+                tables.append(title[len('TABELA: '):].strip())
+            else:
+                text = f"{title}\n{doc.get('content', '')}"
+                tables.extend(table for table in self.safe_tables if table in text)
+        return [table for table in dict.fromkeys(tables) if table in self.safe_tables]
+    
     def _generate_schema_info(self) -> str:
         """
         Gera informações detalhadas do schema do banco.
@@ -249,105 +283,26 @@ class SQLInterpreterService:
         - status (VARCHAR) - Status do funcionário
         """
     
-    def _cache_schema_info(self, schema_info: str) -> None:
-        """
-        Salva informações do schema em cache para uso futuro
-        """
-        # Este método poderia implementar cache mais sofisticado
-        # Por enquanto, apenas registra que foi chamado
-        logger.info("Schema info cached")
-    
-    # Consultas predefinidas para palavras-chave simples (economiza API e é mais confiável)
-    PREDEFINED_QUERIES = {
-        'auxilios': {
-            'sql': 'SELECT a.id, e.full_name as funcionario, a.type as tipo, a.total_amount as valor, a.status, a.start_date as inicio FROM aid_assistance a JOIN employee_employee e ON a.employee_id = e.id ORDER BY a.start_date DESC LIMIT 20',
-            'intent': 'Listar auxílios cadastrados'
-        },
-        'auxílios': {
-            'sql': 'SELECT a.id, e.full_name as funcionario, a.type as tipo, a.total_amount as valor, a.status, a.start_date as inicio FROM aid_assistance a JOIN employee_employee e ON a.employee_id = e.id ORDER BY a.start_date DESC LIMIT 20',
-            'intent': 'Listar auxílios cadastrados'
-        },
-        'contratos': {
-            'sql': 'SELECT id, protocol_number as protocolo, description as descricao, current_value as valor, status, start_date as inicio, end_date as fim FROM contract_contract ORDER BY created_at DESC LIMIT 20',
-            'intent': 'Listar contratos cadastrados'
-        },
-        'funcionarios': {
-            'sql': 'SELECT id, full_name as nome, email, position as cargo, department as departamento, status FROM employee_employee ORDER BY full_name LIMIT 30',
-            'intent': 'Listar funcionários cadastrados'
-        },
-        'funcionários': {
-            'sql': 'SELECT id, full_name as nome, email, position as cargo, department as departamento, status FROM employee_employee ORDER BY full_name LIMIT 30',
-            'intent': 'Listar funcionários cadastrados'
-        },
-        'colaboradores': {
-            'sql': 'SELECT id, full_name as nome, email, position as cargo, department as departamento, status FROM employee_employee ORDER BY full_name LIMIT 30',
-            'intent': 'Listar colaboradores cadastrados'
-        },
-        'orcamentos': {
-            'sql': 'SELECT id, year as ano, category as categoria, total_amount as valor_total, available_amount as disponivel, status FROM budget_budget ORDER BY year DESC LIMIT 20',
-            'intent': 'Listar orçamentos cadastrados'
-        },
-        'orçamentos': {
-            'sql': 'SELECT id, year as ano, category as categoria, total_amount as valor_total, available_amount as disponivel, status FROM budget_budget ORDER BY year DESC LIMIT 20',
-            'intent': 'Listar orçamentos cadastrados'
-        },
-        'setores': {
-            'sql': 'SELECT id, name as nome, is_active as ativo FROM sector_direction ORDER BY name LIMIT 30',
-            'intent': 'Listar setores/direções cadastrados'
-        },
-        'centros': {
-            'sql': 'SELECT id, name as nome, code as codigo, is_active as ativo FROM center_management_center ORDER BY name LIMIT 30',
-            'intent': 'Listar centros gestores cadastrados'
-        },
-    }
-
     def _get_predefined_query(self, text: str) -> Optional[Dict[str, str]]:
         """Retorna consulta predefinida se a palavra-chave for reconhecida."""
-        text_lower = text.lower().strip()
-        return self.PREDEFINED_QUERIES.get(text_lower)
+        return get_intent_router().classify(text).predefined
 
     def _is_greeting_or_casual(self, text: str) -> bool:
         """Verifica se a mensagem é uma saudação ou conversa casual."""
-        greetings = [
-            'oi', 'olá', 'ola', 'hi', 'hello', 'hey', 'e ai', 'eai',
-            'bom dia', 'boa tarde', 'boa noite', 'tudo bem', 'como vai',
-            'obrigado', 'obrigada', 'valeu', 'tchau', 'até mais', 'ate mais',
-            'ajuda', 'help', 'o que voce faz', 'o que você faz', 'quem é você',
-            'quem e voce', 'quem é voce'
-        ]
-
-        # Palavras que indicam consulta de dados (não são saudações)
-        data_keywords = [
-            'contrato', 'contratos', 'auxilio', 'auxilios', 'auxílio', 'auxílios',
-            'funcionario', 'funcionarios', 'funcionário', 'funcionários',
-            'colaborador', 'colaboradores', 'orcamento', 'orçamento', 'orcamentos', 'orçamentos',
-            'budget', 'valor', 'valores', 'total', 'lista', 'listar', 'mostrar', 'mostra',
-            'buscar', 'busca', 'encontrar', 'pesquisar', 'quantos', 'quantas', 'quanto',
-            'quais', 'qual', 'todos', 'todas', 'ativos', 'ativo', 'vencidos', 'vencido',
-            'setor', 'setores', 'direção', 'direcao', 'gerencia', 'gerência', 'coordenacao',
-            'centro', 'centros', 'gestor', 'gestores', 'solicitante'
-        ]
-
-        text_lower = text.lower().strip()
-
-        # Se contém palavra de dados, NÃO é saudação
-        if any(keyword in text_lower for keyword in data_keywords):
-            return False
-
-        # Verifica se é saudação
-        return any(greeting in text_lower for greeting in greetings) or len(text_lower) < 4
-
-    def _get_greeting_response(self, text: str) -> str:
+        return get_intent_router().classify(text).kind == intent_router.GREETING
+
+    def _get_greeting_response(self, text: str, greeting_kind: str = None) -> str:
         """Retorna uma resposta apropriada para saudações."""
-        text_lower = text.lower().strip()
+        if greeting_kind is None:
+            greeting_kind = get_intent_router().classify(text).greeting_kind
 
-        if any(g in text_lower for g in ['obrigado', 'obrigada', 'valeu']):
+        if greeting_kind == 'thanks':
             return "De nada! 😊 Fico feliz em ajudar. Se precisar de mais alguma coisa, é só perguntar!"
 
-        if any(g in text_lower for g in ['tchau', 'até mais', 'ate mais']):
+        if greeting_kind == 'farewell':
             return "Até mais! 😊 Foi um prazer ajudar. Volte sempre que precisar!"
 
-        if any(g in text_lower for g in ['ajuda', 'help', 'o que voce faz', 'o que você faz']):
+        if greeting_kind == 'help':
             return """Posso ajudar você com várias informações do Sistema Minerva! 😊
 
 Por exemplo, você pode me perguntar:
@@ -365,7 +320,12 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
 
 É só me dizer o que você precisa!"""
 
-    def interpret_and_execute(self, user_question: str, session: ConversationSession) -> Dict[str, Any]:
+    def interpret_and_execute(
+        self,
+        user_question: str,
+        session: ConversationSession,
+        progress_callback: Callable[..., None] = None
+    ) -> Dict[str, Any]:
         """
         Interpreta pergunta e executa consulta SQL.
         Usa RAG com pgvector para enriquecer o contexto.
@@ -373,16 +333,29 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
         Args:
             user_question: Pergunta do usuário
             session: Sessão da conversa
+            progress_callback: Opcional; chamado como progress_callback('stage', name=...)
+                no início de cada etapa e progress_callback('token', text=...) para cada
+                trecho da resposta humanizada (streaming)
 
         Returns:
             Dict com resultados e metadados
         """
         start_time = time.time()
 
+        def notify(event, **data):
+            if progress_callback:
+                progress_callback(event, **data)
+
+        on_token = (lambda text: notify('token', text=text)) if progress_callback else None
+
         try:
-            # Verifica se é uma saudação ou conversa casual
-            if self._is_greeting_or_casual(user_question):
-                greeting_response = self._get_greeting_response(user_question)
+            # Classifica a pergunta (saudação, consulta predefinida ou LLM) em uma passada
+            notify('stage', name='routing')
+            router = get_intent_router()
+            route = router.classify(user_question)
+
+            if route.kind == intent_router.GREETING:
+                greeting_response = self._get_greeting_response(user_question, route.greeting_kind)
                 return {
                     'success': True,
                     'data': [],
@@ -393,14 +366,25 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                     'is_greeting': True
                 }
 
-            # Verifica se há consulta predefinida para a palavra-chave
-            predefined = self._get_predefined_query(user_question)
-            if predefined:
-                logger.info(f"Usando consulta predefinida para: {user_question}")
+            if route.kind == intent_router.PREDEFINED:
+                predefined = route.predefined
+                logger.info(f"Usando consulta predefinida '{route.predefined_key}' para: {user_question}")
                 sql_query = predefined['sql']
-                interpretation = {'intent': predefined['intent'], 'sql': sql_query}
+                interpretation = {'intent': predefined.get('intent', ''), 'sql': sql_query}
+
+                # Consultas predefinidas também podem vir do banco (AliceConfiguration)
+                validation_result = self._validate_sql_query(sql_query)
+                if not validation_result['valid']:
+                    logger.warning(f"Consulta predefinida inválida ({route.predefined_key}): {validation_result['error']}")
+                    return {
+                        'success': False,
+                        'error': FRIENDLY_MESSAGES['validation_error'],
+                        'humanized_response': FRIENDLY_MESSAGES['validation_error'],
+                        'details': validation_result['error']
+                    }
 
                 # Executa a consulta predefinida
+                notify('stage', name='execution')
                 execution_result = self._execute_sql_query(sql_query)
                 execution_time = int((time.time() - start_time) * 1000)
 
@@ -409,12 +393,14 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                     count = len(data)
 
                     # Tenta gerar resposta humanizada, com fallback se falhar
+                    notify('stage', name='humanization')
                     try:
                         humanized_response = self.gemini_service.generate_humanized_response(
                             query_result=data,
                             original_question=user_question,
                             sql_query=sql_query,
-                            context_documents=[]
+                            context_documents=[],
+                            on_token=on_token
                         )
                         response_text = humanized_response.get('content', '')
                     except Exception as e:
@@ -423,9 +409,11 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
 
                     # Fallback se a humanização falhar
                     if not response_text:
-                        keyword = user_question.lower().strip()
+                        keyword = route.predefined_key
                         if count == 0:
                             response_text = f"Não encontrei nenhum registro de {keyword} no momento."
+                        elif execution_result['truncated']:
+                            response_text = f"Encontrei muitos registros de {keyword}; estes são os primeiros {count}. 😊"
                         else:
                             response_text = f"Encontrei {count} registro(s) de {keyword}. 😊"
 
@@ -437,46 +425,98 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                         'humanized_response': response_text,
                         'execution_time_ms': execution_time,
                         'result_count': count,
+                        'truncated': execution_result['truncated'],
                         'is_predefined': True
                     }
                 else:
+                    error_message = self._execution_error_message(execution_result)
                     return {
                         'success': False,
-                        'error': FRIENDLY_MESSAGES['execution_error'],
-                        'humanized_response': FRIENDLY_MESSAGES['execution_error'],
+                        'error': error_message,
+                        'humanized_response': error_message,
                         'details': execution_result.get('error', '')
                     }
 
-            # Obtém schema do banco
-            schema_info = self.get_database_schema()
-
-            # Busca contexto relevante via RAG (embeddings)
-            context_documents = self.embedding_service.get_context_for_query(
-                query=user_question,
-                include_schema=True,
-                include_business_rules=True,
-                include_faqs=True,
-                limit_per_type=3
-            )
+            stage_timings = {}
+
+            # Mesma pergunta já respondida no escopo do usuário: dispensa o embedding
+            stage_started = time.perf_counter()
+            fingerprint = answer_cache.scope_fingerprint(session.user)
+            route = router.lookup_cached(route, fingerprint)
+            stage_timings['routing'] = elapsed_ms(stage_started)
+
+            question_embedding = None
+            cached_log = route.cached_log
+            if cached_log is None:
+                # Etapas independentes em paralelo: embedding da pergunta (API)
+                # e schema do prompt (memória/cache/banco)
+                notify('stage', name='preparation')
+                stage_started = time.perf_counter()
+                prepared, prepare_timings = run_concurrently({
+                    'embedding': lambda: self.gemini_service.get_embedding(user_question) or None,
+                    'schema_load': lambda: get_schema_artifact(self._render_schema),
+                })
+                stage_timings.update(prepare_timings)
+                stage_timings['preparation'] = elapsed_ms(stage_started)
+                question_embedding = prepared['embedding']
+
+                # Cache semântico: pergunta similar já respondida no mesmo escopo
+                if answer_cache.is_enabled():
+                    stage_started = time.perf_counter()
+                    cached_log = answer_cache.find_cached_answer(question_embedding, fingerprint)
+                    stage_timings['answer_cache'] = elapsed_ms(stage_started)
+
+            if cached_log is not None:
+                # Reaproveita o SQL já validado, sem interpretação pelo Gemini
+                notify('stage', name='answer_cache')
+                interpretation = {'intent': cached_log.interpreted_intent, 'sql': cached_log.generated_sql}
+                interpretation_result = {'success': True, 'interpretation': interpretation, 'cached_from': cached_log.id}
+                sql_query = cached_log.generated_sql
+                context_documents = []
+                retrieval = None
+            else:
+                # Busca contexto relevante via RAG com o embedding já calculado
+                notify('stage', name='retrieval')
+                stage_started = time.perf_counter()
+                retrieval = self.embedding_service.retrieve_context(
+                    query=user_question,
+                    document_types=['SCHEMA', 'BUSINESS_RULE', 'FAQ'],
+                    limit_per_type=3,
+                    query_embedding=question_embedding
+                )
+                context_documents = retrieval['context']
+                stage_timings['retrieval'] = elapsed_ms(stage_started)
+                logger.debug(f"Contexto RAG ({retrieval['backend']}): {retrieval['timings']}")
+
+                # Schema reduzido às tabelas relevantes para a pergunta (artefato já carregado)
+                notify('stage', name='schema')
+                schema_info = self.get_database_schema(
+                    tables=self._relevant_tables(retrieval['documents']),
+                    token_budget=getattr(settings, 'ALICE_SCHEMA_TOKEN_BUDGET', None)
+                )
 
-            # Interpreta a pergunta usando Gemini
-            interpretation_result = self.gemini_service.interpret_natural_language_query(
-                user_question, schema_info
-            )
+                # Interpreta a pergunta usando Gemini
+                notify('stage', name='interpretation')
+                stage_started = time.perf_counter()
+                interpretation_result = self.gemini_service.interpret_natural_language_query(
+                    user_question, schema_info
+                )
+                stage_timings['interpretation'] = elapsed_ms(stage_started)
 
-            if not interpretation_result['success']:
-                logger.warning(f"Falha na interpretação: {interpretation_result.get('error', 'Erro desconhecido')}")
-                return {
-                    'success': False,
-                    'error': FRIENDLY_MESSAGES['interpretation_error'],
-                    'humanized_response': FRIENDLY_MESSAGES['interpretation_error'],
-                    'details': interpretation_result.get('error', '')
-                }
+                if not interpretation_result['success']:
+                    logger.warning(f"Falha na interpretação: {interpretation_result.get('error', 'Erro desconhecido')}")
+                    return {
+                        'success': False,
+                        'error': FRIENDLY_MESSAGES['interpretation_error'],
+                        'humanized_response': FRIENDLY_MESSAGES['interpretation_error'],
+                        'details': interpretation_result.get('error', '')
+                    }
 
-            interpretation = interpretation_result['interpretation']
-            sql_query = interpretation.get('sql', '')
+                interpretation = interpretation_result['interpretation']
+                sql_query = interpretation.get('sql', '')
 
             # Valida a consulta SQL
+            notify('stage', name='validation')
             validation_result = self._validate_sql_query(sql_query)
             if not validation_result['valid']:
                 logger.warning(f"SQL inválido: {validation_result['error']}")
@@ -487,10 +527,33 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                     'details': validation_result['error']
                 }
 
+            # Versões das tabelas lidas antes da execução (invalidação do cache)
+            tables_used = sorted(validation_result['tables'])
+            table_versions = answer_cache.get_table_versions(tables_used) if answer_cache.is_enabled() else {}
+
             # Executa a consulta
+            notify('stage', name='execution')
+            stage_started = time.perf_counter()
             execution_result = self._execute_sql_query(sql_query)
+            stage_timings['execution'] = elapsed_ms(stage_started)
             execution_time = int((time.time() - start_time) * 1000)
 
+            humanized_response = {}
+            if execution_result['success']:
+                # Gera resposta humanizada usando RAG
+                notify('stage', name='humanization')
+                stage_started = time.perf_counter()
+                humanized_response = self.gemini_service.generate_humanized_response(
+                    query_result=execution_result['data'],
+                    original_question=user_question,
+                    sql_query=sql_query,
+                    context_documents=context_documents,
+                    on_token=on_token
+                )
+                stage_timings['humanization'] = elapsed_ms(stage_started)
+
+            stage_timings['total'] = round((time.time() - start_time) * 1000, 2)
+
             # Log da consulta
             query_log = QueryLog.objects.create(
                 session=session,
@@ -501,17 +564,20 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                 execution_time_ms=execution_time,
                 result_count=len(execution_result.get('data', [])) if execution_result['success'] else None,
                 error_message=execution_result.get('error', ''),
-                gemini_response=interpretation_result
+                gemini_response=interpretation_result,
+                question_embedding=question_embedding,
+                scope_fingerprint=fingerprint,
+                tables_used=tables_used,
+                table_versions=table_versions,
+                cached_from=cached_log,
+                stage_timings=stage_timings,
+                estimated_cost=execution_result.get('estimated_cost'),
+                truncated=execution_result.get('truncated', False)
             )
 
             if execution_result['success']:
-                # Gera resposta humanizada usando RAG
-                humanized_response = self.gemini_service.generate_humanized_response(
-                    query_result=execution_result['data'],
-                    original_question=user_question,
-                    sql_query=sql_query,
-                    context_documents=context_documents
-                )
+                if answer_cache.is_enabled():
+                    answer_cache.remember_intent(route.key, fingerprint, query_log.id)
 
                 return {
                     'success': True,
@@ -521,15 +587,20 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
                     'humanized_response': humanized_response.get('content', ''),
                     'execution_time_ms': execution_time,
                     'result_count': len(execution_result['data']),
+                    'truncated': execution_result['truncated'],
                     'query_log_id': query_log.id,
-                    'context_used': len(context_documents)
+                    'context_used': len(context_documents),
+                    'retrieval_timings': retrieval['timings'] if retrieval else None,
+                    'stage_timings': stage_timings,
+                    'cached_from': cached_log.id if cached_log else None
                 }
             else:
                 logger.warning(f"Erro na execução: {execution_result['error']}")
+                error_message = self._execution_error_message(execution_result)
                 return {
                     'success': False,
-                    'error': FRIENDLY_MESSAGES['execution_error'],
-                    'humanized_response': FRIENDLY_MESSAGES['execution_error'],
+                    'error': error_message,
+                    'humanized_response': error_message,
                     'details': execution_result['error'],
                     'sql_query': sql_query,
                     'interpretation': interpretation,
@@ -547,92 +618,32 @@ Posso ajudar você a encontrar informações sobre contratos, orçamentos, funci
     
     def _validate_sql_query(self, sql_query: str) -> Dict[str, Any]:
         """
-        Valida se a consulta SQL é segura para execução
+        Valida se a consulta SQL é segura para execução (ver SQLValidator)
         """
-        if not sql_query or not sql_query.strip():
-            return {'valid': False, 'error': 'Consulta SQL vazia'}
-        
-        sql_upper = sql_query.upper().strip()
-        
-        # Permite apenas SELECT
-        if not sql_upper.startswith('SELECT'):
-            return {'valid': False, 'error': 'Apenas consultas SELECT são permitidas'}
-        
-        # Verifica comandos perigosos
-        dangerous_keywords = ['DELETE', 'DROP', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE']
-        for keyword in dangerous_keywords:
-            if keyword in sql_upper:
-                return {'valid': False, 'error': f'Comando {keyword} não é permitido'}
-        
-        # Verifica se usa apenas tabelas seguras
-        used_tables = self._extract_table_names(sql_query)
-        for table in used_tables:
-            if table not in self.safe_tables:
-                return {'valid': False, 'error': f'Acesso à tabela {table} não é permitido'}
-        
-        return {'valid': True}
-    
+        return self.sql_validator.validate(sql_query)
+
     def _extract_table_names(self, sql_query: str) -> List[str]:
         """
-        Extrai nomes de tabelas da consulta SQL (implementação básica)
+        Extrai nomes de tabelas da consulta SQL, inclusive de subconsultas e CTEs
         """
-        # Implementação simplificada - poderia ser mais sofisticada
-        import re
-        
-        # Remove comentários e strings
-        sql_clean = re.sub(r'--.*?\n', '', sql_query)
-        sql_clean = re.sub(r'/\*.*?\*/', '', sql_clean, flags=re.DOTALL)
-        sql_clean = re.sub(r"'[^']*'", "''", sql_clean)
-        sql_clean = re.sub(r'"[^"]*"', '""', sql_clean)
-        
-        # Busca por padrões FROM e JOIN
-        table_pattern = r'\b(?:FROM|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_]*)'
-        matches = re.findall(table_pattern, sql_clean, re.IGNORECASE)
-        
-        return [match.lower() for match in matches]
-    
+        return self.sql_validator.extract_tables(sql_query)
+
     def _execute_sql_query(self, sql_query: str) -> Dict[str, Any]:
         """
-        Executa consulta SQL de forma segura
+        Executa consulta SQL de forma segura (limites de custo, tempo e linhas)
         """
         try:
-            with connection.cursor() as cursor:
-                # Remove ponto e vírgula final se existir
-                sql_query = sql_query.strip()
-                if sql_query.endswith(';'):
-                    sql_query = sql_query[:-1]
-                
-                # Adiciona LIMIT se não existir
-                if 'LIMIT' not in sql_query.upper():
-                    sql_query += ' LIMIT 100'
-                
-                cursor.execute(sql_query)
-                
-                # Obtém nomes das colunas
-                columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                
-                # Obtém dados
-                rows = cursor.fetchall()
-                
-                # Converte para lista de dicionários
-                data = []
-                for row in rows:
-                    row_dict = {}
-                    for i, value in enumerate(row):
-                        if i < len(columns):
-                            row_dict[columns[i]] = value
-                    data.append(row_dict)
-                
-                return {
-                    'success': True,
-                    'data': data,
-                    'columns': columns,
-                    'row_count': len(data)
-                }
-                
+            return self.sql_executor.execute(sql_query)
         except Exception as e:
             logger.error(f"Erro na execução SQL: {str(e)}")
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+
+    def _execution_error_message(self, execution_result: Dict[str, Any]) -> str:
+        """Mensagem amigável conforme o motivo da falha na execução"""
+        error_code = execution_result.get('error_code')
+        if error_code in (COST_EXCEEDED, TIMEOUT):
+            return FRIENDLY_MESSAGES['query_too_heavy']
+        return FRIENDLY_MESSAGES['execution_error']
@@ -0,0 +1,226 @@
+"""
+Validação das consultas SQL geradas pela Alice com sqlparse.
+
+A árvore de tokens da consulta é percorrida uma única vez para:
+- exigir um único comando do tipo SELECT (CTEs incluídas);
+- recusar comandos DML/DDL em qualquer ponto (por tipo de token, então
+  colunas como "updated_at" ou "created_by" não são confundidas com UPDATE
+  e CREATE), SELECT INTO e funções administrativas (pg_*, lo_*, dblink);
+- extrair todas as tabelas referenciadas em FROM/JOIN, inclusive em
+  subconsultas, e ignorar os nomes definidos em WITH. Os comentários são
+  removidos antes do parse para não separarem FROM/JOIN da tabela.
+
+As tabelas precisam estar em safe_tables. O veredito fica em um LRU indexado
+pela impressão da consulta normalizada (espaços colapsados, minúsculas), de
+modo que SQL repetido pelo LLM ou pelo cache de respostas é validado sem novo
+parse.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+
+import sqlparse
+from django.conf import settings
+from sqlparse import sql as sql_tokens
+from sqlparse.tokens import Comment, Keyword, Name, Punctuation
+
+# Palavras-chave que alteram dados ou permissões mesmo dentro de um SELECT
+FORBIDDEN_KEYWORDS = frozenset({'INTO', 'COPY', 'GRANT', 'REVOKE', 'LOCK', 'CALL', 'EXECUTE'})
+FORBIDDEN_FUNCTION_PREFIXES = ('pg_', 'lo_', 'dblink')
+FORBIDDEN_FUNCTIONS = frozenset({'set_config', 'current_setting', 'query_to_xml'})
+ALLOWED_SCHEMAS = frozenset({'public', 'main'})
+
+
+class SQLRejected(Exception):
+    """Consulta recusada pela validação"""
+
+
+def sql_fingerprint(sql_query: str) -> str:
+    normalized = ' '.join(sql_query.split()).rstrip(';').strip().lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+class SQLValidator:
+    """Validador de consultas SELECT restritas às tabelas permitidas"""
+
+    def __init__(self, safe_tables: Iterable[str], cache_size: int = None):
+        self.safe_tables = frozenset(table.lower() for table in safe_tables)
+        self.cache_size = cache_size if cache_size is not None else getattr(
+            settings, 'ALICE_SQL_VALIDATION_CACHE_SIZE', 1024
+        )
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, sql_query: str) -> Dict[str, Any]:
+        """
+        Returns:
+            {'valid': bool, 'tables': [...]} e 'error' quando inválida
+        """
+        if not sql_query or not sql_query.strip():
+            return {'valid': False, 'error': 'Consulta SQL vazia', 'tables': []}
+
+        key = sql_fingerprint(sql_query)
+        with self._lock:
+            verdict = self._cache.get(key)
+            if verdict is not None:
+                self._cache.move_to_end(key)
+                return dict(verdict)
+
+        verdict = self._validate(sql_query)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = verdict
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return dict(verdict)
+
+    def extract_tables(self, sql_query: str) -> List[str]:
+        """Tabelas referenciadas pela consulta (sem os nomes definidos em WITH)"""
+        return list(self.validate(sql_query)['tables'])
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # -- análise ------------------------------------------------------------
+
+    def _validate(self, sql_query: str) -> Dict[str, Any]:
+        # Comentários saem antes do parse: no meio de FROM/JOIN eles quebram o
+        # agrupamento do sqlparse ("FROM a, /* x */ b" deixa de ser uma lista)
+        # e fariam a tabela seguinte escapar da verificação
+        statements = [
+            statement for statement in sqlparse.parse(sqlparse.format(sql_query, strip_comments=True))
+            if any(not token.is_whitespace and token.ttype not in Comment and token.ttype is not Punctuation
+                   for token in statement.flatten())
+        ]
+        if not statements:
+            return {'valid': False, 'error': 'Consulta SQL vazia', 'tables': []}
+        if len(statements) > 1:
+            return {'valid': False, 'error': 'Apenas uma consulta por vez é permitida', 'tables': []}
+
+        statement = statements[0]
+        if statement.get_type() != 'SELECT':
+            return {'valid': False, 'error': 'Apenas consultas SELECT são permitidas', 'tables': []}
+
+        references, cte_names = [], set()
+        try:
+            self._walk(statement.tokens, references, cte_names)
+        except SQLRejected as e:
+            return {'valid': False, 'error': str(e), 'tables': []}
+
+        tables = []
+        for schema, table in references:
+            if table in cte_names and schema is None:
+                continue
+            if schema is not None and schema not in ALLOWED_SCHEMAS:
+                return {'valid': False, 'error': f'Acesso ao schema {schema} não é permitido', 'tables': []}
+            if table not in self.safe_tables:
+                return {'valid': False, 'error': f'Acesso à tabela {table} não é permitido', 'tables': []}
+            tables.append(table)
+
+        return {'valid': True, 'tables': list(dict.fromkeys(tables))}
+
+    def _walk(self, tokens, references, cte_names, function_args: bool = False) -> None:
+        """Percorre um nível da árvore, descendo nos grupos (subconsultas, WHERE, funções)
+
+        Nos argumentos de uma função FROM faz parte da sintaxe dela
+        (EXTRACT(YEAR FROM d), TRIM(BOTH ' ' FROM s), SUBSTRING(s FROM 2)) e só
+        volta a indicar tabelas se os argumentos forem uma subconsulta
+        (array(SELECT ... FROM ...)).
+        """
+        expect_table = False
+        in_with = False
+        in_query = not function_args
+        previous_keyword = None
+        for token in tokens:
+            # Comentário residual não consome a expectativa de tabela
+            if token.is_whitespace or token.ttype in Comment or isinstance(token, sql_tokens.Comment):
+                continue
+
+            ttype = token.ttype
+            if ttype is not None:
+                if ttype in Keyword.DDL or (ttype in Keyword.DML and token.normalized != 'SELECT'):
+                    raise SQLRejected(f'Comando {token.normalized} não é permitido')
+                if ttype in Keyword.CTE:
+                    in_with = True
+                elif ttype in Keyword:
+                    keyword = token.normalized
+                    if keyword in FORBIDDEN_KEYWORDS:
+                        raise SQLRejected(f'Comando {keyword} não é permitido')
+                    if keyword == 'SELECT':
+                        in_query = True
+                    if keyword == 'FROM' or keyword.endswith('JOIN'):
+                        # "a IS DISTINCT FROM b" compara valores, não lista tabelas
+                        expect_table = in_query and not (keyword == 'FROM' and previous_keyword == 'DISTINCT')
+                    elif not (expect_table and keyword in ('LATERAL', 'ONLY')) and keyword != 'RECURSIVE':
+                        expect_table = False
+                elif expect_table and ttype in Name:
+                    references.append((None, token.value.lower()))
+                    expect_table = False
+                elif ttype is not Punctuation:
+                    expect_table = False
+                previous_keyword = token.normalized if ttype in Keyword else None
+                continue
+
+            previous_keyword = None
+
+            if in_with and isinstance(token, (sql_tokens.Identifier, sql_tokens.IdentifierList)):
+                in_with = False
+                self._collect_ctes(token, references, cte_names)
+            elif expect_table:
+                expect_table = False
+                self._collect_from_item(token, references, cte_names)
+            elif isinstance(token, sql_tokens.Function):
+                self._walk_function(token, references, cte_names)
+            else:
+                self._walk(token.tokens, references, cte_names)
+
+    def _collect_ctes(self, token, references, cte_names) -> None:
+        """Nomes definidos em WITH e as tabelas usadas nas suas definições"""
+        items = token.get_identifiers() if isinstance(token, sql_tokens.IdentifierList) else [token]
+        for item in items:
+            if isinstance(item, sql_tokens.Identifier):
+                name = item.get_name() or item.get_real_name()
+                if name:
+                    cte_names.add(name.lower())
+            if item.is_group:
+                self._walk(item.tokens, references, cte_names)
+
+    def _collect_from_item(self, token, references, cte_names) -> None:
+        """Item de FROM/JOIN: tabela, lista de tabelas, subconsulta ou função"""
+        if isinstance(token, sql_tokens.IdentifierList):
+            for item in token.get_identifiers():
+                self._collect_from_item(item, references, cte_names)
+        elif isinstance(token, sql_tokens.Identifier) and not isinstance(token.token_first(), sql_tokens.Parenthesis):
+            first = token.token_first()
+            if isinstance(first, sql_tokens.Function):
+                self._collect_from_item(first, references, cte_names)
+                return
+            table = token.get_real_name()
+            schema = token.get_parent_name()
+            if table:
+                references.append((schema.lower() if schema else None, table.lower()))
+        elif isinstance(token, sql_tokens.Function):
+            # Função como fonte de linhas (generate_series, ...): tratada como tabela
+            references.append((None, (token.get_name() or '').lower()))
+            self._walk_function(token, references, cte_names)
+        elif token.is_group:
+            self._walk(token.tokens, references, cte_names)
+        elif token.ttype in Name:
+            references.append((None, token.value.lower()))
+
+    def _walk_function(self, token, references, cte_names) -> None:
+        """Chamada de função: nome permitido e argumentos percorridos como tal"""
+        self._check_function(token)
+        for part in token.tokens:
+            if isinstance(part, sql_tokens.Parenthesis):
+                self._walk(part.tokens, references, cte_names, function_args=True)
+            elif part.is_group:
+                self._walk(part.tokens, references, cte_names)
+
+    @staticmethod
+    def _check_function(token) -> None:
+        name = (token.get_name() or '').lower()
+        if name.startswith(FORBIDDEN_FUNCTION_PREFIXES) or name in FORBIDDEN_FUNCTIONS:
+            raise SQLRejected(f'Função {name} não é permitida')
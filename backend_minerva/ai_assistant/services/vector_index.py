@@ -0,0 +1,347 @@
+"""
+Índice vetorial em memória para a busca sem pgvector (SQLite, instalações
+sem a extensão).
+
+Os embeddings ativos de DocumentEmbedding são normalizados e mantidos em uma
+matriz float32; a similaridade de cosseno com a query vira um único produto
+matriz-vetor e o top-k de cada tipo sai de um argpartition. Sem NumPy
+instalado o índice guarda os vetores normalizados em listas e calcula apenas
+os produtos escalares, ainda evitando a leitura e o parse do JSON a cada
+busca.
+
+Atualização:
+- no próprio processo, os sinais de DocumentEmbedding aplicam a mudança
+  diretamente no índice (upsert/remove), sem reconstrução. Buscas e
+  mudanças no índice publicado usam o lock da instância, já que as buscas
+  rodam no pool de etapas do pipeline enquanto sinais podem alterar o índice
+  em outras threads;
+- nos demais processos, a geração guardada no cache muda e o índice é
+  reconstruído na próxima busca.
+
+Com ALICE_VECTOR_INDEX_PATH definido (e NumPy disponível), a matriz de cada
+reconstrução é gravada em disco e os processos seguintes da mesma geração a
+abrem com memory-map em vez de ler o banco.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'alice_vector_index:generation'
+
+# Fração de linhas removidas que dispara a compactação da matriz
+COMPACT_RATIO = 0.25
+
+
+def _normalize(vector) -> Optional[List[float]]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return None
+    return [x / norm for x in vector]
+
+
+def _get_generation():
+    return cache.get(GENERATION_KEY, 0)
+
+
+def _bump_generation():
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+        return 1
+
+
+class VectorIndex:
+    """Embeddings normalizados dos documentos ativos, por id e tipo"""
+
+    def __init__(self, generation=0):
+        self.generation = generation
+        self.dimensions = None
+        self.row_by_id: Dict[int, int] = {}
+        self.ids: List[Optional[int]] = []
+        self.types: List[Optional[str]] = []
+        self.removed = 0
+        self._matrix = None        # NumPy: float32 (capacidade x dimensões)
+        self._vectors = []         # sem NumPy: listas normalizadas
+        self._rows_by_type = None  # cache de índices de linha por tipo
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.row_by_id)
+
+    # -- construção -------------------------------------------------------
+
+    @classmethod
+    def build(cls, generation):
+        from ..models import DocumentEmbedding
+
+        index = cls(generation)
+        rows = DocumentEmbedding.objects.filter(
+            is_active=True, embedding__isnull=False
+        ).values_list('id', 'document_type', 'embedding').iterator(chunk_size=500)
+        for doc_id, document_type, embedding in rows:
+            index.upsert(doc_id, document_type, embedding)
+        logger.debug(f"Índice vetorial reconstruído com {len(index)} documento(s)")
+        return index
+
+    def upsert(self, doc_id, document_type, embedding) -> None:
+        """Insere ou substitui o vetor do documento"""
+        vector = _normalize(list(embedding)) if embedding is not None else None
+        if vector is None:
+            self.remove(doc_id)
+            return
+        if self.dimensions is None:
+            self.dimensions = len(vector)
+        if len(vector) != self.dimensions:
+            logger.warning(f"Embedding do documento {doc_id} com dimensão {len(vector)} ignorado")
+            self.remove(doc_id)
+            return
+
+        row = self.row_by_id.get(doc_id)
+        if row is None:
+            row = len(self.ids)
+            self.ids.append(doc_id)
+            self.types.append(document_type)
+            self.row_by_id[doc_id] = row
+        else:
+            self.types[row] = document_type
+
+        if NUMPY_AVAILABLE:
+            self._ensure_capacity(row + 1)
+            self._matrix[row] = vector
+        elif row == len(self._vectors):
+            self._vectors.append(vector)
+        else:
+            self._vectors[row] = vector
+        self._rows_by_type = None
+
+    def remove(self, doc_id) -> None:
+        row = self.row_by_id.pop(doc_id, None)
+        if row is None:
+            return
+        self.ids[row] = None
+        self.types[row] = None
+        if not NUMPY_AVAILABLE:
+            self._vectors[row] = None
+        self.removed += 1
+        self._rows_by_type = None
+        if self.removed > COMPACT_RATIO * len(self.ids):
+            self._compact()
+
+    def _ensure_capacity(self, size):
+        if self._matrix is None:
+            self._matrix = np.zeros((max(size, 64), self.dimensions), dtype=np.float32)
+        elif size > self._matrix.shape[0] or not self._matrix.flags.writeable:
+            capacity = max(size, self._matrix.shape[0] * 2) if size > self._matrix.shape[0] else self._matrix.shape[0]
+            matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            used = min(len(self.ids), self._matrix.shape[0])
+            matrix[:used] = self._matrix[:used]
+            self._matrix = matrix
+
+    def _compact(self):
+        keep = [row for row, doc_id in enumerate(self.ids) if doc_id is not None]
+        if NUMPY_AVAILABLE:
+            self._matrix = np.array(self._matrix[keep], dtype=np.float32) if keep else None
+        else:
+            self._vectors = [self._vectors[row] for row in keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.types = [self.types[row] for row in keep]
+        self.row_by_id = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.removed = 0
+        if not self.ids:
+            self.dimensions = None
+
+    def _get_rows_by_type(self):
+        if self._rows_by_type is None:
+            rows_by_type = {}
+            for row, document_type in enumerate(self.types):
+                if document_type is not None:
+                    rows_by_type.setdefault(document_type, []).append(row)
+            if NUMPY_AVAILABLE:
+                rows_by_type = {key: np.array(rows, dtype=np.intp) for key, rows in rows_by_type.items()}
+            self._rows_by_type = rows_by_type
+        return self._rows_by_type
+
+    # -- busca ------------------------------------------------------------
+
+    def search(
+        self,
+        query_embedding: List[float],
+        document_types: List[Optional[str]],
+        limit_per_type: Optional[int],
+        threshold: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k (id, similaridade) de cada tipo com similaridade >= threshold.
+        None em document_types busca em todos os tipos; limit_per_type=None
+        não limita.
+        """
+        if limit_per_type is not None and limit_per_type <= 0:
+            return []
+        query = _normalize(list(query_embedding)) if query_embedding else None
+        if query is None:
+            return []
+
+        # Matriz, ids e linhas por tipo precisam ser lidos no mesmo estado
+        with self._lock:
+            return self._search(query, document_types, limit_per_type, threshold)
+
+    def _search(self, query, document_types, limit_per_type, threshold) -> List[Tuple[int, float]]:
+        if not self.row_by_id or len(query) != self.dimensions:
+            return []
+
+        rows_by_type = self._get_rows_by_type()
+        if None in document_types:
+            groups = [[row for rows in rows_by_type.values() for row in rows]]
+            if NUMPY_AVAILABLE:
+                groups = [np.concatenate(list(rows_by_type.values()))]
+        else:
+            groups = [rows_by_type[t] for t in document_types if t in rows_by_type]
+
+        if NUMPY_AVAILABLE:
+            used = len(self.ids)
+            scores = self._matrix[:used] @ np.asarray(query, dtype=np.float32)
+            results = []
+            for rows in groups:
+                group_scores = scores[rows]
+                if limit_per_type is not None and limit_per_type < len(rows):
+                    top = np.argpartition(-group_scores, limit_per_type - 1)[:limit_per_type]
+                else:
+                    top = np.arange(len(rows))
+                top = top[np.argsort(-group_scores[top])]
+                for position in top:
+                    similarity = float(group_scores[position])
+                    if similarity < threshold:
+                        break
+                    results.append((self.ids[rows[position]], similarity))
+            return results
+
+        results = []
+        for rows in groups:
+            scored = (
+                (sum(x * y for x, y in zip(query, self._vectors[row])), row) for row in rows
+            )
+            scored = [item for item in scored if item[0] >= threshold]
+            if limit_per_type is not None:
+                scored = heapq.nlargest(limit_per_type, scored)
+            else:
+                scored.sort(reverse=True)
+            results.extend((self.ids[row], similarity) for similarity, row in scored)
+        return results
+
+    # -- persistência (memory-map) ----------------------------------------
+
+    def save(self, path) -> None:
+        if not NUMPY_AVAILABLE or self._matrix is None:
+            return
+        if self.removed:
+            self._compact()
+        tmp_matrix = f'{path}.{os.getpid()}.npy'
+        np.save(tmp_matrix, self._matrix[:len(self.ids)])
+        os.replace(tmp_matrix, f'{path}.npy')
+        tmp_meta = f'{path}.{os.getpid()}.json'
+        with open(tmp_meta, 'w') as meta_file:
+            json.dump({'generation': self.generation, 'ids': self.ids, 'types': self.types}, meta_file)
+        os.replace(tmp_meta, f'{path}.json')
+
+    @classmethod
+    def load(cls, path, generation):
+        """Abre o índice gravado em disco se for da geração pedida"""
+        if not NUMPY_AVAILABLE:
+            return None
+        try:
+            with open(f'{path}.json') as meta_file:
+                meta = json.load(meta_file)
+            if meta['generation'] != generation:
+                return None
+            matrix = np.load(f'{path}.npy', mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+
+        index = cls(generation)
+        index.ids = meta['ids']
+        index.types = meta['types']
+        index.row_by_id = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        index.dimensions = matrix.shape[1] if len(index.ids) else None
+        index._matrix = matrix if len(index.ids) else None
+        return index
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_vector_index() -> VectorIndex:
+    """Índice do processo, reconstruído quando a geração no cache muda"""
+    global _index
+
+    generation = _get_generation()
+    index = _index
+    if index is None or index.generation != generation:
+        with _lock:
+            index = _index
+            if index is None or index.generation != generation:
+                path = getattr(settings, 'ALICE_VECTOR_INDEX_PATH', None)
+                index = VectorIndex.load(path, generation) if path else None
+                if index is None:
+                    index = VectorIndex.build(generation)
+                    if path:
+                        try:
+                            index.save(path)
+                        except OSError as e:
+                            logger.warning(f"Não foi possível gravar o índice vetorial: {str(e)}")
+                _index = index
+    return index
+
+
+def apply_document_change(doc, deleted=False) -> None:
+    """
+    Aplica a alteração de um DocumentEmbedding ao índice local e sinaliza os
+    outros processos pela geração no cache
+    """
+    global _index
+
+    with _lock:
+        generation = _bump_generation()
+        index = _index
+        if index is None:
+            return
+        if index.generation != generation - 1:
+            # Houve alterações em outro processo: reconstrói na próxima busca
+            _index = None
+            return
+        with index._lock:
+            if deleted or not doc.is_active:
+                index.remove(doc.pk)
+            else:
+                index.upsert(doc.pk, doc.document_type, doc.embedding)
+            index.generation = generation
+
+
+def invalidate_vector_index() -> None:
+    """Força a reconstrução do índice em todos os processos (ex.: após bulk_create)"""
+    global _index
+    with _lock:
+        _bump_generation()
+        _index = None
+
+
+def reset_vector_index() -> None:
+    global _index
+    with _lock:
+        _index = None
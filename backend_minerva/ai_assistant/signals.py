@@ -0,0 +1,65 @@
+# ai_assistant/signals.py
+
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from budget.services.recalculation import cached_amounts_changed
+
+from .models import AliceConfiguration, DatabaseSchema, DocumentEmbedding
+from .services.answer_cache import bump_table_version
+from .services.intent_router import CONFIG_KEYS as ROUTER_CONFIG_KEYS, bump_router_version
+from .services.schema_prompt import bump_schema_version
+from .services.sql_interpreter import SAFE_TABLES
+from .services.vector_index import apply_document_change
+
+
+def invalidar_respostas_em_cache(sender, **kwargs):
+    """Alteração em uma tabela consultável invalida as respostas que a usaram"""
+    bump_table_version(sender._meta.db_table)
+
+
+for model in apps.get_models():
+    if model._meta.db_table in SAFE_TABLES:
+        label = model._meta.label
+        post_save.connect(invalidar_respostas_em_cache, sender=model, dispatch_uid=f'alice_answer_cache_save_{label}')
+        post_delete.connect(invalidar_respostas_em_cache, sender=model, dispatch_uid=f'alice_answer_cache_delete_{label}')
+
+
+@receiver(cached_amounts_changed, dispatch_uid='alice_answer_cache_cached_amounts')
+def invalidar_respostas_por_valores_em_cache(sender, tables, **kwargs):
+    """Saldos gravados por update/bulk_update/bulk_create (sem post_save)"""
+    for table in sorted(tables):
+        if table in SAFE_TABLES:
+            bump_table_version(table)
+
+
+@receiver(post_save, sender=DocumentEmbedding)
+def atualizar_indice_vetorial(sender, instance, **kwargs):
+    """Aplica o documento salvo ao índice vetorial em memória (busca sem pgvector)"""
+    apply_document_change(instance)
+
+
+@receiver(post_delete, sender=DocumentEmbedding)
+def remover_do_indice_vetorial(sender, instance, **kwargs):
+    apply_document_change(instance, deleted=True)
+
+
+@receiver(post_save, sender=DatabaseSchema)
+@receiver(post_delete, sender=DatabaseSchema)
+def invalidar_schema_do_prompt(sender, **kwargs):
+    """Descrição de colunas alterada: o schema do prompt é montado novamente"""
+    bump_schema_version()
+
+
+@receiver(post_migrate, dispatch_uid='alice_schema_post_migrate')
+def invalidar_schema_apos_migracao(sender, **kwargs):
+    bump_schema_version()
+
+
+@receiver(post_save, sender=AliceConfiguration)
+@receiver(post_delete, sender=AliceConfiguration)
+def invalidar_roteador_de_intencoes(sender, instance, **kwargs):
+    """Listas do roteador alteradas no banco: o autômato é montado novamente"""
+    if instance.key in ROUTER_CONFIG_KEYS:
+        bump_router_version()
@@ -15,6 +15,10 @@ urlpatterns = [
     # Endpoint principal do chat
     path('chat/', views.AliceChatView.as_view(), name='alice-chat'),
     
+    # Chat assíncrono: cria o job e acompanha o progresso via SSE
+    path('chat/jobs/', views.AliceChatJobView.as_view(), name='alice-chat-job'),
+    path('chat/jobs/<str:job_id>/stream/', views.alice_chat_job_stream, name='alice-chat-job-stream'),
+    
     # Endpoints de estatísticas e utilidades
     path('stats/', views.alice_stats, name='alice-stats'),
     path('quick/', views.quick_question, name='alice-quick'),
@@ -22,6 +26,7 @@ urlpatterns = [
     # URLs específicas para funcionalidades avançadas
     path('sessions/<int:pk>/messages/', views.ConversationSessionViewSet.as_view({'get': 'retrieve'}), name='session-messages'),
     path('sessions/<int:pk>/send/', views.ConversationSessionViewSet.as_view({'post': 'send_message'}), name='session-send'),
+    path('sessions/<int:pk>/send-async/', views.ConversationSessionViewSet.as_view({'post': 'send_message_async'}), name='session-send-async'),
     path('sessions/<int:pk>/clear/', views.ConversationSessionViewSet.as_view({'post': 'clear_session'}), name='session-clear'),
     
     # URL para listar tabelas disponíveis
@@ -1,12 +1,19 @@
+import asyncio
+import json
 import uuid
 import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db.models import Count, Avg, Q
+from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status, viewsets, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from core.db_routers import use_replica
 from .models import (
     ConversationSession, 
     ConversationMessage, 
@@ -26,7 +33,9 @@ from .serializers import (
     SessionStatsSerializer,
     QuickQuestionSerializer
 )
-from .services.sql_interpreter import SQLInterpreterService, FRIENDLY_MESSAGES
+from .services.sql_interpreter import FRIENDLY_MESSAGES
+from .services.registry import get_sql_interpreter
+from .services.chat_jobs import build_chat_reply, start_chat_job, get_job, get_events
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +51,40 @@ def get_error_details(exception):
     return "Contact support for more information"
 
 
+def build_job_response(request, job_id, session):
+    """Resposta dos endpoints assíncronos do chat (HTTP 202)"""
+    return {
+        'success': True,
+        'job_id': job_id,
+        'session_id': session.session_id,
+        'stream_url': request.build_absolute_uri(
+            reverse('alice-chat-job-stream', kwargs={'job_id': job_id})
+        )
+    }
+
+
+def resolve_chat_session(user, message, session_id=None, create_new_session=False):
+    """
+    Retorna a sessão do chat: cria uma nova quando pedido (ou sem session_id)
+    ou busca a sessão ativa do usuário. Retorna None se não encontrada.
+    """
+    if create_new_session or not session_id:
+        return ConversationSession.objects.create(
+            user=user,
+            session_id=str(uuid.uuid4()),
+            title=message[:50] + '...' if len(message) > 50 else message
+        )
+    
+    try:
+        return ConversationSession.objects.get(
+            session_id=session_id,
+            user=user,
+            is_active=True
+        )
+    except ConversationSession.DoesNotExist:
+        return None
+
+
 class ConversationSessionViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gerenciar sessões de conversa
@@ -88,7 +131,7 @@ class ConversationSessionViewSet(viewsets.ModelViewSet):
             
             try:
                 # Processa a mensagem com Alice
-                interpreter = SQLInterpreterService()
+                interpreter = get_sql_interpreter()
                 result = interpreter.interpret_and_execute(message_content, session)
                 
                 if result['success']:
@@ -170,6 +213,21 @@ class ConversationSessionViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['post'])
+    def send_message_async(self, request, pk=None):
+        """
+        Envia uma mensagem para a sessão sem aguardar a Alice: retorna o id do
+        job e a URL do stream SSE com o progresso
+        """
+        session = self.get_object()
+        serializer = ChatRequestSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        job_id = start_chat_job(request.user, session, serializer.validated_data['message'])
+        return Response(build_job_response(request, job_id, session), status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['post'])
     def clear_session(self, request, pk=None):
         """
@@ -209,26 +267,12 @@ class AliceChatView(APIView):
         
         try:
             # Gerencia sessão
-            if create_new_session or not session_id:
-                # Cria nova sessão
-                session = ConversationSession.objects.create(
-                    user=request.user,
-                    session_id=str(uuid.uuid4()),
-                    title=message[:50] + '...' if len(message) > 50 else message
-                )
-            else:
-                # Busca sessão existente
-                try:
-                    session = ConversationSession.objects.get(
-                        session_id=session_id,
-                        user=request.user,
-                        is_active=True
-                    )
-                except ConversationSession.DoesNotExist:
-                    return Response({
-                        'success': False,
-                        'error': 'Sessão não encontrada ou inativa'
-                    }, status=status.HTTP_404_NOT_FOUND)
+            session = resolve_chat_session(request.user, message, session_id, create_new_session)
+            if session is None:
+                return Response({
+                    'success': False,
+                    'error': 'Sessão não encontrada ou inativa'
+                }, status=status.HTTP_404_NOT_FOUND)
             
             # Salva mensagem do usuário
             user_message = ConversationMessage.objects.create(
@@ -238,61 +282,10 @@ class AliceChatView(APIView):
             )
             
             # Processa com Alice
-            interpreter = SQLInterpreterService()
+            interpreter = get_sql_interpreter()
             result = interpreter.interpret_and_execute(message, session)
             
-            if result['success']:
-                # Salva resposta de sucesso
-                assistant_message = ConversationMessage.objects.create(
-                    session=session,
-                    message_type='ASSISTANT',
-                    content=result['humanized_response'],
-                    metadata={
-                        'sql_query': result['sql_query'],
-                        'result_count': result['result_count'],
-                        'execution_time_ms': result['execution_time_ms']
-                    }
-                )
-                
-                response_serializer = ChatResponseSerializer(data={
-                    'success': True,
-                    'session_id': session.session_id,
-                    'response': result['humanized_response'],
-                    'sql_query': result['sql_query'],
-                    'data': result['data'],
-                    'execution_time_ms': result['execution_time_ms'],
-                    'result_count': result['result_count'],
-                    'metadata': {
-                        'user_message_id': user_message.id,
-                        'assistant_message_id': assistant_message.id,
-                        'query_log_id': result.get('query_log_id')
-                    }
-                })
-            else:
-                # Usa mensagem amigável do resultado ou mensagem padrão
-                friendly_response = result.get('humanized_response', FRIENDLY_MESSAGES['internal_error'])
-
-                # Salva resposta como mensagem normal (não erro)
-                assistant_message = ConversationMessage.objects.create(
-                    session=session,
-                    message_type='ASSISTANT',
-                    content=friendly_response,
-                    metadata={'was_error': True}
-                )
-
-                response_serializer = ChatResponseSerializer(data={
-                    'success': True,
-                    'session_id': session.session_id,
-                    'response': friendly_response,
-                    'metadata': {
-                        'user_message_id': user_message.id,
-                        'assistant_message_id': assistant_message.id
-                    }
-                })
-
-            # Atualiza sessão
-            session.updated_at = timezone.now()
-            session.save(update_fields=['updated_at'])
+            response_serializer = ChatResponseSerializer(data=build_chat_reply(session, user_message, result))
 
             if response_serializer.is_valid():
                 return Response(response_serializer.data, status=status.HTTP_200_OK)
@@ -308,6 +301,36 @@ class AliceChatView(APIView):
             }, status=status.HTTP_200_OK)
 
 
+class AliceChatJobView(APIView):
+    """
+    Chat com Alice processado em segundo plano: registra a mensagem, agenda o
+    job e retorna imediatamente (HTTP 202). O progresso e a resposta são
+    acompanhados pelo stream SSE (alice_chat_job_stream).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = ChatRequestSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        message = data['message']
+        
+        session = resolve_chat_session(
+            request.user, message, data.get('session_id'), data.get('create_new_session', False)
+        )
+        if session is None:
+            return Response({
+                'success': False,
+                'error': 'Sessão não encontrada ou inativa'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        job_id = start_chat_job(request.user, session, message)
+        return Response(build_job_response(request, job_id, session), status=status.HTTP_202_ACCEPTED)
+
+
 class QueryLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para visualizar logs de consultas
@@ -340,6 +363,7 @@ class DatabaseSchemaViewSet(viewsets.ReadOnlyModelViewSet):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@use_replica
 def alice_stats(request):
     """
     Retorna estatísticas do uso do Alice
@@ -398,7 +422,7 @@ def quick_question(request):
         temp_session.save()
         
         # Processa pergunta
-        interpreter = SQLInterpreterService()
+        interpreter = get_sql_interpreter()
         result = interpreter.interpret_and_execute(question, temp_session)
         
         if result['success']:
@@ -421,4 +445,64 @@ def quick_question(request):
         return Response({
             'success': False,
             'error': 'Erro interno do servidor'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Intervalo entre leituras dos eventos do job e envio de keep-alive (segundos)
+STREAM_POLL_INTERVAL = 0.25
+STREAM_KEEPALIVE_INTERVAL = 15
+
+
+def format_sse(index, event):
+    """Serializa um evento do job no formato Server-Sent Events"""
+    data = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {index}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def alice_chat_job_stream(request, job_id):
+    """
+    Stream SSE do progresso de um job do chat (etapas, trechos da resposta e
+    o resultado final em 'done' ou 'error'). View assíncrona: sob ASGI a
+    espera pelos eventos não ocupa um worker. Aceita Last-Event-ID para
+    retomar após reconexão.
+    """
+    user = await sync_to_async(lambda: request.user)()
+    if not user or not user.is_authenticated:
+        return JsonResponse({'detail': 'Autenticação necessária.'}, status=401)
+
+    job = await sync_to_async(get_job)(job_id)
+    if job is None or job['user_id'] != user.pk:
+        return JsonResponse({'detail': 'Job não encontrado.'}, status=404)
+
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+    except ValueError:
+        last_id = 0
+
+    async def event_stream():
+        after = last_id
+        idle = 0.0
+        while True:
+            events = await sync_to_async(get_events)(job_id, after)
+            for index, event in events:
+                after = index
+                yield format_sse(index, event)
+                if event['type'] in ('done', 'error'):
+                    return
+
+            if events:
+                idle = 0.0
+            else:
+                if await sync_to_async(get_job)(job_id) is None:
+                    # Job expirado
+                    return
+                idle += STREAM_POLL_INTERVAL
+                if idle >= STREAM_KEEPALIVE_INTERVAL:
+                    idle = 0.0
+                    yield ': keep-alive\n\n'
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
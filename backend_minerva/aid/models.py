@@ -5,6 +5,7 @@ from budget.models import Budget
 from employee.models import Employee
 from django.core.validators import MinValueValidator
 from decimal import Decimal
+from budget.services.recalculation import flush_pending
 from .exceptions import InsufficientAidBudgetException, AidOperationException
 
 # =================================================================================================================
@@ -49,6 +50,7 @@ class Assistance(models.Model):
         """
         is_new = self.pk is None
         old_total_amount = Decimal('0.00')
+        old_instance = None
 
         if not is_new:
             # Recuperar valor antigo se estiver atualizando
@@ -66,6 +68,7 @@ class Assistance(models.Model):
                     raise AidOperationException("O auxílio deve estar vinculado a um orçamento.")
 
             # Recarregar orçamento com lock
+            flush_pending(budget_ids=[self.budget.pk])
             budget = Budget.objects.select_for_update().get(pk=self.budget.pk)
 
             if budget.available_amount < self.total_amount:
@@ -77,6 +80,7 @@ class Assistance(models.Model):
         # Se o valor mudou em uma atualização
         if not is_new and old_total_amount != self.total_amount:
             difference = self.total_amount - old_total_amount
+            flush_pending(budget_ids=[self.budget.pk])
             budget = Budget.objects.select_for_update().get(pk=self.budget.pk)
 
             if difference > 0:  # Aumento no valor
@@ -90,9 +94,14 @@ class Assistance(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Atualizar orçamento
+        # Aplicar no orçamento apenas a variação do valor comprometido
+        old_committed = old_instance.committed_amount if old_instance else Decimal('0.00')
+        if old_instance and old_instance.budget_id != self.budget_id:
+            if old_instance.budget_id:
+                Budget.apply_amount_deltas(old_instance.budget_id, assistances=-old_committed)
+            old_committed = Decimal('0.00')
         if self.budget:
-            self.budget.update_calculated_amounts()
+            self.budget.apply_deltas(assistances=self.committed_amount - old_committed)
 
     @transaction.atomic
     def delete(self, *args, **kwargs):
@@ -101,11 +110,20 @@ class Assistance(models.Model):
         - O valor deve retornar ao orçamento
         """
         budget = self.budget
+        committed_amount = self.committed_amount
+        self._skip_signal = True
         super().delete(*args, **kwargs)
 
-        # Atualizar valores do orçamento (o valor retorna automaticamente)
+        # Devolver ao orçamento o valor comprometido pelo auxílio
         if budget:
-            budget.update_calculated_amounts()
+            budget.apply_deltas(assistances=-committed_amount)
+
+    @property
+    def committed_amount(self):
+        """Valor que o auxílio compromete do saldo do orçamento"""
+        if self.status in Budget.COMMITTED_ASSISTANCE_STATUSES:
+            return self.total_amount
+        return Decimal('0.00')
 
     def __str__(self):
         if self.budget_line:
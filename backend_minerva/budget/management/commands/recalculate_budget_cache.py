@@ -1,9 +1,14 @@
 """
 Comando para recalcular valores em cache de todos os orçamentos.
 Útil após migração ou para corrigir inconsistências.
+
+Por padrão usa o modo em conjunto: consultas agrupadas (GROUP BY) por lote de
+orçamentos e gravação com bulk_update. --per-budget mantém o recálculo
+individual (recalculate_cached_amounts) como caminho de verificação.
 """
 from django.core.management.base import BaseCommand
 from budget.models import Budget
+from budget.services.recalculation import reconcile_budget_cached_amounts
 
 
 class Command(BaseCommand):
@@ -15,40 +20,93 @@ class Command(BaseCommand):
             type=int,
             help='ID específico do orçamento para recalcular (opcional)',
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista os orçamentos com valores em cache divergentes, sem corrigir',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Quantidade de orçamentos por lote (padrão: 500)',
+        )
+        parser.add_argument(
+            '--per-budget',
+            action='store_true',
+            help='Recalcula orçamento a orçamento (modo antigo, mais lento)',
+        )
 
     def handle(self, *args, **options):
         budget_id = options.get('budget_id')
 
         if budget_id:
-            try:
-                budget = Budget.objects.get(pk=budget_id)
-                budgets = [budget]
-                self.stdout.write(f'Recalculando orçamento ID {budget_id}...')
-            except Budget.DoesNotExist:
+            if not Budget.objects.filter(pk=budget_id).exists():
                 self.stdout.write(
                     self.style.ERROR(f'Orçamento com ID {budget_id} não encontrado')
                 )
                 return
+            self.stdout.write(f'Recalculando orçamento ID {budget_id}...')
         else:
-            budgets = Budget.objects.all()
-            total = budgets.count()
-            self.stdout.write(f'Recalculando {total} orçamentos...')
+            self.stdout.write(f'Recalculando {Budget.objects.count()} orçamentos...')
 
+        if options['per_budget']:
+            drift = self._recalculate_per_budget(budget_id, apply=not options['dry_run'])
+            if not options['dry_run']:
+                return
+        else:
+            drift = reconcile_budget_cached_amounts(
+                budget_ids=[budget_id] if budget_id else None,
+                apply=not options['dry_run'],
+                batch_size=options['batch_size'],
+            )
+
+        for entry in drift:
+            details = ', '.join(
+                f'{field}: {cached} -> {expected}'
+                for field, (cached, expected) in entry['fields'].items()
+            )
+            self.stdout.write(f"  Orçamento {entry['budget_id']}: {details}")
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'[DRY-RUN] {len(drift)} orcamentos com valores em cache divergentes')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'[OK] {len(drift)} orcamentos corrigidos com sucesso!')
+            )
+
+    def _recalculate_per_budget(self, budget_id, apply=True):
+        """
+        Recalcula orçamento a orçamento com recalculate_cached_amounts. Com
+        apply=False apenas compara com os valores em cache, sem gravar.
+        Retorna as divergências no mesmo formato de reconcile_budget_cached_amounts.
+        """
+        budgets = Budget.objects.filter(pk=budget_id) if budget_id else Budget.objects.all()
+
+        drift = []
         updated = 0
         for budget in budgets:
+            cached = {field: getattr(budget, field) for field in Budget.CACHED_AMOUNT_FIELDS}
             budget.recalculate_cached_amounts()
-            budget.save(update_fields=[
-                'cached_used_amount',
-                'cached_incoming_movements',
-                'cached_outgoing_movements',
-                'available_amount',
-                'updated_at'
-            ])
+            fields = {
+                field: (value, getattr(budget, field))
+                for field, value in cached.items()
+                if value != getattr(budget, field)
+            }
+            if fields:
+                drift.append({'budget_id': budget.pk, 'fields': fields})
+
+            if apply:
+                budget.save(update_fields=Budget.CACHED_AMOUNT_FIELDS + ['updated_at'])
             updated += 1
 
             if updated % 100 == 0:
                 self.stdout.write(f'  Processados: {updated}...')
 
-        self.stdout.write(
-            self.style.SUCCESS(f'[OK] {updated} orcamentos recalculados com sucesso!')
-        )
+        if apply:
+            self.stdout.write(
+                self.style.SUCCESS(f'[OK] {updated} orcamentos recalculados com sucesso!')
+            )
+        return drift
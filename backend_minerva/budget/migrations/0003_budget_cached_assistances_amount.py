@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:12
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_cached_assistances(apps, schema_editor):
+    """Preenche o cache de auxílios e o valor disponível dos orçamentos existentes"""
+    Budget = apps.get_model("budget", "Budget")
+    Assistance = apps.get_model("aid", "Assistance")
+
+    totals = dict(
+        Assistance.objects.filter(
+            budget__isnull=False, status__in=["AGUARDANDO", "ATIVO"]
+        ).values("budget_id").annotate(total=Sum("total_amount")).values_list("budget_id", "total")
+    )
+
+    for budget in Budget.objects.all():
+        budget.cached_assistances_amount = totals.get(budget.pk) or Decimal("0.00")
+        budget.available_amount = max(
+            budget.total_amount
+            + budget.cached_incoming_movements
+            - budget.cached_outgoing_movements
+            - budget.cached_used_amount
+            - budget.cached_assistances_amount,
+            Decimal("0.00"),
+        )
+        budget.save(update_fields=["cached_assistances_amount", "available_amount"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("aid", "0003_alter_assistance_created_by_and_more"),
+        ("budget", "0002_add_cached_amount_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="budget",
+            name="cached_assistances_amount",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0.00"),
+                max_digits=10,
+                verbose_name="Auxílios Concedidos (Cache)",
+            ),
+        ),
+        migrations.RunPython(populate_cached_assistances, migrations.RunPython.noop),
+    ]
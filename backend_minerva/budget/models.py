@@ -1,11 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from accounts.models import User
 from .utils.validators import validate_year
-from center.models import ManagementCenter
+from center.models import ManagementCenter, HierarchyClosure
 from accounts.mixins import HierarchicalQuerysetMixin
 from decimal import Decimal
-from django.db.models import Sum
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .services.recalculation import notify_cached_amounts_changed
 
 
 class Budget(models.Model, HierarchicalQuerysetMixin):
@@ -52,6 +55,12 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
         default=Decimal('0.00'),
         verbose_name='Saída via Movimentações (Cache)'
     )
+    cached_assistances_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Auxílios Concedidos (Cache)'
+    )
     STATUS = [
         ('ATIVO', 'Ativo'),
         ('INATIVO', 'Inativo'),
@@ -62,6 +71,17 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
     created_by = models.ForeignKey(User, related_name='budgets_created', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Criado por')
     updated_by = models.ForeignKey(User, related_name='budgets_updated', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Atualizado por')
 
+    # Status de auxílio que comprometem o saldo do orçamento
+    COMMITTED_ASSISTANCE_STATUSES = ['AGUARDANDO', 'ATIVO']
+
+    CACHED_AMOUNT_FIELDS = [
+        'cached_used_amount',
+        'cached_incoming_movements',
+        'cached_outgoing_movements',
+        'cached_assistances_amount',
+        'available_amount',
+    ]
+
     @property
     def used_amount(self):
         """Retorna valor utilizado do cache"""
@@ -102,8 +122,8 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
         )['total'] or Decimal('0.00')
 
         # Auxílios concedidos
-        cached_assistances = self.assistances.filter(
-            status__in=['AGUARDANDO', 'ATIVO']
+        self.cached_assistances_amount = self.assistances.filter(
+            status__in=self.COMMITTED_ASSISTANCE_STATUSES
         ).aggregate(
             total=Sum('total_amount')
         )['total'] or Decimal('0.00')
@@ -115,7 +135,7 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
             self.cached_incoming_movements -
             self.cached_outgoing_movements -
             self.cached_used_amount -
-            cached_assistances
+            self.cached_assistances_amount
         )
 
         # Garantir que não fique negativo
@@ -124,13 +144,50 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
     def update_calculated_amounts(self):
         """Atualiza valores calculados e salva"""
         self.recalculate_cached_amounts()
-        self.save(update_fields=[
-            'cached_used_amount',
-            'cached_incoming_movements',
-            'cached_outgoing_movements',
-            'available_amount',
-            'updated_at'
-        ])
+        self.save(update_fields=self.CACHED_AMOUNT_FIELDS + ['updated_at'])
+
+    @classmethod
+    def apply_amount_deltas(cls, budget_id, used=Decimal('0.00'), incoming=Decimal('0.00'),
+                            outgoing=Decimal('0.00'), assistances=Decimal('0.00')):
+        """
+        Aplica variações incrementais aos valores em cache com um único UPDATE,
+        sem reagregar linhas, movimentações e auxílios do orçamento.
+
+        O valor disponível é derivado das próprias colunas em cache, então não
+        acumula erro de arredondamento nem de limite em zero. O
+        recalculate_cached_amounts continua sendo o caminho completo, usado
+        para verificação e correção de divergências.
+        """
+        if not (used or incoming or outgoing or assistances):
+            return 0
+
+        decimal_field = models.DecimalField(max_digits=10, decimal_places=2)
+        available = (
+            F('total_amount') +
+            F('cached_incoming_movements') + incoming -
+            F('cached_outgoing_movements') - outgoing -
+            F('cached_used_amount') - used -
+            F('cached_assistances_amount') - assistances
+        )
+
+        # available_amount vem primeiro para que o cálculo use os valores
+        # anteriores das colunas em qualquer banco
+        updated = cls.objects.filter(pk=budget_id).update(
+            available_amount=Greatest(available, Value(Decimal('0.00')), output_field=decimal_field),
+            cached_used_amount=F('cached_used_amount') + used,
+            cached_incoming_movements=F('cached_incoming_movements') + incoming,
+            cached_outgoing_movements=F('cached_outgoing_movements') + outgoing,
+            cached_assistances_amount=F('cached_assistances_amount') + assistances,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            notify_cached_amounts_changed(cls)
+        return updated
+
+    def apply_deltas(self, **deltas):
+        """Aplica variações incrementais e recarrega os valores em cache da instância"""
+        if self.apply_amount_deltas(self.pk, **deltas):
+            self.refresh_from_db(fields=self.CACHED_AMOUNT_FIELDS)
 
     def save(self, *args, **kwargs):
         if 'update_fields' not in kwargs or 'available_amount' not in kwargs.get('update_fields', []):
@@ -144,17 +201,17 @@ class Budget(models.Model, HierarchicalQuerysetMixin):
     @classmethod
     def get_objects_by_direction(cls, direction):
         """Filtra orçamentos por direção"""
-        return cls.objects.filter(management_center__direction=direction)
+        return cls.objects.filter(management_center_id__in=HierarchyClosure.management_center_ids(direction))
 
     @classmethod
     def get_objects_by_management(cls, management):
         """Filtra orçamentos por gerência"""
-        return cls.objects.filter(management_center__management=management)
+        return cls.objects.filter(management_center_id__in=HierarchyClosure.management_center_ids(management))
 
     @classmethod
     def get_objects_by_coordination(cls, coordination):
         """Filtra orçamentos por coordenação"""
-        return cls.objects.filter(management_center__coordination=coordination)
+        return cls.objects.filter(management_center_id__in=HierarchyClosure.management_center_ids(coordination))
 
     @classmethod
     def get_objects_by_user(cls, user):
@@ -189,17 +246,28 @@ class BudgetMovement(models.Model):
     created_by = models.ForeignKey(User, related_name='budget_movements_created', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Criado por')
     updated_by = models.ForeignKey(User, related_name='budget_movements_updated', on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Atualizado por')
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        old_instance = None if is_new else BudgetMovement.objects.get(pk=self.pk)
+
         super().save(*args, **kwargs)
-        self.source.update_calculated_amounts()
-        self.destination.update_calculated_amounts()
 
+        # Aplicar apenas a variação nos orçamentos envolvidos
+        if old_instance:
+            Budget.apply_amount_deltas(old_instance.source_id, outgoing=-old_instance.amount)
+            Budget.apply_amount_deltas(old_instance.destination_id, incoming=-old_instance.amount)
+        self.source.apply_deltas(outgoing=self.amount)
+        self.destination.apply_deltas(incoming=self.amount)
+
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         source_budget = self.source
         destination_budget = self.destination
+        amount = self.amount
         super().delete(*args, **kwargs)
-        source_budget.update_calculated_amounts()
-        destination_budget.update_calculated_amounts()
+        source_budget.apply_deltas(outgoing=-amount)
+        destination_budget.apply_deltas(incoming=-amount)
 
     def __str__(self):
         return f"{self.source} -> {self.destination} ({self.amount})"
@@ -0,0 +1,177 @@
+"""
+Recálculo dos valores em cache de orçamentos.
+
+- Fila de recálculo adiado: exclusões de linhas que não passam pelo model
+  (queryset, cascata) marcam o orçamento como pendente e o recálculo completo
+  acontece uma única vez por orçamento, no commit da transação. Saldos de
+  linhas e orçamentos alterados pelos models recebem a variação na própria
+  transação (BudgetLine.apply_available_delta, Budget.apply_amount_deltas).
+- Reconciliação em conjunto: recalcula muitos orçamentos com consultas
+  agrupadas (GROUP BY) e grava com bulk_update, em lotes com lock de linha.
+- Aviso de alteração: update, bulk_update e bulk_create não disparam
+  post_save, então quem grava valores em cache por esses caminhos chama
+  notify_cached_amounts_changed, que envia cached_amounts_changed após o
+  commit (ex.: para invalidar o cache de respostas da Alice).
+"""
+import logging
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.dispatch import Signal
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Enviado após o commit com tables={db_table, ...} das tabelas alteradas
+cached_amounts_changed = Signal()
+
+_pending = threading.local()
+
+
+def notify_cached_amounts_changed(*models):
+    """Agenda o aviso de que valores em cache dos models mudaram sem post_save"""
+    tables = frozenset(model._meta.db_table for model in models)
+    transaction.on_commit(lambda: cached_amounts_changed.send(sender=None, tables=tables))
+
+
+def _get_pending():
+    if not hasattr(_pending, 'budgets'):
+        _pending.budgets = set()
+    return _pending
+
+
+def mark_budget_dirty(budget_id):
+    """Agenda o recálculo completo do orçamento para o commit da transação"""
+    if budget_id is None:
+        return
+    _get_pending().budgets.add(budget_id)
+    transaction.on_commit(flush_pending)
+
+
+def flush_pending(budget_ids=None):
+    """
+    Recalcula os orçamentos pendentes.
+
+    Sem argumentos, processa toda a fila (uso no commit). Com ids, processa
+    apenas os informados que estiverem pendentes, permitindo que validações de
+    saldo leiam valores atualizados dentro da própria transação. Erros são
+    registrados com os ids afetados e propagados.
+    """
+    pending = _get_pending()
+    if budget_ids is None:
+        taken = set(pending.budgets)
+    else:
+        taken = pending.budgets.intersection(budget_ids)
+    pending.budgets.difference_update(taken)
+
+    if not taken:
+        return
+
+    try:
+        reconcile_budget_cached_amounts(budget_ids=taken)
+    except Exception:
+        logger.exception(f"Falha no recálculo adiado dos orçamentos {sorted(taken)}")
+        raise
+
+    logger.debug(f"Recálculo adiado: {len(taken)} orçamento(s)")
+
+
+def _grouped_totals(queryset, group_field, sum_field):
+    return dict(
+        queryset.order_by().values(group_field)
+        .annotate(total=Sum(sum_field))
+        .values_list(group_field, 'total')
+    )
+
+
+def compute_budget_cached_amounts(budget_ids):
+    """
+    Calcula os valores em cache esperados dos orçamentos informados com quatro
+    consultas agrupadas, no lugar das quatro agregações por orçamento de
+    Budget.recalculate_cached_amounts. Retorna {budget_id: {campo: valor}}.
+    """
+    from budget.models import Budget, BudgetMovement
+    from budgetline.models import BudgetLine
+    from aid.models import Assistance
+
+    used = _grouped_totals(BudgetLine.objects.filter(budget_id__in=budget_ids), 'budget_id', 'budgeted_amount')
+    incoming = _grouped_totals(BudgetMovement.objects.filter(destination_id__in=budget_ids), 'destination_id', 'amount')
+    outgoing = _grouped_totals(BudgetMovement.objects.filter(source_id__in=budget_ids), 'source_id', 'amount')
+    assistances = _grouped_totals(
+        Assistance.objects.filter(budget_id__in=budget_ids, status__in=Budget.COMMITTED_ASSISTANCE_STATUSES),
+        'budget_id', 'total_amount'
+    )
+
+    zero = Decimal('0.00')
+    expected = {}
+    for pk, total_amount in Budget.objects.filter(pk__in=budget_ids).values_list('pk', 'total_amount'):
+        values = {
+            'cached_used_amount': used.get(pk) or zero,
+            'cached_incoming_movements': incoming.get(pk) or zero,
+            'cached_outgoing_movements': outgoing.get(pk) or zero,
+            'cached_assistances_amount': assistances.get(pk) or zero,
+        }
+        values['available_amount'] = max(
+            total_amount +
+            values['cached_incoming_movements'] -
+            values['cached_outgoing_movements'] -
+            values['cached_used_amount'] -
+            values['cached_assistances_amount'],
+            zero
+        )
+        expected[pk] = values
+    return expected
+
+
+def reconcile_budget_cached_amounts(budget_ids=None, apply=True, batch_size=500):
+    """
+    Compara os valores em cache dos orçamentos com os recalculados e, se
+    apply=True, corrige as divergências com bulk_update.
+
+    Processa em lotes de batch_size orçamentos; cada lote é bloqueado com
+    select_for_update durante o cálculo e a gravação, o que permite rodar com
+    o sistema em uso. Retorna a lista de divergências encontradas:
+    [{'budget_id': id, 'fields': {campo: (valor_em_cache, valor_esperado)}}].
+    """
+    from budget.models import Budget
+
+    queryset = Budget.objects.order_by('pk')
+    if budget_ids is not None:
+        queryset = queryset.filter(pk__in=budget_ids)
+    all_ids = list(queryset.values_list('pk', flat=True))
+
+    drift = []
+    for start in range(0, len(all_ids), batch_size):
+        chunk_ids = all_ids[start:start + batch_size]
+
+        with transaction.atomic():
+            current = {
+                row['pk']: row for row in Budget.objects.select_for_update()
+                .filter(pk__in=chunk_ids).order_by('pk')
+                .values('pk', *Budget.CACHED_AMOUNT_FIELDS)
+            }
+            expected = compute_budget_cached_amounts(chunk_ids)
+
+            changed = []
+            for pk, values in expected.items():
+                if pk not in current:
+                    continue
+                fields = {
+                    field: (current[pk][field], value)
+                    for field, value in values.items()
+                    if current[pk][field] != value
+                }
+                if not fields:
+                    continue
+                drift.append({'budget_id': pk, 'fields': fields})
+                changed.append(Budget(pk=pk, updated_at=timezone.now(), **values))
+
+            if apply and changed:
+                Budget.objects.bulk_update(
+                    changed, Budget.CACHED_AMOUNT_FIELDS + ['updated_at'], batch_size=batch_size
+                )
+                notify_cached_amounts_changed(Budget)
+
+    return drift
@@ -9,6 +9,7 @@ from django.db import IntegrityError
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.utils.decorators import method_decorator
 import logging
 
 from .models import Budget, BudgetMovement
@@ -18,6 +19,7 @@ from .utils.pdf_generator import generate_budget_pdf, generate_budget_summary_pd
 from center.models import ManagementCenter
 from center.serializers import ManagementCenterSerializer
 from accounts.mixins import HierarchicalFilterMixin
+from core.db_routers import use_replica
 
 
 # Helper function for secure error responses
@@ -37,6 +39,7 @@ class PDFExportRateThrottle(UserRateThrottle):
 
 
 # Budget Views
+@method_decorator(use_replica, name='get')
 class BudgetListView(generics.ListAPIView, HierarchicalFilterMixin):
     queryset = Budget.objects.select_related('management_center', 'created_by', 'updated_by').prefetch_related('budget_lines')
     serializer_class = BudgetSerializer
@@ -95,10 +98,10 @@ class BudgetCreateView(generics.CreateAPIView, HierarchicalFilterMixin):
         
         # Verificar hierarquia apenas se management_center foi especificado
         if management_center:
-            accessible_centers = self.get_accessible_management_centers(self.request.user)
-            logger.info(f"User {self.request.user.email} has access to {accessible_centers.count()} centers")
+            accessible_center_ids = self.get_accessible_management_center_ids(self.request.user)
+            logger.info(f"User {self.request.user.email} has access to {len(accessible_center_ids)} centers")
             
-            if accessible_centers.count() == 0:
+            if not accessible_center_ids:
                 logger.warning(f"User {self.request.user.email} has no accessible centers - checking if is superuser")
                 
                 # Se é superuser mas não tem centros acessíveis, verificar se tem employee e grupos
@@ -109,7 +112,7 @@ class BudgetCreateView(generics.CreateAPIView, HierarchicalFilterMixin):
                     if not self.request.user.groups.filter(name='Presidente').exists():
                         logger.error(f"Superuser {self.request.user.email} is not in 'Presidente' group")
             
-            if management_center not in accessible_centers:
+            if management_center.pk not in accessible_center_ids:
                 logger.error(f"User {self.request.user.email} cannot access center {management_center.name}")
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("Você não tem permissão para criar budgets para este centro gestor.")
@@ -399,6 +402,7 @@ def budget_form_metadata(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([PDFExportRateThrottle])
+@use_replica
 def generate_budget_report_pdf(request, budget_id):
     """
     Gera e retorna um relatório PDF completo para um orçamento específico.
@@ -460,6 +464,7 @@ def generate_budget_report_pdf(request, budget_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([PDFExportRateThrottle])
+@use_replica
 def generate_budget_summary_report_pdf(request):
     """
     Gera e retorna um relatório PDF resumido com múltiplos orçamentos.
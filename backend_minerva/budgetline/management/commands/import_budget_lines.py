@@ -0,0 +1,59 @@
+"""
+Comando para importar linhas orçamentárias em lote a partir de um arquivo CSV ou JSON.
+Uso: python manage.py import_budget_lines linhas.csv --mode partial --user-email admin@empresa.com
+"""
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import User
+from budgetline.services.bulk_import import (
+    MODE_ATOMIC, MODE_PARTIAL, import_budget_lines, parse_budget_lines_file
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa linhas orçamentárias em lote a partir de um arquivo CSV ou JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho do arquivo CSV (com cabeçalho) ou JSON')
+        parser.add_argument(
+            '--mode',
+            choices=[MODE_ATOMIC, MODE_PARTIAL],
+            default=MODE_ATOMIC,
+            help='atomic: cancela tudo se houver erro; partial: importa as linhas válidas',
+        )
+        parser.add_argument(
+            '--user-email',
+            help='E-mail do usuário registrado como criador das linhas (opcional)',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options.get('user_email'):
+            try:
+                user = User.objects.get(email=options['user_email'])
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário com e-mail {options['user_email']} não encontrado")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                rows = parse_budget_lines_file(file.read(), options['path'])
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler o arquivo: {e}')
+
+        self.stdout.write(f'Importando {len(rows)} linhas (modo {options["mode"]})...')
+
+        try:
+            result = import_budget_lines(rows, user=user, mode=options['mode'])
+        except ValidationError as e:
+            raise CommandError(e.detail.get('detail', e.detail) if isinstance(e.detail, dict) else e.detail)
+
+        for error in result['errors']:
+            self.stdout.write(self.style.ERROR(f"  Linha {error['row']}: {error['errors']}"))
+
+        if result['created']:
+            self.stdout.write(
+                self.style.SUCCESS(f"[OK] {len(result['created'])} linhas orçamentárias importadas")
+            )
+        else:
+            self.stdout.write(self.style.WARNING('Nenhuma linha orçamentária foi importada'))
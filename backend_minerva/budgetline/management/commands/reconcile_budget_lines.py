@@ -0,0 +1,57 @@
+"""
+Comando para reconciliar o valor disponível das linhas orçamentárias.
+Uso: python manage.py reconcile_budget_lines [--budget-id ID] [--repair]
+"""
+from django.core.management.base import BaseCommand
+from budget.models import Budget
+from budgetline.services.reconciliation import reconcile_budget_line_available_amounts
+
+
+class Command(BaseCommand):
+    help = 'Verifica e opcionalmente corrige o valor disponível das linhas orçamentárias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-id',
+            type=int,
+            help='Reconciliar apenas as linhas de um orçamento (opcional)',
+        )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Corrige as divergências encontradas (sem esta opção apenas reporta)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Quantidade de linhas bloqueadas por lote (padrão: 500)',
+        )
+
+    def handle(self, *args, **options):
+        budget_id = options.get('budget_id')
+
+        if budget_id and not Budget.objects.filter(pk=budget_id).exists():
+            self.stdout.write(self.style.ERROR(f'Orçamento com ID {budget_id} não encontrado'))
+            return
+
+        scope = f'do orçamento ID {budget_id}' if budget_id else 'de todos os orçamentos'
+        self.stdout.write(f'Reconciliando linhas orçamentárias {scope}...')
+
+        drift = reconcile_budget_line_available_amounts(
+            budget_id=budget_id,
+            apply=options['repair'],
+            batch_size=options['batch_size'],
+        )
+
+        for entry in drift:
+            self.stdout.write(
+                f"  Linha {entry['budget_line_id']}: disponível {entry['cached']} -> {entry['expected']}"
+            )
+
+        if options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'[OK] {len(drift)} linhas orçamentárias corrigidas'))
+        else:
+            self.stdout.write(
+                self.style.WARNING(f'{len(drift)} linhas orçamentárias com valor disponível divergente')
+            )
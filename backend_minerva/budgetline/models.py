@@ -1,11 +1,15 @@
 from django.db import models, transaction
 from django.core.validators import MinValueValidator
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from accounts.models import User
 from budget.models import Budget
 from employee.models import Employee
-from center.models import ManagementCenter, RequestingCenter
+from center.models import ManagementCenter, RequestingCenter, HierarchyClosure
 from accounts.mixins import HierarchicalQuerysetMixin
 from decimal import Decimal
+from budget.services.recalculation import flush_pending, notify_cached_amounts_changed
 from .exceptions import InsufficientBudgetLineException, BudgetLineOperationException
 
 class BudgetLine(models.Model, HierarchicalQuerysetMixin):
@@ -204,11 +208,14 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
 
         is_new = self.pk is None
         old_budgeted_amount = Decimal('0.00')
+        old_budget_id = None
 
         if not is_new:
-            # Recuperar valor antigo se estiver atualizando
-            old_instance = BudgetLine.objects.get(pk=self.pk)
+            # Recuperar valor antigo se estiver atualizando (com lock: o valor
+            # disponível é alterado por contratos e movimentações concorrentes)
+            old_instance = BudgetLine.objects.select_for_update().get(pk=self.pk)
             old_budgeted_amount = old_instance.budgeted_amount
+            old_budget_id = old_instance.budget_id
 
         # Se for nova linha, validar se o orçamento tem saldo suficiente
         if is_new:
@@ -216,6 +223,7 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
                 raise BudgetLineOperationException("A linha orçamentária deve estar vinculada a um orçamento.")
 
             # Recarregar orçamento com lock para evitar race conditions
+            flush_pending(budget_ids=[self.budget.pk])
             budget = Budget.objects.select_for_update().get(pk=self.budget.pk)
 
             if budget.available_amount < self.budgeted_amount:
@@ -233,6 +241,7 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
         # Se o valor orçado mudou em uma atualização
         if not is_new and old_budgeted_amount != self.budgeted_amount:
             difference = self.budgeted_amount - old_budgeted_amount
+            flush_pending(budget_ids=[self.budget.pk])
             budget = Budget.objects.select_for_update().get(pk=self.budget.pk)
 
             if difference > 0:  # Aumento no valor
@@ -247,19 +256,26 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
             # mas não pode ficar negativo
             if difference < 0:  # Redução no valor
                 reduction = abs(difference)
-                if reduction > self.available_amount:
+                if reduction > old_instance.available_amount:
                     # Não pode reduzir mais do que está disponível na linha
                     raise BudgetLineOperationException(
                         f"Operação não permitida: não é possível reduzir R$ {reduction:.2f} "
-                        f"pois apenas R$ {self.available_amount:.2f} está disponível na linha."
+                        f"pois apenas R$ {old_instance.available_amount:.2f} está disponível na linha."
                     )
-                self.available_amount -= reduction
+
+            # O disponível acompanha a variação do valor orçado, a partir do valor bloqueado
+            self.available_amount = max(old_instance.available_amount + difference, Decimal('0.00'))
 
         super().save(*args, **kwargs)
 
-        # Atualizar valores calculados do orçamento relacionado
-        if self.budget:
-            self.budget.update_calculated_amounts()
+        # Aplicar no orçamento apenas a variação do valor orçado
+        if is_new:
+            self.budget.apply_deltas(used=self.budgeted_amount)
+        elif old_budget_id != self.budget_id:
+            Budget.apply_amount_deltas(old_budget_id, used=-old_budgeted_amount)
+            self.budget.apply_deltas(used=self.budgeted_amount)
+        elif old_budgeted_amount != self.budgeted_amount:
+            self.budget.apply_deltas(used=self.budgeted_amount - old_budgeted_amount)
 
         if not is_new:
             self.create_version("Atualização da linha orçamentária", kwargs.get('updated_by'))
@@ -279,12 +295,37 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
             )
 
         budget = self.budget
+        budgeted_amount = self.budgeted_amount
+        self._skip_signal = True
         super().delete(*args, **kwargs)
 
-        # Atualizar valores calculados do orçamento relacionado
-        # O valor da linha retorna automaticamente ao orçamento via recalculate_cached_amounts
+        # Devolver o valor da linha ao orçamento
         if budget:
-            budget.update_calculated_amounts()
+            budget.apply_deltas(used=-budgeted_amount)
+
+    @classmethod
+    def apply_available_delta(cls, budget_line_id, delta):
+        """
+        Aplica uma variação ao valor disponível da linha com um único UPDATE,
+        dentro da transação de quem alterou contratos ou movimentações.
+
+        Como em Budget.apply_amount_deltas, o valor não fica negativo; o
+        recalculate_available_amount (e a reconciliação em conjunto) continua
+        sendo o caminho completo para verificar e corrigir divergências.
+        """
+        if budget_line_id is None or not delta:
+            return 0
+
+        updated = cls.objects.filter(pk=budget_line_id).update(
+            available_amount=Greatest(
+                F('available_amount') + delta, Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            notify_cached_amounts_changed(cls)
+        return updated
 
     def recalculate_available_amount(self):
         """
@@ -324,7 +365,11 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
         return self.available_amount
 
     def update_available_amount(self):
-        """Atualiza e salva o valor disponível"""
+        """
+        Atualiza e salva o valor disponível com o recálculo completo.
+        Nos saves de contratos e movimentações apenas a variação é aplicada,
+        via apply_available_delta.
+        """
         self.recalculate_available_amount()
         self.save(update_fields=['available_amount', 'updated_at'])
 
@@ -362,21 +407,21 @@ class BudgetLine(models.Model, HierarchicalQuerysetMixin):
     def get_objects_by_direction(cls, direction):
         """Retorna linhas orçamentárias baseadas na direção"""
         return cls.objects.filter(
-            budget__management_center__direction=direction
+            budget__management_center_id__in=HierarchyClosure.management_center_ids(direction)
         )
     
     @classmethod
     def get_objects_by_management(cls, management):
         """Retorna linhas orçamentárias baseadas na gerência"""
         return cls.objects.filter(
-            budget__management_center__management=management
+            budget__management_center_id__in=HierarchyClosure.management_center_ids(management)
         )
     
     @classmethod
     def get_objects_by_coordination(cls, coordination):
         """Retorna linhas orçamentárias baseadas na coordenação - filtro principal"""
         return cls.objects.filter(
-            budget__management_center__coordination=coordination
+            budget__management_center_id__in=HierarchyClosure.management_center_ids(coordination)
         )
     
     @classmethod
@@ -411,6 +456,10 @@ class BudgetLineMovement(models.Model):
         - Subtrair da origem e adicionar ao destino
         """
         is_new = self.pk is None
+        old_instance = None
+
+        if not is_new:
+            old_instance = BudgetLineMovement.objects.get(pk=self.pk)
 
         if is_new:
             # Validações
@@ -424,7 +473,7 @@ class BudgetLineMovement(models.Model):
                     "Operação não permitida: a linha de origem não pode ser igual à linha de destino."
                 )
 
-            # Recarregar linha de origem com lock
+            # Recarregar linha de origem com lock para evitar race conditions
             source = BudgetLine.objects.select_for_update().get(pk=self.source_line.pk)
 
             # Validar saldo disponível na linha de origem
@@ -438,10 +487,16 @@ class BudgetLineMovement(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Atualizar valores das linhas envolvidas
-        if is_new:
-            self.source_line.update_available_amount()
-            self.destination_line.update_available_amount()
+        # Desfazer a movimentação anterior e aplicar a atual nas linhas envolvidas
+        if old_instance is not None:
+            old_instance.apply_to_lines(reverse=True)
+        self.apply_to_lines()
+
+    def apply_to_lines(self, reverse=False):
+        """Subtrai o valor da linha de origem e soma na de destino (ou o inverso)"""
+        amount = -self.movement_amount if reverse else self.movement_amount
+        BudgetLine.apply_available_delta(self.source_line_id, -amount)
+        BudgetLine.apply_available_delta(self.destination_line_id, amount)
 
     @transaction.atomic
     def delete(self, *args, **kwargs):
@@ -450,16 +505,11 @@ class BudgetLineMovement(models.Model):
         - Devolver o valor à linha de origem
         - Subtrair da linha de destino
         """
-        source = self.source_line
-        destination = self.destination_line
-
+        self._skip_signal = True
         super().delete(*args, **kwargs)
 
-        # Atualizar valores das linhas
-        if source:
-            source.update_available_amount()
-        if destination:
-            destination.update_available_amount()
+        # Devolver o valor à origem e retirar do destino
+        self.apply_to_lines(reverse=True)
 
     def __str__(self):
         if self.source_line and self.destination_line:
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import BudgetLine, BudgetLineMovement, BudgetLineVersion
+from budget.models import Budget
+from center.models import ManagementCenter, RequestingCenter
+from employee.models import Employee
 from center.serializers import ManagementCenterSerializer, UserInfoSerializer
 from employee.serializers import EmployeeSerializer
 
@@ -81,6 +84,84 @@ class BudgetLineSerializer(serializers.ModelSerializer):
 
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolve a chave primária a partir dos objetos pré-carregados no contexto
+    ('preloaded'), evitando uma consulta por linha na importação em lote
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        instance = preloaded.get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class BudgetLineBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer de validação de cada linha da importação em lote
+    """
+    # Campos relacionados resolvidos em lote: campo -> model
+    BULK_RELATED_FIELDS = {
+        'budget': Budget,
+        'management_center': ManagementCenter,
+        'requesting_center': RequestingCenter,
+        'main_fiscal': Employee,
+        'secondary_fiscal': Employee,
+    }
+
+    budget = PreloadedPrimaryKeyRelatedField(queryset=Budget.objects.all())
+    management_center = PreloadedPrimaryKeyRelatedField(
+        queryset=ManagementCenter.objects.all(), required=False, allow_null=True
+    )
+    requesting_center = PreloadedPrimaryKeyRelatedField(
+        queryset=RequestingCenter.objects.all(), required=False, allow_null=True
+    )
+    main_fiscal = PreloadedPrimaryKeyRelatedField(
+        queryset=Employee.objects.all(), required=False, allow_null=True
+    )
+    secondary_fiscal = PreloadedPrimaryKeyRelatedField(
+        queryset=Employee.objects.all(), required=False, allow_null=True
+    )
+
+    class Meta:
+        model = BudgetLine
+        fields = [
+            'budget', 'category', 'expense_type', 'management_center', 'requesting_center',
+            'summary_description', 'object', 'budget_classification', 'main_fiscal',
+            'secondary_fiscal', 'contract_type', 'probable_procurement_type', 'budgeted_amount',
+            'process_status', 'contract_status', 'status', 'contract_notes'
+        ]
+
+
+class BudgetLineBulkImportSerializer(serializers.Serializer):
+    """
+    Payload da importação em lote: linhas em JSON ou arquivo CSV/JSON
+    """
+    MODE_CHOICES = [
+        ('atomic', 'Tudo ou nada'),
+        ('partial', 'Importar linhas válidas e reportar erros'),
+    ]
+
+    mode = serializers.ChoiceField(choices=MODE_CHOICES, default='atomic')
+    rows = serializers.ListField(child=serializers.DictField(), required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('rows') and not attrs.get('file'):
+            raise serializers.ValidationError("Informe as linhas ('rows') ou um arquivo CSV/JSON ('file').")
+        return attrs
+
+
 class BudgetLineMovementSerializer(serializers.ModelSerializer):
     class Meta:
         model = BudgetLineMovement
@@ -0,0 +1,167 @@
+"""
+Importação em lote de linhas orçamentárias.
+
+A validação de saldo é feita em memória contra um snapshot dos orçamentos
+bloqueados (select_for_update), as linhas são inseridas com bulk_create e cada
+orçamento pai recebe uma única atualização dos valores em cache ao final.
+"""
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from budget.models import Budget
+from budget.services.recalculation import flush_pending, notify_cached_amounts_changed
+from budgetline.models import BudgetLine
+from budgetline.serializers import BudgetLineBulkItemSerializer
+from budgetline.exceptions import BudgetLineOperationException
+
+logger = logging.getLogger(__name__)
+
+MODE_ATOMIC = 'atomic'
+MODE_PARTIAL = 'partial'
+
+MAX_ROWS = 5000
+
+
+def parse_budget_lines_file(content, filename=''):
+    """
+    Converte um arquivo CSV (com cabeçalho) ou JSON (lista de objetos) em
+    uma lista de dicionários. Células vazias do CSV são ignoradas.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if filename.lower().endswith('.json') or content.lstrip().startswith('['):
+        try:
+            rows = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise BudgetLineOperationException(f"Arquivo JSON inválido: {e}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise BudgetLineOperationException("O arquivo JSON deve conter uma lista de objetos.")
+        return rows
+
+    reader = csv.DictReader(io.StringIO(content), delimiter=_sniff_delimiter(content))
+    return [
+        {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        for row in reader
+    ]
+
+
+def _sniff_delimiter(content):
+    header = content.split('\n', 1)[0]
+    return ';' if header.count(';') > header.count(',') else ','
+
+
+def _preload_related(rows):
+    """Carrega em uma consulta por model os objetos referenciados pelas linhas"""
+    ids_by_field = defaultdict(set)
+    for row in rows:
+        for field in BudgetLineBulkItemSerializer.BULK_RELATED_FIELDS:
+            value = row.get(field)
+            try:
+                if value not in (None, ''):
+                    ids_by_field[field].add(int(value))
+            except (TypeError, ValueError):
+                continue
+
+    preloaded = {}
+    for field, model in BudgetLineBulkItemSerializer.BULK_RELATED_FIELDS.items():
+        preloaded[field] = model.objects.in_bulk(ids_by_field[field]) if ids_by_field[field] else {}
+    return preloaded
+
+
+def import_budget_lines(rows, user=None, mode=MODE_ATOMIC):
+    """
+    Valida e cria linhas orçamentárias em lote.
+
+    mode='atomic': qualquer erro cancela a importação inteira.
+    mode='partial': cria as linhas válidas e reporta os erros por linha.
+
+    Retorna um dicionário com 'created' (ids criados), 'errors' (lista de
+    {'row': número da linha (1-based), 'errors': {...}}) e 'total'.
+    """
+    if mode not in (MODE_ATOMIC, MODE_PARTIAL):
+        raise BudgetLineOperationException(f"Modo de importação inválido: {mode}")
+    if len(rows) > MAX_ROWS:
+        raise BudgetLineOperationException(
+            f"A importação aceita no máximo {MAX_ROWS} linhas por lote (recebidas {len(rows)})."
+        )
+
+    context = {'preloaded': _preload_related(rows)}
+    errors = []
+    valid_rows = []
+
+    # Validação de campos sem consultas por linha
+    for index, row in enumerate(rows, start=1):
+        serializer = BudgetLineBulkItemSerializer(data=row, context=context)
+        if serializer.is_valid():
+            valid_rows.append((index, serializer.validated_data))
+        else:
+            errors.append({'row': index, 'errors': serializer.errors})
+
+    result = {'created': [], 'errors': errors, 'total': len(rows)}
+
+    if errors and mode == MODE_ATOMIC:
+        return result
+
+    with transaction.atomic():
+        budget_ids = sorted({data['budget'].pk for _, data in valid_rows})
+
+        # Snapshot dos orçamentos bloqueados, em ordem de pk para evitar deadlocks
+        flush_pending(budget_ids=budget_ids)
+        available = dict(
+            Budget.objects.select_for_update().filter(pk__in=budget_ids)
+            .order_by('pk').values_list('pk', 'available_amount')
+        )
+
+        used_by_budget = defaultdict(lambda: Decimal('0.00'))
+        lines = []
+        for index, data in valid_rows:
+            budget_id = data['budget'].pk
+            amount = data['budgeted_amount']
+            remaining = available[budget_id] - used_by_budget[budget_id]
+
+            if amount > remaining:
+                errors.append({
+                    'row': index,
+                    'errors': {
+                        'budgeted_amount': [
+                            f"Operação não permitida: o valor da linha orçamentária (R$ {amount:.2f}) "
+                            f"excede o saldo disponível do orçamento (R$ {remaining:.2f})."
+                        ]
+                    }
+                })
+                continue
+
+            used_by_budget[budget_id] += amount
+            lines.append(BudgetLine(
+                **data,
+                available_amount=amount,
+                created_by=user,
+                updated_by=user
+            ))
+
+        errors.sort(key=lambda error: error['row'])
+
+        if errors and mode == MODE_ATOMIC:
+            return result
+
+        created = BudgetLine.objects.bulk_create(lines, batch_size=500)
+        if created:
+            notify_cached_amounts_changed(BudgetLine)
+
+        # Uma única atualização dos valores em cache por orçamento
+        for budget_id, used in used_by_budget.items():
+            Budget.apply_amount_deltas(budget_id, used=used)
+
+    result['created'] = [line.pk for line in created]
+    logger.info(
+        f"Importação em lote de linhas orçamentárias: {len(created)} criadas, "
+        f"{len(errors)} com erro (modo {mode})"
+    )
+    return result
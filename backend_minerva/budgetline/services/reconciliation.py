@@ -0,0 +1,105 @@
+"""
+Reconciliação em conjunto do valor disponível das linhas orçamentárias.
+
+Equivalente a BudgetLine.recalculate_available_amount para muitas linhas de uma
+vez: os totais de contratos ativos e movimentações vêm de subconsultas
+agrupadas em uma única consulta por lote, e as correções são gravadas com
+bulk_update. Cada lote é bloqueado com select_for_update, o que permite rodar
+com o sistema em uso.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from budget.services.recalculation import notify_cached_amounts_changed
+from budgetline.models import BudgetLine, BudgetLineMovement
+
+logger = logging.getLogger(__name__)
+
+
+def _sum_subquery(queryset, line_field, sum_field):
+    """Soma de sum_field agrupada pela linha orçamentária referenciada em line_field"""
+    total = (
+        queryset.filter(**{line_field: OuterRef('pk')})
+        .order_by().values(line_field)
+        .annotate(total=Sum(sum_field))
+        .values('total')[:1]
+    )
+    return Coalesce(
+        Subquery(total),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def compute_available_amounts(line_ids):
+    """
+    Calcula o valor disponível esperado das linhas informadas em uma consulta.
+    Retorna {budget_line_id: (valor_atual, valor_esperado)}.
+    """
+    from contract.models import Contract
+
+    rows = BudgetLine.objects.filter(pk__in=line_ids).order_by('pk').annotate(
+        total_contracted=_sum_subquery(Contract.objects.filter(status='ATIVO'), 'budget_line', 'original_value'),
+        total_incoming=_sum_subquery(BudgetLineMovement.objects.all(), 'destination_line', 'movement_amount'),
+        total_outgoing=_sum_subquery(BudgetLineMovement.objects.all(), 'source_line', 'movement_amount'),
+    ).values_list(
+        'pk', 'available_amount', 'budgeted_amount', 'total_contracted', 'total_incoming', 'total_outgoing'
+    )
+
+    amounts = {}
+    for pk, current, budgeted, contracted, incoming, outgoing in rows:
+        expected = max(budgeted + incoming - outgoing - contracted, Decimal('0.00'))
+        amounts[pk] = (current, expected)
+    return amounts
+
+
+def reconcile_budget_line_available_amounts(budget_id=None, budget_line_ids=None, apply=False, batch_size=500):
+    """
+    Compara o available_amount das linhas com o valor recalculado e, se
+    apply=True, corrige as divergências.
+
+    Sem filtros processa todas as linhas; budget_id limita às linhas de um
+    orçamento e budget_line_ids a linhas específicas. Retorna a lista de
+    divergências: [{'budget_line_id': id, 'cached': valor, 'expected': valor}].
+    """
+    queryset = BudgetLine.objects.order_by('pk')
+    if budget_id is not None:
+        queryset = queryset.filter(budget_id=budget_id)
+    if budget_line_ids is not None:
+        queryset = queryset.filter(pk__in=budget_line_ids)
+    all_ids = list(queryset.values_list('pk', flat=True))
+
+    drift = []
+    for start in range(0, len(all_ids), batch_size):
+        chunk_ids = all_ids[start:start + batch_size]
+
+        with transaction.atomic():
+            # Lock das linhas do lote em ordem de pk, antes do cálculo
+            list(
+                BudgetLine.objects.select_for_update()
+                .filter(pk__in=chunk_ids).order_by('pk').values_list('pk', flat=True)
+            )
+            amounts = compute_available_amounts(chunk_ids)
+
+            changed = []
+            for pk, (cached, expected) in amounts.items():
+                if cached == expected:
+                    continue
+                drift.append({'budget_line_id': pk, 'cached': cached, 'expected': expected})
+                changed.append(BudgetLine(pk=pk, available_amount=expected, updated_at=timezone.now()))
+
+            if apply and changed:
+                BudgetLine.objects.bulk_update(changed, ['available_amount', 'updated_at'], batch_size=batch_size)
+                notify_cached_amounts_changed(BudgetLine)
+
+    if drift:
+        logger.debug(
+            f"Reconciliação de linhas orçamentárias: {len(drift)} divergência(s) "
+            f"{'corrigida(s)' if apply else 'encontrada(s)'}"
+        )
+    return drift
@@ -1,53 +1,33 @@
 """
 Signals para atualização automática de valores relacionados
 """
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from budget.services.recalculation import mark_budget_dirty
 from .models import BudgetLine, BudgetLineMovement
 
 
-@receiver(post_save, sender=BudgetLine)
-def update_budget_on_line_save(sender, instance, created, **kwargs):
-    """
-    Após salvar uma linha orçamentária, atualizar o orçamento pai
-    """
-    # Evitar recursão verificando se já está em uma transação de update
-    if hasattr(instance, '_skip_signal'):
-        return
-
-    if instance.budget:
-        instance.budget.update_calculated_amounts()
-
-
 @receiver(post_delete, sender=BudgetLine)
 def update_budget_on_line_delete(sender, instance, **kwargs):
     """
-    Após deletar uma linha orçamentária, atualizar o orçamento pai
-    """
-    if instance.budget:
-        instance.budget.update_calculated_amounts()
-
-
-@receiver(post_save, sender=BudgetLineMovement)
-def update_lines_on_movement_save(sender, instance, created, **kwargs):
-    """
-    Após salvar uma movimentação, atualizar as linhas de origem e destino
+    Após deletar uma linha orçamentária fora de BudgetLine.delete (ex.: exclusão
+    via queryset), agendar o recálculo do orçamento pai. Criações, alterações e
+    exclusões feitas pelo model já aplicam a variação no orçamento.
     """
     if hasattr(instance, '_skip_signal'):
         return
 
-    if instance.source_line:
-        instance.source_line.update_available_amount()
-    if instance.destination_line:
-        instance.destination_line.update_available_amount()
+    mark_budget_dirty(instance.budget_id)
 
 
 @receiver(post_delete, sender=BudgetLineMovement)
 def update_lines_on_movement_delete(sender, instance, **kwargs):
     """
-    Após deletar uma movimentação, atualizar as linhas de origem e destino
+    Após deletar uma movimentação fora de BudgetLineMovement.delete (ex.: exclusão
+    via queryset ou em cascata), devolver o valor à linha de origem e retirá-lo
+    da linha de destino
     """
-    if instance.source_line:
-        instance.source_line.update_available_amount()
-    if instance.destination_line:
-        instance.destination_line.update_available_amount()
+    if hasattr(instance, '_skip_signal'):
+        return
+
+    instance.apply_to_lines(reverse=True)
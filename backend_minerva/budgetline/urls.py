@@ -3,6 +3,7 @@ from django.urls import path
 from .views import (
     BudgetLineListAPIView,
     BudgetLineCreateAPIView,
+    BudgetLineBulkCreateAPIView,
     BudgetLineRetrieveAPIView,
     BudgetLineUpdateAPIView,
     BudgetLineDestroyAPIView,
@@ -21,6 +22,7 @@ from .views import (
 urlpatterns = [
     path('budgetslines/', BudgetLineListAPIView.as_view(), name='budgetline-list'),
     path('budgetslines/create/', BudgetLineCreateAPIView.as_view(), name='budgetline-create'),
+    path('budgetslines/bulk-create/', BudgetLineBulkCreateAPIView.as_view(), name='budgetline-bulk-create'),
     path('budgetslines/<int:pk>/', BudgetLineRetrieveAPIView.as_view(), name='budgetline-retrieve'),
     path('budgetslines/<int:pk>/update/', BudgetLineUpdateAPIView.as_view(), name='budgetline-update'),
     path('budgetslines/<int:pk>/delete/', BudgetLineDestroyAPIView.as_view(), name='budgetline-destroy'),
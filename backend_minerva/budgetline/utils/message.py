@@ -9,4 +9,7 @@ BUDGETSLINE_MESSAGES = {
     'FORBIDDEN': 'Acesso negado',
     'AUTHENTICATION_REQUIRED': 'Autenticação necessária',
     'ALREADY_EXISTS': 'Linha orçamentária já existe',
+    'BULK_CREATE_SUCCESS': 'Linhas orçamentárias importadas com sucesso',
+    'BULK_CREATE_PARTIAL': 'Importação concluída com erros em algumas linhas',
+    'BULK_CREATE_FAILED': 'Nenhuma linha orçamentária foi importada',
 }
\ No newline at end of file
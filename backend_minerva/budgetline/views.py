@@ -2,7 +2,11 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 
 from .models import BudgetLine, BudgetLineMovement, BudgetLineVersion
-from .serializers import BudgetLineSerializer, BudgetLineMovementSerializer, BudgetLineVersionSerializer
+from .serializers import (
+    BudgetLineSerializer, BudgetLineMovementSerializer, BudgetLineVersionSerializer,
+    BudgetLineBulkImportSerializer
+)
+from .services.bulk_import import import_budget_lines, parse_budget_lines_file
 from .utils.message import BUDGETSLINE_MESSAGES
 
 
@@ -34,6 +38,35 @@ class BudgetLineCreateAPIView(generics.CreateAPIView):
         return response
 
 
+class BudgetLineBulkCreateAPIView(generics.GenericAPIView):
+    """
+    Importação em lote de linhas orçamentárias (JSON em 'rows' ou arquivo CSV/JSON em 'file').
+    Modo 'atomic' (padrão) cancela tudo se houver erro; 'partial' importa as linhas válidas.
+    """
+    serializer_class = BudgetLineBulkImportSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        rows = serializer.validated_data.get('rows')
+        upload = serializer.validated_data.get('file')
+        if upload:
+            rows = parse_budget_lines_file(upload.read(), upload.name)
+
+        user = request.user if request.user.is_authenticated else None
+        result = import_budget_lines(rows, user=user, mode=serializer.validated_data['mode'])
+
+        if not result['created']:
+            message, response_status = BUDGETSLINE_MESSAGES['BULK_CREATE_FAILED'], status.HTTP_400_BAD_REQUEST
+        elif result['errors']:
+            message, response_status = BUDGETSLINE_MESSAGES['BULK_CREATE_PARTIAL'], status.HTTP_207_MULTI_STATUS
+        else:
+            message, response_status = BUDGETSLINE_MESSAGES['BULK_CREATE_SUCCESS'], status.HTTP_201_CREATED
+
+        return Response({'message': message, 'data': result}, status=response_status)
+
+
 class BudgetLineRetrieveAPIView(generics.RetrieveAPIView):
     queryset = BudgetLine.objects.all()
     serializer_class = BudgetLineSerializer
@@ -6,3 +6,6 @@ class CenterConfig(AppConfig):
     name = 'center'
     verbose_name = 'Centro'
     verbose_name_plural = 'Centros'
+
+    def ready(self):
+        import center.signals
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from center.services.closure import get_closure_builder
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a tabela de fechamento da hierarquia (Direção → Gerência → Coordenação → Centro Gestor)'
+
+    def handle(self, *args, **options):
+        total = get_closure_builder().rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Tabela de fechamento reconstruída: {total} linha(s).')
+        )
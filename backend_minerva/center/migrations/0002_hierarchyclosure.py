@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    from center.services.closure import ClosureBuilder
+
+    ClosureBuilder(
+        Direction=apps.get_model('sector', 'Direction'),
+        Management=apps.get_model('sector', 'Management'),
+        Coordination=apps.get_model('sector', 'Coordination'),
+        ManagementCenter=apps.get_model('center', 'ManagementCenter'),
+        CenterHierarchy=apps.get_model('center', 'CenterHierarchy'),
+        HierarchyClosure=apps.get_model('center', 'HierarchyClosure'),
+    ).rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('center', '0001_initial'),
+        ('sector', '0002_alter_coordination_created_by_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HierarchyClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor_type', models.CharField(choices=[('direction', 'Direção'), ('management', 'Gerência'), ('coordination', 'Coordenação'), ('management_center', 'Centro Gestor')], max_length=20, verbose_name='Tipo do Ancestral')),
+                ('ancestor_id', models.PositiveBigIntegerField(verbose_name='Ancestral')),
+                ('descendant_type', models.CharField(choices=[('direction', 'Direção'), ('management', 'Gerência'), ('coordination', 'Coordenação'), ('management_center', 'Centro Gestor')], max_length=20, verbose_name='Tipo do Descendente')),
+                ('descendant_id', models.PositiveBigIntegerField(verbose_name='Descendente')),
+                ('depth', models.PositiveSmallIntegerField(default=0, verbose_name='Profundidade')),
+            ],
+            options={
+                'verbose_name': 'Fechamento da Hierarquia',
+                'verbose_name_plural': 'Fechamento da Hierarquia',
+                'indexes': [models.Index(fields=['descendant_type', 'descendant_id'], name='closure_descendant_idx')],
+                'unique_together': {('ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id')},
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
@@ -220,4 +220,63 @@ class CenterHierarchy(models.Model):
             models.Index(fields=['management']), 
             models.Index(fields=['coordination']),
             models.Index(fields=['management_center']),
-        ]
\ No newline at end of file
+        ]
+
+
+class HierarchyClosure(models.Model):
+    """
+    Tabela de fechamento (closure table) da hierarquia organizacional:
+    Direção → Gerência → Coordenação → Centro Gestor.
+
+    Guarda uma linha para cada par ancestral/descendente, incluindo o próprio
+    nó com profundidade 0, de forma que "tudo abaixo do nó X" seja um único
+    filtro indexado. Mantida pelos signals de center.signals; pode ser
+    reconstruída com o comando rebuild_hierarchy_closure.
+    """
+    DIRECTION = 'direction'
+    MANAGEMENT = 'management'
+    COORDINATION = 'coordination'
+    MANAGEMENT_CENTER = 'management_center'
+
+    NODE_TYPE_CHOICES = [
+        (DIRECTION, 'Direção'),
+        (MANAGEMENT, 'Gerência'),
+        (COORDINATION, 'Coordenação'),
+        (MANAGEMENT_CENTER, 'Centro Gestor'),
+    ]
+
+    ancestor_type = models.CharField(max_length=20, choices=NODE_TYPE_CHOICES, verbose_name='Tipo do Ancestral')
+    ancestor_id = models.PositiveBigIntegerField(verbose_name='Ancestral')
+    descendant_type = models.CharField(max_length=20, choices=NODE_TYPE_CHOICES, verbose_name='Tipo do Descendente')
+    descendant_id = models.PositiveBigIntegerField(verbose_name='Descendente')
+    depth = models.PositiveSmallIntegerField(default=0, verbose_name='Profundidade')
+
+    def __str__(self):
+        return f"{self.ancestor_type}:{self.ancestor_id} → {self.descendant_type}:{self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def descendant_ids(cls, node, descendant_type):
+        """
+        Subconsulta com os ids dos descendentes do tipo informado abaixo de
+        node (Direction, Management ou Coordination), incluindo o próprio nó.
+        """
+        return cls.objects.filter(
+            ancestor_type=node._meta.model_name,
+            ancestor_id=node.pk,
+            descendant_type=descendant_type
+        ).values('descendant_id')
+
+    @classmethod
+    def management_center_ids(cls, node):
+        """Subconsulta com os ids dos centros gestores abaixo de node"""
+        return cls.descendant_ids(node, cls.MANAGEMENT_CENTER)
+
+    class Meta:
+        verbose_name = 'Fechamento da Hierarquia'
+        verbose_name_plural = 'Fechamento da Hierarquia'
+        unique_together = [
+            ('ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id')
+        ]
+        indexes = [
+            models.Index(fields=['descendant_type', 'descendant_id'], name='closure_descendant_idx'),
+        ]
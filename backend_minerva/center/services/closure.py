@@ -0,0 +1,170 @@
+"""
+Manutenção da tabela de fechamento da hierarquia (center.HierarchyClosure).
+
+O caminho de cada nó até a raiz é calculado pelas FKs da estrutura
+(Coordenação → Gerência → Direção); centros gestores são pendurados no nó
+mais específico de cada associação CenterHierarchy. O ClosureBuilder recebe
+as classes dos models para poder ser usado também na migração de dados.
+"""
+import logging
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DIRECTION = 'direction'
+MANAGEMENT = 'management'
+COORDINATION = 'coordination'
+MANAGEMENT_CENTER = 'management_center'
+
+
+class ClosureBuilder:
+
+    def __init__(self, Direction, Management, Coordination, ManagementCenter, CenterHierarchy, HierarchyClosure):
+        self.Direction = Direction
+        self.Management = Management
+        self.Coordination = Coordination
+        self.ManagementCenter = ManagementCenter
+        self.CenterHierarchy = CenterHierarchy
+        self.HierarchyClosure = HierarchyClosure
+
+    def _paths(self, nodes):
+        """
+        Calcula as linhas de fechamento dos nós informados ([(tipo, id)]).
+        Retorna {(tipo_ancestral, id_ancestral, tipo_desc, id_desc): profundidade}.
+        """
+        by_type = {DIRECTION: set(), MANAGEMENT: set(), COORDINATION: set(), MANAGEMENT_CENTER: set()}
+        for node_type, node_id in nodes:
+            by_type[node_type].add(node_id)
+
+        # Ponto de ligação de cada centro gestor: nó mais específico da associação
+        attachments = []
+        for mc_id, direction_id, management_id, coordination_id in self.CenterHierarchy.objects.filter(
+            management_center_id__in=by_type[MANAGEMENT_CENTER]
+        ).values_list('management_center_id', 'direction_id', 'management_id', 'coordination_id'):
+            if coordination_id:
+                attachments.append((mc_id, (COORDINATION, coordination_id)))
+            elif management_id:
+                attachments.append((mc_id, (MANAGEMENT, management_id)))
+            elif direction_id:
+                attachments.append((mc_id, (DIRECTION, direction_id)))
+
+        coordination_ids = by_type[COORDINATION] | {
+            node_id for _, (node_type, node_id) in attachments if node_type == COORDINATION
+        }
+        coordination_parent = dict(
+            self.Coordination.objects.filter(pk__in=coordination_ids).values_list('pk', 'management_id')
+        )
+        management_ids = by_type[MANAGEMENT] | set(coordination_parent.values()) | {
+            node_id for _, (node_type, node_id) in attachments if node_type == MANAGEMENT
+        }
+        management_parent = dict(
+            self.Management.objects.filter(pk__in=management_ids).values_list('pk', 'direction_id')
+        )
+        parents = {COORDINATION: (MANAGEMENT, coordination_parent), MANAGEMENT: (DIRECTION, management_parent)}
+
+        def path_to_root(node):
+            path = [node]
+            while node[0] in parents:
+                parent_type, parent_map = parents[node[0]]
+                parent_id = parent_map.get(node[1])
+                if parent_id is None:
+                    break
+                node = (parent_type, parent_id)
+                path.append(node)
+            return path
+
+        rows = {}
+
+        def add(ancestor, descendant, depth):
+            key = (ancestor[0], ancestor[1], descendant[0], descendant[1])
+            if key not in rows or rows[key] > depth:
+                rows[key] = depth
+
+        for node_type in (DIRECTION, MANAGEMENT, COORDINATION):
+            for node_id in by_type[node_type]:
+                node = (node_type, node_id)
+                for depth, ancestor in enumerate(path_to_root(node)):
+                    add(ancestor, node, depth)
+
+        for mc_id in by_type[MANAGEMENT_CENTER]:
+            add((MANAGEMENT_CENTER, mc_id), (MANAGEMENT_CENTER, mc_id), 0)
+        for mc_id, attach in attachments:
+            for depth, ancestor in enumerate(path_to_root(attach), start=1):
+                add(ancestor, (MANAGEMENT_CENTER, mc_id), depth)
+
+        return rows
+
+    def _write(self, rows):
+        self.HierarchyClosure.objects.bulk_create(
+            [
+                self.HierarchyClosure(
+                    ancestor_type=a_type, ancestor_id=a_id,
+                    descendant_type=d_type, descendant_id=d_id, depth=depth
+                )
+                for (a_type, a_id, d_type, d_id), depth in rows.items()
+            ],
+            batch_size=1000
+        )
+
+    def rebuild(self):
+        """Reconstrói a tabela inteira. Retorna o número de linhas gravadas."""
+        nodes = [(DIRECTION, pk) for pk in self.Direction.objects.values_list('pk', flat=True)]
+        nodes += [(MANAGEMENT, pk) for pk in self.Management.objects.values_list('pk', flat=True)]
+        nodes += [(COORDINATION, pk) for pk in self.Coordination.objects.values_list('pk', flat=True)]
+        nodes += [(MANAGEMENT_CENTER, pk) for pk in self.ManagementCenter.objects.values_list('pk', flat=True)]
+
+        with transaction.atomic():
+            rows = self._paths(nodes)
+            self.HierarchyClosure.objects.all().delete()
+            self._write(rows)
+        return len(rows)
+
+    def refresh_subtree(self, node_type, node_id):
+        """
+        Recalcula as linhas do nó e de todos os seus descendentes atuais.
+        Usado quando um nó é criado ou muda de pai.
+        """
+        subtree = {(node_type, node_id)}
+        subtree.update(
+            self.HierarchyClosure.objects.filter(ancestor_type=node_type, ancestor_id=node_id)
+            .values_list('descendant_type', 'descendant_id')
+        )
+
+        with transaction.atomic():
+            self._delete_descendants(subtree)
+            self._write(self._paths(subtree))
+
+    def _delete_descendants(self, nodes):
+        by_type = {}
+        for node_type, node_id in nodes:
+            by_type.setdefault(node_type, set()).add(node_id)
+        for node_type, node_ids in by_type.items():
+            self.HierarchyClosure.objects.filter(descendant_type=node_type, descendant_id__in=node_ids).delete()
+
+    def remove_node(self, node_type, node_id):
+        """Remove todas as linhas em que o nó aparece (ancestral ou descendente)"""
+        self.HierarchyClosure.objects.filter(ancestor_type=node_type, ancestor_id=node_id).delete()
+        self.HierarchyClosure.objects.filter(descendant_type=node_type, descendant_id=node_id).delete()
+
+    def has_parent(self, node_type, node_id, parent_type, parent_id):
+        """Indica se a tabela já registra parent como pai direto do nó"""
+        return self.HierarchyClosure.objects.filter(
+            ancestor_type=parent_type, ancestor_id=parent_id,
+            descendant_type=node_type, descendant_id=node_id, depth=1
+        ).exists()
+
+
+def get_closure_builder():
+    """ClosureBuilder com os models atuais do projeto"""
+    from sector.models import Direction, Management, Coordination
+    from center.models import ManagementCenter, CenterHierarchy, HierarchyClosure
+
+    return ClosureBuilder(
+        Direction=Direction,
+        Management=Management,
+        Coordination=Coordination,
+        ManagementCenter=ManagementCenter,
+        CenterHierarchy=CenterHierarchy,
+        HierarchyClosure=HierarchyClosure,
+    )
@@ -0,0 +1,69 @@
+# center/signals.py
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from sector.models import Direction, Management, Coordination
+from .models import ManagementCenter, CenterHierarchy
+from .services.closure import (
+    get_closure_builder, DIRECTION, MANAGEMENT, COORDINATION, MANAGEMENT_CENTER
+)
+
+
+@receiver(post_save, sender=Direction)
+@receiver(post_save, sender=ManagementCenter)
+def fechamento_no_raiz_salvo(sender, instance, created, **kwargs):
+    """Direções e centros gestores só precisam da própria linha ao serem criados"""
+    if created:
+        node_type = DIRECTION if sender is Direction else MANAGEMENT_CENTER
+        get_closure_builder().refresh_subtree(node_type, instance.pk)
+
+
+@receiver(post_save, sender=Management)
+def fechamento_gerencia_salva(sender, instance, created, **kwargs):
+    builder = get_closure_builder()
+    if created or not builder.has_parent(MANAGEMENT, instance.pk, DIRECTION, instance.direction_id):
+        builder.refresh_subtree(MANAGEMENT, instance.pk)
+
+
+@receiver(post_save, sender=Coordination)
+def fechamento_coordenacao_salva(sender, instance, created, **kwargs):
+    builder = get_closure_builder()
+    if created or not builder.has_parent(COORDINATION, instance.pk, MANAGEMENT, instance.management_id):
+        builder.refresh_subtree(COORDINATION, instance.pk)
+
+
+@receiver(post_delete, sender=Direction)
+@receiver(post_delete, sender=Management)
+@receiver(post_delete, sender=Coordination)
+@receiver(post_delete, sender=ManagementCenter)
+def fechamento_no_removido(sender, instance, **kwargs):
+    node_type = {
+        Direction: DIRECTION,
+        Management: MANAGEMENT,
+        Coordination: COORDINATION,
+        ManagementCenter: MANAGEMENT_CENTER,
+    }[sender]
+    get_closure_builder().remove_node(node_type, instance.pk)
+
+
+@receiver(pre_save, sender=CenterHierarchy)
+def guardar_centro_anterior(sender, instance, **kwargs):
+    """Guarda o centro gestor anterior para recalcular os dois lados de uma troca"""
+    instance._previous_management_center_id = None
+    if instance.pk:
+        instance._previous_management_center_id = (
+            CenterHierarchy.objects.filter(pk=instance.pk)
+            .values_list('management_center_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=CenterHierarchy)
+@receiver(post_delete, sender=CenterHierarchy)
+def fechamento_associacao_alterada(sender, instance, **kwargs):
+    builder = get_closure_builder()
+    builder.refresh_subtree(MANAGEMENT_CENTER, instance.management_center_id)
+
+    previous_id = getattr(instance, '_previous_management_center_id', None)
+    if previous_id and previous_id != instance.management_center_id:
+        builder.refresh_subtree(MANAGEMENT_CENTER, previous_id)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Inicializa a sequência de cada ano com o maior protocolo existente"""
+    Contract = apps.get_model('contract', 'Contract')
+    ContractProtocolSequence = apps.get_model('contract', 'ContractProtocolSequence')
+
+    last_values = {}
+    for protocol_number in Contract.objects.values_list('protocol_number', flat=True).iterator():
+        try:
+            sequence, year_suffix = protocol_number.split('/')
+            year, value = 2000 + int(year_suffix), int(sequence)
+        except (AttributeError, ValueError):
+            continue
+        last_values[year] = max(last_values.get(year, 0), value)
+
+    ContractProtocolSequence.objects.bulk_create([
+        ContractProtocolSequence(year=year, last_value=value)
+        for year, value in last_values.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractProtocolSequence',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='Ano')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Protocolo',
+                'verbose_name_plural': 'Sequências de Protocolo',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
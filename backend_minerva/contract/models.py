@@ -3,6 +3,7 @@ from django.core.validators import MinValueValidator
 from accounts.models import User
 from employee.models import Employee
 from budgetline.models import BudgetLine
+from center.models import HierarchyClosure
 from accounts.mixins import HierarchicalQuerysetMixin
 from django.utils import timezone
 from decimal import Decimal
@@ -50,12 +51,14 @@ class Contract(models.Model, HierarchicalQuerysetMixin):
         is_new = self.pk is None
         old_original_value = Decimal('0.00')
         old_status = None
+        old_budget_line_id = None
 
         if not is_new:
             # Recuperar valores antigos
             old_instance = Contract.objects.get(pk=self.pk)
             old_original_value = old_instance.original_value
             old_status = old_instance.status
+            old_budget_line_id = old_instance.budget_line_id
 
         # Gerar número de protocolo se for novo
         if not self.protocol_number:
@@ -66,7 +69,7 @@ class Contract(models.Model, HierarchicalQuerysetMixin):
             if not self.budget_line:
                 raise ContractOperationException("O contrato deve estar vinculado a uma linha orçamentária.")
 
-            # Recarregar linha com lock
+            # Recarregar linha com lock para evitar race conditions
             budget_line = BudgetLine.objects.select_for_update().get(pk=self.budget_line.pk)
 
             if budget_line.available_amount < self.original_value:
@@ -89,19 +92,19 @@ class Contract(models.Model, HierarchicalQuerysetMixin):
                         f"excede o saldo disponível da linha orçamentária (R$ {budget_line.available_amount:.2f})."
                     )
 
-        # Se o status mudou de ATIVO para ENCERRADO, devolver valor à linha
-        if not is_new and old_status == 'ATIVO' and self.status == 'ENCERRADO':
-            # O valor será devolvido automaticamente pelo recalculate_available_amount
-            pass
-
         super().save(*args, **kwargs)
 
-        # Atualizar linha orçamentária
-        if self.budget_line:
-            self.budget_line.update_available_amount()
-            # Atualizar orçamento também
-            if self.budget_line.budget:
-                self.budget_line.budget.update_calculated_amounts()
+        # Aplicar a variação na linha orçamentária ainda dentro da transação, para
+        # que o próximo contrato leia o saldo atualizado ao obter o lock. Só
+        # contratos ATIVOS consomem saldo (ENCERRADO devolve o valor à linha);
+        # os valores em cache do orçamento não dependem de contratos.
+        old_contracted = old_original_value if old_status == 'ATIVO' else Decimal('0.00')
+        contracted = self.contracted_amount
+        if old_budget_line_id and old_budget_line_id != self.budget_line_id:
+            BudgetLine.apply_available_delta(old_budget_line_id, old_contracted)
+            BudgetLine.apply_available_delta(self.budget_line_id, -contracted)
+        else:
+            BudgetLine.apply_available_delta(self.budget_line_id, old_contracted - contracted)
 
     @transaction.atomic
     def delete(self, *args, **kwargs):
@@ -109,14 +112,16 @@ class Contract(models.Model, HierarchicalQuerysetMixin):
         Ao deletar um contrato:
         - O valor deve retornar à linha orçamentária
         """
-        budget_line = self.budget_line
+        self._skip_signal = True
         super().delete(*args, **kwargs)
 
-        # Atualizar valores (o valor retorna automaticamente)
-        if budget_line:
-            budget_line.update_available_amount()
-            if budget_line.budget:
-                budget_line.budget.update_calculated_amounts()
+        # Devolver o valor à linha
+        BudgetLine.apply_available_delta(self.budget_line_id, self.contracted_amount)
+
+    @property
+    def contracted_amount(self):
+        """Valor que o contrato consome da linha orçamentária"""
+        return self.original_value if self.status == 'ATIVO' else Decimal('0.00')
 
     def __str__(self):
         return self.protocol_number
@@ -125,21 +130,21 @@ class Contract(models.Model, HierarchicalQuerysetMixin):
     def get_objects_by_direction(cls, direction):
         """Retorna contratos baseados na direção através da linha orçamentária"""
         return cls.objects.filter(
-            budget_line__budget__management_center__direction=direction
+            budget_line__budget__management_center_id__in=HierarchyClosure.management_center_ids(direction)
         )
     
     @classmethod
     def get_objects_by_management(cls, management):
         """Retorna contratos baseados na gerência através da linha orçamentária"""
         return cls.objects.filter(
-            budget_line__budget__management_center__management=management
+            budget_line__budget__management_center_id__in=HierarchyClosure.management_center_ids(management)
         )
     
     @classmethod
     def get_objects_by_coordination(cls, coordination):
         """Retorna contratos baseados na coordenação através da linha orçamentária - filtro principal"""
         return cls.objects.filter(
-            budget_line__budget__management_center__coordination=coordination
+            budget_line__budget__management_center_id__in=HierarchyClosure.management_center_ids(coordination)
         )
     
     @classmethod
@@ -205,4 +210,19 @@ class ContractAmendment(models.Model):
     class Meta:
         verbose_name = 'Aditivo'
         verbose_name_plural = 'Aditivos'
-        ordering = ['contract', 'created_at']
\ No newline at end of file
+        ordering = ['contract', 'created_at']
+
+class ContractProtocolSequence(models.Model):
+    """
+    Último número de protocolo alocado por ano.
+    Alocação feita por contract.services.services_contract.reserve_protocol_numbers.
+    """
+    year = models.PositiveSmallIntegerField(primary_key=True, verbose_name='Ano')
+    last_value = models.PositiveIntegerField(default=0, verbose_name='Último Número')
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+    class Meta:
+        verbose_name = 'Sequência de Protocolo'
+        verbose_name_plural = 'Sequências de Protocolo'
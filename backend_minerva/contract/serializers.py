@@ -18,3 +18,14 @@ class ContractInstallmentSerializer(serializers.ModelSerializer):
         model = ContractInstallment
         fields = '__all__'
         read_only_fields = ('id', 'created_at', 'updated_at')
+
+class ContractListSerializer(serializers.ModelSerializer):
+    """Conjunto reduzido de campos para listagens (?fields=lite)"""
+    class Meta:
+        model = Contract
+        fields = (
+            'id', 'protocol_number', 'budget_line', 'main_inspector', 'substitute_inspector',
+            'description', 'original_value', 'current_value', 'start_date', 'end_date',
+            'expiration_date', 'status',
+        )
+        read_only_fields = fields
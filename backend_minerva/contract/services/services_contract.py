@@ -1,16 +1,58 @@
+from django.db import connection, transaction
+from django.db.models import F
 from django.utils import timezone
 
-def generate_protocol_number():
-    from contract.models import Contract  
-    year_suffix = timezone.now().year % 100  
-    last_protocol = Contract.objects.filter(protocol_number__endswith=f"/{year_suffix}").order_by('id').last()
-    
-    if last_protocol:
-        # Incrementa a sequência do último número de protocolo gerado
-        last_sequence = int(last_protocol.protocol_number.split('/')[0])
-        new_sequence = f"{last_sequence + 1:04}"
+
+def format_protocol_number(sequence, year):
+    return f"{sequence:04}/{year % 100}"
+
+
+def _allocate_postgresql(table, year, count):
+    """Incremento atômico em um único comando (INSERT ... ON CONFLICT ... RETURNING)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (year, last_value) VALUES (%s, %s)
+            ON CONFLICT (year) DO UPDATE SET last_value = {table}.last_value + EXCLUDED.last_value
+            RETURNING last_value
+            """,
+            [year, count]
+        )
+        return cursor.fetchone()[0]
+
+
+def _allocate_locked(year, count):
+    """Fallback para bancos sem upsert com RETURNING: lock da linha do ano"""
+    from contract.models import ContractProtocolSequence
+
+    with transaction.atomic():
+        ContractProtocolSequence.objects.get_or_create(year=year)
+        sequence = ContractProtocolSequence.objects.select_for_update().get(year=year)
+        ContractProtocolSequence.objects.filter(year=year).update(last_value=F('last_value') + count)
+        return sequence.last_value + count
+
+
+def reserve_protocol_numbers(count=1, year=None):
+    """
+    Reserva count números de protocolo consecutivos do ano (padrão: ano atual)
+    em uma única ida ao banco e retorna a lista formatada ("0001/26", ...).
+    Números reservados e não usados não são reaproveitados.
+    """
+    from contract.models import ContractProtocolSequence
+
+    if count < 1:
+        return []
+    if year is None:
+        year = timezone.now().year
+
+    if connection.vendor == 'postgresql':
+        last_value = _allocate_postgresql(ContractProtocolSequence._meta.db_table, year, count)
     else:
-        # Se não houver nenhum protocolo para o ano atual, inicia a sequência em "0001"
-        new_sequence = "0001"
+        last_value = _allocate_locked(year, count)
 
-    return f"{new_sequence}/{year_suffix}"
\ No newline at end of file
+    first_value = last_value - count + 1
+    return [format_protocol_number(value, year) for value in range(first_value, last_value + 1)]
+
+
+def generate_protocol_number():
+    return reserve_protocol_numbers(1)[0]
@@ -1,31 +1,20 @@
 """
 Signals para atualização automática de valores relacionados
 """
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from budgetline.models import BudgetLine
 from .models import Contract
 
 
-@receiver(post_save, sender=Contract)
-def update_budget_line_on_contract_save(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=Contract)
+def update_budget_line_on_contract_delete(sender, instance, **kwargs):
     """
-    Após salvar um contrato, atualizar a linha orçamentária
+    Após deletar um contrato fora de Contract.delete (ex.: exclusão via queryset),
+    devolver o valor à linha orçamentária. Criações, alterações e exclusões
+    feitas pelo model já aplicam essa variação.
     """
     if hasattr(instance, '_skip_signal'):
         return
 
-    if instance.budget_line:
-        instance.budget_line.update_available_amount()
-        if instance.budget_line.budget:
-            instance.budget_line.budget.update_calculated_amounts()
-
-
-@receiver(post_delete, sender=Contract)
-def update_budget_line_on_contract_delete(sender, instance, **kwargs):
-    """
-    Após deletar um contrato, devolver o valor à linha orçamentária
-    """
-    if instance.budget_line:
-        instance.budget_line.update_available_amount()
-        if instance.budget_line.budget:
-            instance.budget_line.budget.update_calculated_amounts()
+    BudgetLine.apply_available_delta(instance.budget_line_id, instance.contracted_amount)
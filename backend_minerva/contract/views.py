@@ -1,13 +1,15 @@
+from django.db.models import Q
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status
+from core.pagination import CustomCursorPagination, CustomPageNumberPagination
 from .models import ContractInstallment, ContractAmendment, Contract
-from employee.utils.access_control import get_employee_queryset
-from employee.models import Employee
+from employee.utils.access_control import get_accessible_employee_ids
 from .serializers import (
     ContractInstallmentSerializer,
     ContractAmendmentSerializer,
     ContractSerializer,
+    ContractListSerializer,
 )
 from .utils.messages import (
     CONTRACTS_MESSAGES,
@@ -17,38 +19,63 @@ from .utils.messages import (
 
 #==================================== CONTRATOS ====================================
 
+def get_scoped_contracts(user, queryset=None):
+    """
+    Contratos cujo fiscal principal ou substituto esteja no escopo do usuário.
+    Um único filtro IN sobre os ids de funcionários em cache; sem filtro para
+    acesso irrestrito.
+    """
+    if queryset is None:
+        queryset = Contract.objects.all()
+
+    employee_ids = get_accessible_employee_ids(user)
+    if employee_ids is None:
+        return queryset
+    if not employee_ids:
+        return queryset.none()
+
+    return queryset.filter(
+        Q(main_inspector_id__in=employee_ids) | Q(substitute_inspector_id__in=employee_ids)
+    )
+
+
+class ContractCursorPagination(CustomCursorPagination):
+    ordering = 'protocol_number'
+
+
 class ContractListAPIView(generics.ListAPIView):
+    """
+    Lista de contratos no escopo do usuário.
+
+    ?pagination=cursor usa paginação por cursor (sem COUNT/OFFSET) e
+    ?fields=lite retorna apenas os campos principais.
+    """
     queryset = Contract.objects.all()
     serializer_class = ContractSerializer
+    pagination_class = CustomPageNumberPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = ContractCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def is_lite(self):
+        return self.request is not None and self.request.query_params.get('fields') == 'lite'
+
+    def get_serializer_class(self):
+        if self.is_lite():
+            return ContractListSerializer
+        return ContractSerializer
 
     def get_queryset(self):
-        # Contratos que o fiscal principal ou substituto esteja dentro do escopo
-        employee_qs = get_employee_queryset(self.request.user, Employee.objects.all())
-
-        queryset = (Contract.objects
-                .select_related(
-                    'budget_line__budget__management_center',
-                    'main_inspector__direction',
-                    'main_inspector__management',
-                    'main_inspector__coordination',
-                    'substitute_inspector__direction',
-                    'substitute_inspector__management',
-                    'substitute_inspector__coordination'
-                )
-                .prefetch_related('installments', 'amendments')
-                .filter(main_inspector__in=employee_qs) |
-                Contract.objects
-                .select_related(
-                    'budget_line__budget__management_center',
-                    'main_inspector__direction',
-                    'main_inspector__management',
-                    'main_inspector__coordination',
-                    'substitute_inspector__direction',
-                    'substitute_inspector__management',
-                    'substitute_inspector__coordination'
-                )
-                .prefetch_related('installments', 'amendments')
-                .filter(substitute_inspector__in=employee_qs))
+        queryset = get_scoped_contracts(self.request.user)
+
+        if self.is_lite():
+            queryset = queryset.only(*ContractListSerializer.Meta.fields)
 
         # Filtro por status
         status_filter = self.request.query_params.get('status', None)
@@ -67,18 +94,19 @@ class ContractCreateAPIView(generics.CreateAPIView):
 
         # Validação hierárquica: verifica se o usuário tem permissão para criar contrato
         if user.is_authenticated and not user.is_superuser:
-            employee_qs = get_employee_queryset(user, Employee.objects.all())
+            employee_ids = get_accessible_employee_ids(user)
             main_inspector = serializer.validated_data.get('main_inspector')
             substitute_inspector = serializer.validated_data.get('substitute_inspector')
 
             # Verifica se os fiscais estão na hierarquia do usuário
-            if main_inspector and main_inspector not in employee_qs:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("Você não tem permissão para criar contratos com este fiscal principal.")
+            if employee_ids is not None:
+                if main_inspector and main_inspector.pk not in employee_ids:
+                    from rest_framework.exceptions import PermissionDenied
+                    raise PermissionDenied("Você não tem permissão para criar contratos com este fiscal principal.")
 
-            if substitute_inspector and substitute_inspector not in employee_qs:
-                from rest_framework.exceptions import PermissionDenied
-                raise PermissionDenied("Você não tem permissão para criar contratos com este fiscal substituto.")
+                if substitute_inspector and substitute_inspector.pk not in employee_ids:
+                    from rest_framework.exceptions import PermissionDenied
+                    raise PermissionDenied("Você não tem permissão para criar contratos com este fiscal substituto.")
 
         serializer.save(user=user) if user.is_authenticated else serializer.save()
 
@@ -89,8 +117,7 @@ class ContractCreateAPIView(generics.CreateAPIView):
     
     def get_queryset(self):
         # contratos que o fiscal principal ou substituto esteja dentro do escopo
-        employee_qs = get_employee_queryset(self.request.user, Employee.objects.all())
-        return Contract.objects.filter(main_inspector__in=employee_qs) | Contract.objects.filter(substitute_inspector__in=employee_qs)
+        return get_scoped_contracts(self.request.user)
 
 
 class ContractRetrieveAPIView(generics.RetrieveAPIView):
@@ -99,8 +126,7 @@ class ContractRetrieveAPIView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         # contratos que o fiscal principal ou substituto esteja dentro do escopo
-        employee_qs = get_employee_queryset(self.request.user, Employee.objects.all())
-        return Contract.objects.filter(main_inspector__in=employee_qs) | Contract.objects.filter(substitute_inspector__in=employee_qs)
+        return get_scoped_contracts(self.request.user)
 
 
 class ContractUpdateAPIView(generics.UpdateAPIView):
@@ -0,0 +1,16 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class MiddlewareJWTAuthentication(JWTAuthentication):
+    """
+    Autenticação JWT do DRF que reaproveita o resultado do
+    APIAuthenticationMiddleware (request.jwt_auth), evitando decodificar o
+    token e carregar o usuário uma segunda vez. Rotas não cobertas pelo
+    middleware (ex.: endpoints públicos) autenticam normalmente.
+    """
+
+    def authenticate(self, request):
+        jwt_auth = getattr(request._request, 'jwt_auth', None)
+        if jwt_auth is not None:
+            return jwt_auth
+        return super().authenticate(request)
@@ -0,0 +1,141 @@
+"""
+Roteamento de leituras para a réplica do banco (DATABASES['replica']).
+
+As leituras só vão para a réplica quando o código pede explicitamente
+(@use_replica em views de relatório/PDF, replica_reads() em serviços, ou
+get_read_alias(opt_in=True) para conexões diretas como a execução de SQL da
+Alice); todo o resto continua no 'default'. Mesmo dentro de um trecho
+marcado, a leitura volta ao 'default' quando:
+
+- há uma transação aberta no 'default' (a leitura precisa enxergar as
+  gravações e os bloqueios de select_for_update da transação);
+- a requisição atual já gravou algo;
+- o usuário gravou algo há menos de DATABASE_REPLICA_STICKY_SECONDS
+  (leia-o-que-escreveu: ReplicaStickinessMiddleware grava a marca no cache,
+  que por isso precisa ser compartilhado; as settings recusam a réplica com
+  LocMemCache).
+
+Gravações em apps de registro (DATABASE_REPLICA_STICKY_EXEMPT_APPS, como o
+histórico do chat) não prendem o usuário ao 'default'.
+
+Sem DATABASES['replica'] configurado, o roteador não altera nada.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+STICKY_KEY_PREFIX = 'db_sticky:'
+
+_replica_reads = ContextVar('db_replica_reads', default=False)
+_routing_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Estado de roteamento de uma requisição (ou de um trecho fora dela)"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def get_read_alias(opt_in: bool = None) -> str:
+    """
+    Alias para uma leitura no contexto atual. opt_in=None usa a marcação de
+    @use_replica/replica_reads()
+    """
+    if opt_in is None:
+        opt_in = _replica_reads.get()
+    if not opt_in or not replica_configured():
+        return DEFAULT_DB_ALIAS
+
+    state = _routing_state.get()
+    if state is not None and (state.pinned or state.wrote):
+        return DEFAULT_DB_ALIAS
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+@contextmanager
+def routing_scope(pinned: bool = False):
+    """Novo estado de roteamento (usado por requisição no middleware)"""
+    state = RoutingState(pinned=pinned)
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Permite que as leituras do trecho usem a réplica"""
+    state_token = None
+    if _routing_state.get() is None:
+        state_token = _routing_state.set(RoutingState())
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+        if state_token is not None:
+            _routing_state.reset(state_token)
+
+
+def use_replica(view_func):
+    """
+    Decorator de view/função: leituras na réplica. Em api_view, deve ficar
+    abaixo dos demais decorators (só o corpo da view usa a réplica); em views
+    de classe, usar method_decorator(use_replica, name='get').
+    """
+    @functools.wraps(view_func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view_func(*args, **kwargs)
+    return wrapper
+
+
+def _sticky_key(user_id) -> str:
+    return f'{STICKY_KEY_PREFIX}{user_id}'
+
+
+def is_pinned_to_primary(user_id) -> bool:
+    return cache.get(_sticky_key(user_id)) is not None
+
+
+def pin_to_primary(user_id) -> None:
+    """Leituras do usuário ficam no 'default' pelos próximos segundos"""
+    timeout = getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10)
+    if timeout > 0:
+        cache.set(_sticky_key(user_id), 1, timeout=timeout)
+
+
+class PrimaryReplicaRouter:
+    """Leituras marcadas na réplica; gravações e migrações sempre no 'default'"""
+
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None and model._meta.app_label not in getattr(
+            settings, 'DATABASE_REPLICA_STICKY_EXEMPT_APPS', ()
+        ):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mesmos dados nos dois aliases
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -3,115 +3,99 @@ from django.contrib.auth.models import AnonymousUser
 from django.urls import resolve
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from accounts.models import BlacklistedToken
-import json
+from accounts.token_blacklist import is_jti_blacklisted
+from django.conf import settings
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def compile_public_endpoints(prefixes):
+    """Compila os prefixos públicos em uma única regex ancorada"""
+    if not prefixes:
+        return None
+    alternatives = '|'.join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True))
+    return re.compile(f'^(?:{alternatives})')
 
 
 class APIAuthenticationMiddleware:
     """
     Middleware para proteger todas as rotas da API
     Redireciona para login se não autenticado
+
+    O token é decodificado uma única vez: o par (usuário, token) validado fica
+    em request.jwt_auth e é reaproveitado pela autenticação do DRF
+    (core.authentication.MiddlewareJWTAuthentication). Também disponibiliza
+    request.hierarchical_filter para as rotas autenticadas da API.
     """
     
     def __init__(self, get_response):
+        from accounts.mixins import HierarchicalFilterMixin
+
         self.get_response = get_response
         self.jwt_authenticator = JWTAuthentication()
+        # URLs que não precisam de autenticação (settings.API_PUBLIC_ENDPOINTS)
+        self.public_endpoints = compile_public_endpoints(getattr(settings, 'API_PUBLIC_ENDPOINTS', []))
+        self.hierarchical_filter = HierarchicalFilterMixin()
+    
+    def is_public(self, path):
+        return self.public_endpoints is not None and self.public_endpoints.match(path) is not None
     
     def __call__(self, request):
-        # URLs que não precisam de autenticação
-        public_endpoints = [
-            '/api/v1/accounts/login/',
-            '/api/v1/accounts/register/',
-            '/api/v1/accounts/token/',
-            '/api/v1/accounts/token/refresh/',
-            '/api/v1/accounts/token/verify/',
-            '/api/v1/accounts/password-reset/',
-            '/api/v1/accounts/password-reset-confirm/',
-            '/admin/',
-            '/static/',
-            '/media/',
-        ]
-        
         # Verificar se é uma rota da API
-        if request.path.startswith('/api/'):
-            # Verificar se é um endpoint público
-            is_public = any(request.path.startswith(endpoint) for endpoint in public_endpoints)
-            
-            if not is_public:
-                # Tentar autenticar usando JWT
-                try:
-                    user_auth_tuple = self.jwt_authenticator.authenticate(request)
-                    if user_auth_tuple is None:
-                        # Não há token de autenticação
-                        return JsonResponse({
-                            'error': 'Token de autenticação necessário',
-                            'detail': 'Você precisa fazer login para acessar este recurso',
-                            'redirect': '/login'
-                        }, status=401)
-                    
-                    user, token = user_auth_tuple
-                    if isinstance(user, AnonymousUser) or not user.is_authenticated:
-                        return JsonResponse({
-                            'error': 'Usuário não autenticado',
-                            'detail': 'Token inválido ou expirado',
-                            'redirect': '/login'
-                        }, status=401)
-                    
-                    # ÚNICA VERIFICAÇÃO: Apenas verificar blacklist se conseguiu decodificar o token
-                    if hasattr(token, 'token'):
-                        token_string = str(token.token)
-                        if BlacklistedToken.is_blacklisted(token_string):
-                            return JsonResponse({
-                                'error': 'Token invalidado',
-                                'detail': 'Este token foi invalidado. Faça login novamente.',
-                                'redirect': '/login'
-                            }, status=401)
-                    
-                    # Definir o usuário no request para usar nas views
-                    request.user = user
-                    
-                except (InvalidToken, TokenError) as e:
+        if request.path.startswith('/api/') and not self.is_public(request.path):
+            # Tentar autenticar usando JWT
+            try:
+                user_auth_tuple = self.jwt_authenticator.authenticate(request)
+                if user_auth_tuple is None:
+                    # Não há token de autenticação
+                    return JsonResponse({
+                        'error': 'Token de autenticação necessário',
+                        'detail': 'Você precisa fazer login para acessar este recurso',
+                        'redirect': '/login'
+                    }, status=401)
+                
+                user, token = user_auth_tuple
+                if isinstance(user, AnonymousUser) or not user.is_authenticated:
                     return JsonResponse({
-                        'error': 'Token inválido',
-                        'detail': str(e),
+                        'error': 'Usuário não autenticado',
+                        'detail': 'Token inválido ou expirado',
                         'redirect': '/login'
                     }, status=401)
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Erro no middleware de autenticação: {type(e).__name__}: {str(e)}", exc_info=True)
+                
+                # ÚNICA VERIFICAÇÃO: blacklist pelo jti do token já validado
+                # (filtro de Bloom + cache; banco só para possíveis revogados)
+                if is_jti_blacklisted(token.get('jti')):
                     return JsonResponse({
-                        'error': 'Erro de autenticação',
-                        'detail': 'Erro interno no servidor',
+                        'error': 'Token invalidado',
+                        'detail': 'Este token foi invalidado. Faça login novamente.',
                         'redirect': '/login'
-                    }, status=500)
+                    }, status=401)
+                
+                # Definir o usuário no request para usar nas views
+                request.user = user
+                request.jwt_auth = user_auth_tuple
+                request.hierarchical_filter = self.hierarchical_filter
+                
+            except (InvalidToken, TokenError) as e:
+                return JsonResponse({
+                    'error': 'Token inválido',
+                    'detail': str(e),
+                    'redirect': '/login'
+                }, status=401)
+            except Exception as e:
+                logger.error(f"Erro no middleware de autenticação: {type(e).__name__}: {str(e)}", exc_info=True)
+                return JsonResponse({
+                    'error': 'Erro de autenticação',
+                    'detail': 'Erro interno no servidor',
+                    'redirect': '/login'
+                }, status=500)
         
         response = self.get_response(request)
         return response
 
 
-class HierarchicalPermissionMiddleware:
-    """
-    Middleware para injetar filtros hierárquicos automaticamente em requisições da API
-    """
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
-    
-    def __call__(self, request):
-        # Apenas aplicar em rotas da API e se usuário autenticado
-        if (request.path.startswith('/api/') and 
-            hasattr(request, 'user') and 
-            request.user.is_authenticated):
-            
-            # Adicionar filtro hierárquico ao request para uso nas views
-            from accounts.mixins import HierarchicalFilterMixin
-            request.hierarchical_filter = HierarchicalFilterMixin()
-            
-        response = self.get_response(request)
-        return response
-
-
 class AdminAuthRedirectMiddleware:
     """
     Middleware específico para o Django Admin
@@ -132,4 +116,31 @@ class AdminAuthRedirectMiddleware:
                 return redirect(f"{login_url}?next={request.path}")
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Leia-o-que-escreveu com a réplica de leitura (core.db_routers): se o
+    usuário gravou algo nos últimos segundos, as leituras desta requisição
+    ficam no banco principal; se gravar nesta requisição, a marca é renovada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from core.db_routers import is_pinned_to_primary, pin_to_primary, replica_configured, routing_scope
+
+        if not replica_configured():
+            return self.get_response(request)
+
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+
+        with routing_scope(pinned=user_id is not None and is_pinned_to_primary(user_id)) as state:
+            response = self.get_response(request)
+
+        if state.wrote and user_id is not None:
+            pin_to_primary(user_id)
+        return response
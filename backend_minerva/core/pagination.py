@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -8,3 +8,14 @@ class CustomPageNumberPagination(PageNumberPagination):
     page_size = 10  # Tamanho padrão
     page_size_query_param = 'page_size'  # Nome do parâmetro na query string
     max_page_size = 100  # Limite máximo para evitar sobrecarga
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Paginação por cursor: custo constante por página, sem COUNT(*) nem OFFSET.
+    Indicada para listagens grandes.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
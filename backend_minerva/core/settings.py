@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -75,7 +76,8 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'core.middleware.APIAuthenticationMiddleware',  # Middleware de autenticação da API
-    'core.middleware.HierarchicalPermissionMiddleware',  # Middleware de permissões hierárquicas  
+    'accounts.principal.PrincipalMiddleware',  # Grupos/hierarquia do usuário resolvidos uma vez por requisição
+    'core.middleware.ReplicaStickinessMiddleware',  # Leia-o-que-escreveu com a réplica de leitura
     'core.middleware.AdminAuthRedirectMiddleware',  # Middleware de redirecionamento do admin
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -83,6 +85,20 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'core.urls'
 
+# Prefixos de rotas da API que não exigem autenticação (APIAuthenticationMiddleware)
+API_PUBLIC_ENDPOINTS = [
+    '/api/v1/accounts/login/',
+    '/api/v1/accounts/register/',
+    '/api/v1/accounts/token/',
+    '/api/v1/accounts/token/refresh/',
+    '/api/v1/accounts/token/verify/',
+    '/api/v1/accounts/password-reset/',
+    '/api/v1/accounts/password-reset-confirm/',
+    '/admin/',
+    '/static/',
+    '/media/',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -116,6 +132,65 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura (opcional) para relatórios, PDFs e consultas da Alice.
+# Com DATABASE_REPLICA_HOST definido, usa as mesmas credenciais do 'default'
+# salvo quando DATABASE_REPLICA_USER/PASSWORD/PORT forem informados
+DATABASE_REPLICA_HOST = config('DATABASE_REPLICA_HOST', default='')
+if DATABASE_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DATABASE_REPLICA_HOST,
+        'PORT': config('DATABASE_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'USER': config('DATABASE_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DATABASE_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+# Segundos em que as leituras de um usuário ficam no 'default' após ele gravar algo
+DATABASE_REPLICA_STICKY_SECONDS = config('DATABASE_REPLICA_STICKY_SECONDS', default=10, cast=int)
+# Apps cujas gravações (registros do chat, sessões) não prendem o usuário ao 'default'
+DATABASE_REPLICA_STICKY_EXEMPT_APPS = ('ai_assistant', 'sessions')
+
+
+# Cache
+# Em produção com vários workers, usar um backend compartilhado (ex.: Redis ou
+# banco de dados, ver CACHE_BACKEND no .env.example) para que invalidações
+# valham para todos os processos
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='minerva-default'),
+    }
+}
+# Backends em que cada processo tem o próprio cache (nada é compartilhado entre workers)
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# A marca de leia-o-que-escreveu da réplica fica no cache: com cache local, um
+# worker não vê a marca gravada por outro e o usuário leria dados defasados
+if DATABASE_REPLICA_HOST and CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        "DATABASE_REPLICA_HOST exige um CACHE_BACKEND compartilhado entre os processos "
+        "(ex.: django.core.cache.backends.redis.RedisCache ou db.DatabaseCache)."
+    )
+
+# Tempo (segundos) de cache do índice de centros gestores acessíveis por usuário.
+# Com cache local a invalidação por versão só vale no próprio processo, então o
+# padrão é curto para que acessos revogados não continuem visíveis em outros workers
+HIERARCHY_ACCESS_CACHE_TIMEOUT = config(
+    'HIERARCHY_ACCESS_CACHE_TIMEOUT',
+    default=5 if CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS else 300,
+    cast=int
+)
+
+# Idade máxima (segundos) do filtro local da blacklist JWT antes de ser sincronizado
+# (só os jtis novos) e validade das respostas negativas em cache. Limita o atraso na
+# propagação de revogações entre processos quando o cache não é compartilhado
+JWT_BLACKLIST_BLOOM_MAX_AGE = config('JWT_BLACKLIST_BLOOM_MAX_AGE', default=10, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -221,6 +296,41 @@ FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 # Se não configurada, o assistente de IA ficará desabilitado
 GEMINI_API_KEY = config('GEMINI_API_KEY', default=None)
 
+# Processamento assíncrono do chat (jobs com progresso via SSE)
+# Threads por processo para executar os jobs e validade dos jobs e eventos no banco (segundos)
+ALICE_JOB_WORKERS = config('ALICE_JOB_WORKERS', default=4, cast=int)
+ALICE_JOB_TTL = config('ALICE_JOB_TTL', default=600, cast=int)
+# Threads por processo para as etapas independentes do pipeline (embedding, schema, escopo)
+ALICE_PIPELINE_WORKERS = config('ALICE_PIPELINE_WORKERS', default=8, cast=int)
+
+# Cache de embeddings das perguntas: entradas do LRU por processo e validade no cache compartilhado (segundos)
+ALICE_EMBEDDING_CACHE_SIZE = config('ALICE_EMBEDDING_CACHE_SIZE', default=512, cast=int)
+ALICE_EMBEDDING_CACHE_TTL = config('ALICE_EMBEDDING_CACHE_TTL', default=7 * 24 * 60 * 60, cast=int)
+
+# Cache semântico de respostas: similaridade mínima entre perguntas, idade máxima (segundos)
+# e quantidade de logs recentes comparados
+ALICE_ANSWER_CACHE_ENABLED = config('ALICE_ANSWER_CACHE_ENABLED', default=True, cast=bool)
+ALICE_ANSWER_CACHE_THRESHOLD = config('ALICE_ANSWER_CACHE_THRESHOLD', default=0.95, cast=float)
+ALICE_ANSWER_CACHE_MAX_AGE = config('ALICE_ANSWER_CACHE_MAX_AGE', default=24 * 60 * 60, cast=int)
+ALICE_ANSWER_CACHE_CANDIDATES = config('ALICE_ANSWER_CACHE_CANDIDATES', default=200, cast=int)
+
+# Índice vetorial da busca sem pgvector: caminho base (sem extensão) para gravar a
+# matriz e reabri-la com memory-map; vazio mantém o índice apenas em memória
+ALICE_VECTOR_INDEX_PATH = config('ALICE_VECTOR_INDEX_PATH', default=None)
+
+# Schema enviado ao Gemini: limite estimado de tokens por pergunta e validade do texto montado no cache
+ALICE_SCHEMA_TOKEN_BUDGET = config('ALICE_SCHEMA_TOKEN_BUDGET', default=6000, cast=int)
+ALICE_SCHEMA_CACHE_TTL = config('ALICE_SCHEMA_CACHE_TTL', default=24 * 60 * 60, cast=int)
+
+# Vereditos da validação de SQL guardados por processo (impressão da consulta normalizada)
+ALICE_SQL_VALIDATION_CACHE_SIZE = config('ALICE_SQL_VALIDATION_CACHE_SIZE', default=1024, cast=int)
+
+# Execução das consultas da Alice: custo máximo estimado pelo EXPLAIN (PostgreSQL),
+# tempo limite por consulta (ms) e máximo de linhas devolvidas
+ALICE_SQL_MAX_COST = config('ALICE_SQL_MAX_COST', default=100000.0, cast=float)
+ALICE_SQL_TIMEOUT_MS = config('ALICE_SQL_TIMEOUT_MS', default=5000, cast=int)
+ALICE_SQL_MAX_ROWS = config('ALICE_SQL_MAX_ROWS', default=100, cast=int)
+
 
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": (
@@ -233,7 +343,7 @@ REST_FRAMEWORK = {
         "rest_framework.filters.OrderingFilter",
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.MiddlewareJWTAuthentication',
     ),
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
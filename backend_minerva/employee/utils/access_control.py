@@ -1,22 +1,61 @@
-def get_employee_queryset(user, queryset):
+from accounts.hierarchy_cache import get_cached_ids
+from accounts.principal import get_principal
+
+
+def get_employee_scope_filter(user):
+    """
+    Filtro de escopo de funcionários do usuário.
+    Retorna {} para acesso irrestrito, um dict de filtro ou None sem acesso.
+    """
     if user.is_superuser:
-        return queryset
+        return {}
 
-    employee = getattr(user, 'employee', None)
+    principal = get_principal(user)
+    employee = principal.employee
 
     if employee is None:
+        return None
+
+    if principal.in_group('PRESIDENTE'):
+        return {}
+
+    if principal.in_group('DIRETOR'):
+        return {'direction_id': employee.direction_id}
+
+    if principal.in_group('GERENTE'):
+        return {'management_id': employee.management_id}
+
+    if principal.in_group('COORDENADOR'):
+        return {'coordination_id': employee.coordination_id}
+
+    return None
+
+
+def get_employee_queryset(user, queryset):
+    scope = get_employee_scope_filter(user)
+
+    if scope is None:
         return queryset.none()
 
-    if user.groups.filter(name='PRESIDENTE').exists():
-        return queryset
+    return queryset.filter(**scope)
+
+
+def get_accessible_employee_ids(user):
+    """
+    Ids dos funcionários no escopo do usuário, em cache até a próxima mudança
+    na estrutura (accounts.hierarchy_cache). Retorna None para acesso irrestrito.
+    """
+    from employee.models import Employee
 
-    if user.groups.filter(name='DIRETOR').exists():
-        return queryset.filter(direction=employee.direction)
+    scope = get_employee_scope_filter(user)
 
-    if user.groups.filter(name='GERENTE').exists():
-        return queryset.filter(management=employee.management)
+    if scope is None:
+        return []
 
-    if user.groups.filter(name='COORDENADOR').exists():
-        return queryset.filter(coordination=employee.coordination)
+    if not scope:
+        return None
 
-    return queryset.none()
+    return get_cached_ids(
+        user, 'employees',
+        lambda: Employee.objects.filter(**scope).values_list('pk', flat=True)
+    )